@@ -1,3 +1,6 @@
+from XMLWriter import XMLWriter
+
+
 class CompilationEngine():
     STARTING_TOKENS = {
         'var_dec': ['var'],
@@ -39,12 +42,21 @@ class CompilationEngine():
         '='
     ]
 
-    def __init__(self, tokenizer, output_file):
+    def __init__(self, tokenizer, output_file, indent=0, newlines=True):
+        # indent y newlines: formato del xml, ver XMLWriter
         self.tokenizer = tokenizer
         self.output_file = output_file
+        self.xml_writer = XMLWriter(output_file, indent=indent, newlines=newlines)
 
     # Compila una clase
     def compile_class(self):
+        try:
+            self._compile_class()
+        finally:
+            # si el análisis falla queda escrito el xml hasta el error
+            self.xml_writer.flush()
+
+    def _compile_class(self):
         # lo básico para compilar una clase
         self._write_current_outer_tag(body="class")
 
@@ -354,29 +366,11 @@ class CompilationEngine():
         self._write_current_outer_tag(body="/returnStatement")
 
     def _write_current_outer_tag(self, body):
-        self.output_file.write("<{}>\n".format(body))
+        self.xml_writer.write_tag(body)
 
     def _write_current_terminal_token(self):
         # conforme al xml esperado
-        if self.tokenizer.current_token_type() == "STRING_CONST":
-            tag_name = "stringConstant"
-        elif self.tokenizer.current_token_type() == "INT_CONST":
-            tag_name = "integerConstant"
-        else:
-            tag_name = self.tokenizer.current_token_type().lower()
-
-        if self.tokenizer.current_token_type() == "STRING_CONST":
-            value = self.tokenizer.current_token.replace("\"", "")
-        else:
-            value = self.tokenizer.current_token
-
-        self.output_file.write(
-            "<{}> {} </{}>\n".format(
-                tag_name,
-                value,
-                tag_name
-            )
-        )
+        self.xml_writer.write_terminal(self.tokenizer.current_token, self.tokenizer.current_token_type)
 
     def _terminal_token_type(self):
         return self.tokenizer.current_token_type() in self.TERMINAL_TOKEN_TYPES
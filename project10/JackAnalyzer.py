@@ -1,39 +1,202 @@
 from JackTokenizer import JackTokenizer
 from CompilationEngine import CompilationEngine
+from XMLWriter import XMLWriter
+from TokenCache import TokenCache
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import functools
 import sys
 import os
 import glob
 
 
 class JackAnalyzer():
+    # tipo de token -> byte que lo identifica en el volcado binario de --tokens-only --binary
+    TOKEN_TYPE_CODES = {
+        'KEYWORD': 0,
+        'SYMBOL': 1,
+        'IDENTIFIER': 2,
+        'INT_CONST': 3,
+        'STRING_CONST': 4
+    }
+
     # Genera el archivo de salida en el directorio correspondiente
     @classmethod
-    def xml_output_file_for(cls, input_file):
+    def xml_output_file_for(cls, input_file, suffix=".xml"):
         file_name = os.path.basename(input_file).split(".")[0]
         # generando el nombre del archivo de salida
-        return "/".join(input_file.split("/")[:-1]) + "/" + file_name + ".xml"
+        return "/".join(input_file.split("/")[:-1]) + "/" + file_name + suffix
+
+    @classmethod
+    def tokens_output_file_for(cls, input_file, binary=False):
+        return cls.xml_output_file_for(input_file, suffix="T.tok" if binary else "T.xml")
 
     @classmethod
-    def run(cls, input_file, output_file):
-        tokenizer = JackTokenizer(input_file)
-        compiler = CompilationEngine(tokenizer, output_file)
+    def run(cls, input_file, output_file, tokens=None, indent=0, newlines=True):
+        # tokens: tokens del archivo ya leídos, p. ej. desde TokenCache
+        # indent y newlines: formato del xml, ver XMLWriter
+        tokenizer = JackTokenizer(input_file, tokens=tokens)
+        compiler = CompilationEngine(tokenizer, output_file, indent=indent, newlines=newlines)
         compiler.compile_class()
 
+    @classmethod
+    def run_tokens(cls, input_file, output_file, binary=False, indent=0, newlines=True):
+        """
+        escribe solo los tokens, sin construir el árbol de análisis
+
+        sin binary el xml plano <tokens> de los archivos *T.xml; con binary output_file
+        es un archivo binario con un registro por token: el byte de TOKEN_TYPE_CODES,
+        el texto en utf-8 (los strings sin comillas, los símbolos sin convertir) y un salto de línea
+        """
+        tokens = JackTokenizer.scan(input_file.read())
+        if not binary:
+            xml_writer = XMLWriter(output_file, indent=indent, newlines=newlines)
+            xml_writer.write_tokens(tokens, JackTokenizer.token_type_of)
+            xml_writer.flush()
+            return
+
+        records = {}
+        for token in set(tokens):
+            token_kind = JackTokenizer.token_type_of(token)
+            text = token[1:-1] if token_kind == 'STRING_CONST' else token
+            records[token] = bytes([cls.TOKEN_TYPE_CODES[token_kind]]) + text.encode() + b'\n'
+        output_file.write(b''.join([records[token] for token in tokens]))
+
+    @classmethod
+    def input_files_for(cls, arg):
+        """
+        archivos .jack de arg, ordenados para que la salida sea determinista
+        """
+        # Determina sí es un directorio o un archivo
+        if os.path.isfile(arg):
+            return [arg]
+        elif os.path.isdir(arg):
+            return sorted(glob.glob(os.path.join(arg, "*.jack")))
+        return []
+
+    @classmethod
+    def map_files(cls, function, files, *arguments, jobs=None):
+        """
+        resultados de function para cada archivo de files (con los elementos de
+        arguments en la misma posición), repartidos en jobs procesos (por defecto
+        uno por cpu) y en el mismo orden que files
+        """
+        if jobs == 1 or len(files) < 2:
+            return [function(*call) for call in zip(files, *arguments)]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(function, files, *arguments))
+
+    @classmethod
+    def jobs_argument(cls, value):
+        """
+        tipo de argparse para --jobs: un número de procesos positivo
+        """
+        try:
+            jobs = int(value)
+        except ValueError:
+            jobs = 0
+        if jobs < 1:
+            raise argparse.ArgumentTypeError('se esperaba un número de procesos positivo: {!r}'.format(value))
+        return jobs
+
+    @classmethod
+    def analyze_file(cls, input_file_name, token_cache=None, indent=0, newlines=True):
+        """
+        genera el xml de un archivo .jack, devuelve el error como texto si falla
+
+        con token_cache los archivos sin cambios no se vuelven a tokenizar
+        """
+        output_file_name = cls.xml_output_file_for(input_file_name)
+        try:
+            tokens = None
+            if token_cache:
+                tokens = cls.cached_tokens_for(input_file_name, token_cache)
+            with open(input_file_name, 'r') as input_file, open(output_file_name, 'w') as output_file:
+                cls.run(input_file, output_file, tokens=tokens, indent=indent, newlines=newlines)
+        except Exception as error:
+            return '{}: {}: {}'.format(input_file_name, type(error).__name__, error)
+
+    @classmethod
+    def tokenize_file(cls, input_file_name, binary=False, indent=0, newlines=True):
+        """
+        genera el *T.xml (o con binary el *T.tok) de un archivo .jack,
+        devuelve el error como texto si falla
+        """
+        output_file_name = cls.tokens_output_file_for(input_file_name, binary=binary)
+        try:
+            with open(input_file_name, 'r') as input_file, open(output_file_name, 'wb' if binary else 'w') as output_file:
+                cls.run_tokens(input_file, output_file, binary=binary, indent=indent, newlines=newlines)
+        except Exception as error:
+            return '{}: {}: {}'.format(input_file_name, type(error).__name__, error)
+
+    @classmethod
+    def cached_tokens_for(cls, input_file_name, token_cache):
+        with open(input_file_name, 'rb') as input_file:
+            key = token_cache.key_for(input_file.read())
+
+        tokens = token_cache.load(key)
+        if tokens is None:
+            with open(input_file_name, 'r') as input_file:
+                tokens = JackTokenizer(input_file).read_all_tokens()
+            token_cache.store(key, tokens)
+        return tokens
+
+    @classmethod
+    def analyze_files(cls, files, jobs=None, token_cache=None, indent=0, newlines=True, tokens_only=False,
+                      binary=False):
+        """
+        analiza los archivos repartidos en jobs procesos (por defecto uno por cpu),
+        devuelve los errores en el mismo orden que files
+
+        tokens_only: solo escribe los tokens con tokenize_file, no usa token_cache
+        """
+        if tokens_only:
+            analyze_file = functools.partial(cls.tokenize_file, binary=binary, indent=indent, newlines=newlines)
+        else:
+            analyze_file = functools.partial(cls.analyze_file, token_cache=token_cache, indent=indent, newlines=newlines)
+        results = cls.map_files(analyze_file, files, jobs=jobs)
+        return [error for error in results if error]
+
+    @classmethod
+    def cache_directory_for(cls, arg):
+        source_directory = arg if os.path.isdir(arg) else os.path.dirname(arg)
+        return os.path.join(source_directory, TokenCache.DIRECTORY_NAME)
 
-if __name__ == "__main__" and len(sys.argv) == 2:
-    arg = sys.argv[1]
-    # Determina sí es un directorio o un archivo,
-    # y finalmente elige la ruta destino
-    if os.path.isfile(arg):
-        files = [arg]
-    elif os.path.isdir(arg):
-        jack_path = os.path.join(arg, "*.jack")
-        files = glob.glob(jack_path)
 
-    # create output directory - MAY NEED TO REMOVE
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="genera el arbol de analisis xml de archivos .jack")
+    parser.add_argument("source", help="archivo .jack o directorio con archivos .jack")
+    parser.add_argument("-j", "--jobs", type=JackAnalyzer.jobs_argument, default=None,
+                        help="procesos en paralelo (por defecto el numero de cpus)")
+    parser.add_argument("--cache", action="store_true",
+                        help="reutiliza los tokens de los archivos sin cambios desde .jackcache")
+    parser.add_argument("--cache-size", type=int, default=TokenCache.DEFAULT_MAX_SIZE // (1024 * 1024),
+                        help="tamaño maximo de la cache de tokens en MB (aparte de la de JackCompiler)")
+    parser.add_argument("--indent", type=int, default=0,
+                        help="espacios de sangría por nivel del arbol")
+    parser.add_argument("--compact", action="store_true",
+                        help="escribe el xml sin saltos de linea ni sangria")
+    parser.add_argument("--tokens-only", action="store_true",
+                        help="escribe solo los tokens en archivos *T.xml, sin el arbol de analisis")
+    parser.add_argument("--binary", action="store_true",
+                        help="con --tokens-only escribe un volcado binario *T.tok en lugar del xml")
+    args = parser.parse_args()
 
-    for input_file_name in files:
-        output_file_name = JackAnalyzer.xml_output_file_for(input_file_name)
-        output_file = open(output_file_name, 'w')
-        input_file = open(input_file_name, 'r')
-        JackAnalyzer.run(input_file, output_file)
+    token_cache = None
+    if args.cache:
+        token_cache = TokenCache(
+            JackAnalyzer.cache_directory_for(args.source),
+            max_size=args.cache_size * 1024 * 1024
+        )
+    errors = JackAnalyzer.analyze_files(
+        JackAnalyzer.input_files_for(args.source),
+        jobs=args.jobs,
+        token_cache=token_cache,
+        indent=args.indent,
+        newlines=not args.compact,
+        tokens_only=args.tokens_only,
+        binary=args.binary
+    )
+    for error in errors:
+        print(error, file=sys.stderr)
+    sys.exit(1 if errors else 0)
@@ -1,3 +1,6 @@
+import re
+
+
 class JackTokenizer():
     # símbolos del lenguaje Jack
     SYMBOL_CONVERSIONS = {
@@ -30,19 +33,58 @@ class JackTokenizer():
         'while',
         'return'
     ]
+    KEYWORD_SET = frozenset(KEYWORDS)
+    # para scan: espacios y comentarios antes de cada token y el token (string, palabra o símbolo);
+    # al final del archivo el token es vacío, así la búsqueda nunca falla y no retrocede
+    TOKEN_PATTERN = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*("[^"\n]*"|\w+|\S|\Z)', re.DOTALL)
 
     # va a través de archivo .jack y produce una secuencia de tokens
     # ignora los espacios en blanco y comentarios
 
-    def __init__(self, input_file):
+    def __init__(self, input_file, tokens=None):
+        # tokens: textos ya leídos antes, p. ej. desde TokenCache, reemplazan la lectura de input_file
         self.input_file = input_file
         self.tokens_found = []
         self.current_token = None
         self.next_token = None
         self.has_more_tokens = True
+        self._cached_tokens = iter(tokens) if tokens is not None else None
 
     # Avanza en la lectura del documento
     def advance(self):
+        token = self._read_token()
+
+        # establece los tokens
+        if self.current_token:
+            self.current_token = self.next_token
+            self.next_token = token
+            self.tokens_found.append(token)
+        else:
+            self.current_token = token
+            self.next_token = token
+            self.tokens_found.append(token)
+            # actualiza el siguiente token
+            self.advance()
+
+        if not len(self.next_token) > 0:
+            self.has_more_tokens = False
+            return False
+        else:
+            return True
+
+    # lee todos los tokens del archivo, hasta el token vacío del final
+    def read_all_tokens(self):
+        tokens = []
+        token = self._read_token()
+        while token:
+            tokens.append(token)
+            token = self._read_token()
+        return tokens
+
+    def _read_token(self):
+        if self._cached_tokens is not None:
+            return next(self._cached_tokens, "")
+
         # Lee el primer carácter
         char = self.input_file.read(1)
 
@@ -90,23 +132,36 @@ class JackTokenizer():
             else:
                 token = char
 
-        # establece los tokens
-        if self.current_token:
-            self.current_token = self.next_token
-            self.next_token = token
-            self.tokens_found.append(token)
-        else:
-            self.current_token = token
-            self.next_token = token
-            self.tokens_found.append(token)
-            # actualiza el siguiente token
-            self.advance()
-
-        if not len(self.next_token) > 0:
-            self.has_more_tokens = False
-            return False
+        return token
+
+    @classmethod
+    def scan(cls, source):
+        """
+        textos de todos los tokens de source en una sola búsqueda de TOKEN_PATTERN, sin el análisis;
+        los strings van con sus comillas y los símbolos sin convertir a su entidad xml
+
+        los comentarios siguen la gramática de jack: un * seguido de espacio
+        fuera de /* */ siempre es un símbolo
+        """
+        tokens = cls.TOKEN_PATTERN.findall(source)
+        # los tokens vacíos del final: después de los últimos espacios y en la posición final
+        while tokens and not tokens[-1]:
+            tokens.pop()
+        return tokens
+
+    @classmethod
+    def token_type_of(cls, token):
+        # como current_token_type para un token sin convertir
+        if token[0] == "\"":
+            return "STRING_CONST"
+        elif token in cls.KEYWORD_SET:
+            return "KEYWORD"
+        elif token.isdigit():
+            return "INT_CONST"
+        elif token[0].isalnum() or token[0] == "_":
+            return "IDENTIFIER"
         else:
-            return True
+            return "SYMBOL"
 
     def part_of_subroutine_call(self):
         if len(self.tokens_found) < 3:
@@ -0,0 +1,87 @@
+import hashlib
+import marshal
+import os
+import tempfile
+
+
+class TokenCache():
+    """
+    cache en disco de los tokens de cada archivo .jack, serializados con marshal
+    e indexados por el hash del código fuente y del tokenizador
+
+    cuando el tamaño total pasa de max_size se borran las entradas usadas
+    hace más tiempo (se marca el uso con la fecha de modificación)
+    """
+    DIRECTORY_NAME = os.path.join('.jackcache', 'tokens')
+    ENTRY_EXTENSION = '.tokens'
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        tokenizer_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JackTokenizer.py')
+        with open(tokenizer_path, 'rb') as tokenizer_file:
+            self.version = hashlib.sha256(tokenizer_file.read()).hexdigest()
+
+    def key_for(self, source):
+        """
+        source: contenido del archivo .jack en bytes
+        """
+        digest = hashlib.sha256()
+        digest.update(self.version.encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def load(self, key):
+        """
+        lista de tokens guardada para key, o None si no existe
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as entry_file:
+                tokens = marshal.load(entry_file)
+            os.utime(entry_path)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return tokens
+
+    def store(self, key, tokens):
+        # se escribe aparte y se reemplaza para no dejar una entrada a medias, el archivo
+        # temporal es único porque con --jobs otro proceso puede guardar la misma entrada
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as entry_file:
+                marshal.dump(tokens, entry_file)
+            os.replace(temporary_path, self._entry_path(key))
+        except BaseException:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(self.ENTRY_EXTENSION):
+                try:
+                    entry_stat = os.stat(os.path.join(self.directory, file_name))
+                except OSError:
+                    # otro proceso la eliminó después de listdir
+                    continue
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, file_name))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except OSError:
+                pass
+            total_size -= size
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + self.ENTRY_EXTENSION)
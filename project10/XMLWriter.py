@@ -0,0 +1,105 @@
+class XMLWriter():
+    """
+    escribe el árbol de análisis xml de CompilationEngine
+
+    cada texto de token se clasifica una sola vez y su línea completa
+    ('<keyword> class </keyword>') se guarda; las etiquetas de apertura y cierre
+    están precalculadas y la salida se junta en bloques antes de escribirla
+
+    indent: espacios por nivel de anidamiento, 0 escribe cada elemento al
+    comienzo de la línea como hasta ahora
+    newlines: sin saltos de línea (y sin sangría) el xml queda en una sola línea
+    """
+    TERMINAL_TAGS = {
+        'KEYWORD': 'keyword',
+        'SYMBOL': 'symbol',
+        'IDENTIFIER': 'identifier',
+        'INT_CONST': 'integerConstant',
+        'STRING_CONST': 'stringConstant'
+    }
+    SYMBOL_ENTITIES = {
+        '<': '&lt;',
+        '>': '&gt;',
+        '"': '&quot;',
+        '&': '&amp;'
+    }
+    # elementos que se juntan antes de escribir en el archivo
+    BUFFER_ENTRIES = 8192
+
+    def __init__(self, output_file, indent=0, newlines=True):
+        self.output_file = output_file
+        self.indent = indent if newlines else 0
+        self.line_end = '\n' if newlines else ''
+        self.depth = 0
+        self.pending = []
+        self._terminal_lines = {}
+        self._tag_lines = {}
+
+    def write_tag(self, body):
+        """
+        escribe <body>, un body que empieza con / cierra el elemento abierto
+        """
+        line = self._tag_lines.get(body)
+        if line is None:
+            line = self._tag_lines[body] = '<{}>{}'.format(body, self.line_end)
+        if body[0] == '/':
+            self.depth -= 1
+            self._write(line)
+        else:
+            self._write(line)
+            self.depth += 1
+
+    def write_terminal(self, token, token_type):
+        """
+        escribe el elemento del token
+        token_type: función que clasifica el token, solo se llama la primera vez que aparece cada texto
+        """
+        line = self._terminal_lines.get(token)
+        if line is None:
+            line = self._terminal_lines[token] = self._terminal_line(token_type(), token)
+        self._write(line)
+
+    def write_tokens(self, tokens, token_type):
+        """
+        escribe el flujo plano <tokens> del archivo *T.xml
+        tokens: textos sin convertir como los devuelve JackTokenizer.scan
+        token_type: función que clasifica un texto, se llama una vez por cada texto distinto
+        """
+        self.write_tag('tokens')
+        lines = self._terminal_lines
+        if self.indent:
+            for token in tokens:
+                line = lines.get(token)
+                if line is None:
+                    line = lines[token] = self._terminal_line(token_type(token), token)
+                self._write(line)
+        else:
+            # sin sangría cada token es solo su línea, se juntan de una vez
+            self.flush()
+            for token in set(tokens).difference(lines):
+                lines[token] = self._terminal_line(token_type(token), token)
+            self.output_file.write(''.join([lines[token] for token in tokens]))
+        self.write_tag('/tokens')
+
+    def flush(self):
+        if self.pending:
+            self.output_file.write(''.join(self.pending))
+            self.pending = []
+
+    def _terminal_line(self, token_kind, token):
+        tag_name = self.TERMINAL_TAGS[token_kind]
+        if token_kind == 'STRING_CONST':
+            value = token.replace('"', '')
+        elif token_kind == 'SYMBOL':
+            # los tokens de JackTokenizer ya vienen convertidos, los de scan no
+            value = self.SYMBOL_ENTITIES.get(token, token)
+        else:
+            value = token
+        return '<{}> {} </{}>{}'.format(tag_name, value, tag_name, self.line_end)
+
+    def _write(self, line):
+        if self.indent:
+            self.pending.append(' ' * (self.indent * self.depth))
+        self.pending.append(line)
+        if len(self.pending) >= self.BUFFER_ENTRIES:
+            self.flush()
@@ -0,0 +1,129 @@
+import marshal
+
+from CompilationCache import CompilationCache
+from JackAST import (
+    ClassNode, ClassVarDec, SubroutineDec, VarDec,
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    BinaryExpression, UnaryExpression, ParenthesizedExpression,
+    IntegerConstant, StringConstant, KeywordConstant,
+    VariableReference, ArrayReference, SubroutineCall
+)
+from Operator import Operator
+
+
+class ASTCache(CompilationCache):
+    """
+    cache en disco de los árboles de JackParser serializados con marshal,
+    indexado por el hash del código fuente y la versión del compilador
+
+    cada nodo se guarda como una tupla (código del tipo, campos...), las cadenas
+    de BinaryExpression se guardan aplanadas para no anidar una tupla por operador
+    """
+    DIRECTORY_NAME = 'ast'
+    ENTRY_EXTENSION = '.ast'
+    NODE_TYPES = (
+        ClassNode, ClassVarDec, SubroutineDec, VarDec,
+        LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+        UnaryExpression, ParenthesizedExpression,
+        IntegerConstant, StringConstant, KeywordConstant,
+        VariableReference, ArrayReference, SubroutineCall
+    )
+    NODE_CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+    BINARY_CHAIN = len(NODE_TYPES)
+
+    # cómo se guarda cada campo: valor simple, nodo (o None), lista de nodos (o None), operador
+    VALUE = 0
+    NODE = 1
+    NODES = 2
+    OPERATOR = 3
+    FIELD_KINDS = {
+        ClassNode: (VALUE, NODES, NODES),
+        ClassVarDec: (VALUE, VALUE, VALUE),
+        SubroutineDec: (VALUE, VALUE, VALUE, VALUE, NODES, NODES, VALUE),
+        VarDec: (VALUE, VALUE),
+        LetStatement: (VALUE, NODE, NODE, VALUE),
+        IfStatement: (NODE, NODES, NODES, VALUE),
+        WhileStatement: (NODE, NODES, VALUE),
+        DoStatement: (NODE, VALUE),
+        ReturnStatement: (NODE, VALUE),
+        UnaryExpression: (OPERATOR, NODE),
+        ParenthesizedExpression: (NODE,),
+        IntegerConstant: (VALUE,),
+        StringConstant: (VALUE,),
+        KeywordConstant: (VALUE,),
+        VariableReference: (VALUE,),
+        ArrayReference: (VALUE, NODE),
+        SubroutineCall: (VALUE, VALUE, NODES)
+    }
+
+    def load(self, key):
+        """
+        árbol guardado para key, o None si no existe
+        """
+        data = self.read(key)
+        if data is None:
+            return None
+        return self.decode(marshal.loads(data))
+
+    def store(self, key, class_node):
+        self.write(key, self.dumps(class_node))
+
+    @classmethod
+    def dumps(cls, class_node):
+        return marshal.dumps(cls.encode(class_node))
+
+    @classmethod
+    def loads(cls, data):
+        return cls.decode(marshal.loads(data))
+
+    @classmethod
+    def encode(cls, node):
+        if node is None:
+            return None
+        elif isinstance(node, BinaryExpression):
+            operations = []
+            while isinstance(node, BinaryExpression):
+                operations.append((node.operator.token, cls.encode(node.right)))
+                node = node.left
+            operations.reverse()
+            return (cls.BINARY_CHAIN, cls.encode(node), operations)
+
+        node_type = type(node)
+        encoded = [cls.NODE_CODES[node_type]]
+        for field, kind in zip(node_type.__slots__, cls.FIELD_KINDS[node_type]):
+            value = getattr(node, field)
+            if kind == cls.NODE:
+                value = cls.encode(value)
+            elif kind == cls.NODES and value is not None:
+                value = [cls.encode(item) for item in value]
+            elif kind == cls.OPERATOR:
+                value = (value.token, value.category)
+            encoded.append(value)
+        return tuple(encoded)
+
+    @classmethod
+    def decode(cls, encoded):
+        if encoded is None:
+            return None
+        elif encoded[0] == cls.BINARY_CHAIN:
+            node = cls.decode(encoded[1])
+            for token, right in encoded[2]:
+                node = BinaryExpression(
+                    operator=Operator(token=token, category='bi'),
+                    left=node,
+                    right=cls.decode(right)
+                )
+            return node
+
+        # se crea el nodo sin pasar por __init__, los campos ya vienen completos
+        node_type = cls.NODE_TYPES[encoded[0]]
+        node = node_type.__new__(node_type)
+        for field, kind, value in zip(node_type.__slots__, cls.FIELD_KINDS[node_type], encoded[1:]):
+            if kind == cls.NODE:
+                value = cls.decode(value)
+            elif kind == cls.NODES and value is not None:
+                value = [cls.decode(item) for item in value]
+            elif kind == cls.OPERATOR:
+                value = Operator(token=value[0], category=value[1])
+            setattr(node, field, value)
+        return node
@@ -0,0 +1,60 @@
+from VMInstructions import VMInstructions
+
+
+class CallGraph():
+    """
+    grafo de llamadas de un programa completo, construido a partir de las
+    VMInstructions de cada clase
+
+    en jack no hay punteros a funciones, cada llamada es un call con el
+    nombre completo de la función, así que el grafo es exacto
+    """
+    # puntos de entrada: el bootstrap llama a Sys.init y el Sys.init del
+    # sistema operativo llama a Main.main, sin Sys.init el programa empieza en Main.main
+    ENTRY_POINTS = ('Sys.init', 'Main.main')
+
+    def __init__(self, programs):
+        """
+        programs: diccionario nombre -> VMInstructions de cada clase
+        """
+        # función -> (nombre del programa, inicio, fin)
+        self.functions = {}
+        # función -> funciones que llama
+        self.calls = {}
+        for program_name, instructions in programs.items():
+            for function_name, start, stop in self.function_ranges(instructions):
+                self.functions[function_name] = (program_name, start, stop)
+                self.calls[function_name] = {
+                    instructions.name_at(position) for position in range(start, stop)
+                    if instructions.opcodes[position] == VMInstructions.CALL
+                }
+
+    @classmethod
+    def function_ranges(cls, instructions):
+        """
+        (nombre, inicio, fin) de cada función, desde su comando function hasta el siguiente
+        """
+        starts = [
+            position for position in range(len(instructions))
+            if instructions.opcodes[position] == VMInstructions.FUNCTION
+        ]
+        for start, stop in zip(starts, starts[1:] + [len(instructions)]):
+            yield instructions.name_at(start), start, stop
+
+    def entry_points(self):
+        return [name for name in self.ENTRY_POINTS if name in self.functions]
+
+    def reachable(self, roots=None):
+        """
+        funciones definidas en el programa a las que se llega desde roots,
+        por defecto desde los puntos de entrada
+        """
+        pending = list(self.entry_points() if roots is None else roots)
+        reached = set()
+        while pending:
+            function_name = pending.pop()
+            if function_name in reached or function_name not in self.functions:
+                continue
+            reached.add(function_name)
+            pending.extend(self.calls[function_name])
+        return reached
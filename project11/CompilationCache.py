@@ -0,0 +1,128 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+
+class CompilationCache():
+    """
+    cache en disco de archivos .vm generados, indexado por el hash del código fuente,
+    la versión del compilador y las opciones de compilación
+
+    el manifiesto guarda las entradas de la menos a la más usada recientemente,
+    cuando el tamaño total pasa de max_size se eliminan las primeras
+    """
+    DIRECTORY_NAME = '.jackcache'
+    MANIFEST_NAME = 'manifest.json'
+    ENTRY_EXTENSION = '.vm'
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.manifest_path = os.path.join(directory, self.MANIFEST_NAME)
+        self.version = self.compiler_version()
+        os.makedirs(directory, exist_ok=True)
+        self.entries = self._load_manifest()
+
+    @classmethod
+    def compiler_version(cls):
+        """
+        hash de los módulos del compilador, cambia cuando cambia cualquiera de ellos
+        """
+        digest = hashlib.sha256()
+        compiler_directory = os.path.dirname(os.path.abspath(__file__))
+        for module_path in sorted(glob.glob(os.path.join(compiler_directory, '*.py'))):
+            with open(module_path, 'rb') as module_file:
+                digest.update(module_file.read())
+        return digest.hexdigest()
+
+    def key_for(self, source, options=''):
+        """
+        source: contenido del archivo .jack en bytes
+        """
+        digest = hashlib.sha256()
+        digest.update(self.version.encode())
+        digest.update(options.encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def get(self, key, output_file_name):
+        """
+        copia la salida guardada para key en output_file_name, devuelve False si no existe
+        """
+        if key not in self.entries:
+            return False
+
+        try:
+            shutil.copyfile(self._entry_path(key), output_file_name)
+        except OSError:
+            del self.entries[key]
+            return False
+        self._touch(key)
+        return True
+
+    def put(self, key, output_file_name):
+        shutil.copyfile(output_file_name, self._entry_path(key))
+        self._add(key, os.path.getsize(output_file_name))
+
+    def read(self, key):
+        """
+        contenido guardado para key en bytes, o None si no existe
+        """
+        if key not in self.entries:
+            return None
+
+        try:
+            with open(self._entry_path(key), 'rb') as entry_file:
+                data = entry_file.read()
+        except OSError:
+            del self.entries[key]
+            return None
+        self._touch(key)
+        return data
+
+    def write(self, key, data):
+        with open(self._entry_path(key), 'wb') as entry_file:
+            entry_file.write(data)
+        self._add(key, len(data))
+
+    def save(self):
+        # se escribe aparte y se reemplaza para no dejar un manifiesto a medias
+        temporary_path = self.manifest_path + '.tmp'
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump({'entries': self.entries}, manifest_file)
+        os.replace(temporary_path, self.manifest_path)
+
+    def total_size(self):
+        return sum(self.entries.values())
+
+    def _touch(self, key):
+        # pasa a ser la entrada usada más recientemente
+        self.entries[key] = self.entries.pop(key)
+
+    def _add(self, key, size):
+        self.entries.pop(key, None)
+        self.entries[key] = size
+        self._evict()
+
+    def _evict(self):
+        total_size = self.total_size()
+        while total_size > self.max_size and self.entries:
+            key = next(iter(self.entries))
+            total_size -= self.entries.pop(key)
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + self.ENTRY_EXTENSION)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as manifest_file:
+                return dict(json.load(manifest_file)['entries'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
@@ -1,366 +1,306 @@
 from SymbolTable import SymbolTable
 from VMWriter import VMWriter
-from LabelCounter import LabelCounter
-from Operator import Operator
+from LabelAllocator import LabelAllocator
+from StringPool import StringPool
+from JackParser import JackParser
+from ExpressionFolder import ExpressionFolder
+from JackAST import (
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    BinaryExpression, UnaryExpression, ParenthesizedExpression,
+    IntegerConstant, StringConstant, KeywordConstant,
+    VariableReference, ArrayReference, SubroutineCall
+)
 
 
 class CompilationEngine():
     """
-    compila un archivo fuente jack desde un tokenizador jack en formato xml en output_file
+    compila un archivo fuente jack desde un tokenizador jack a código vm en output_file
+
+    JackParser construye el árbol de la clase y la generación de código lo recorre
     """
     SYMBOL_KINDS = {
         'parameter_list': 'argument',
         'var_dec': 'local'
     }
-    TOKENS_THAT_NEED_LABELS = ['if', 'while']
-    TERMINATING_TOKENS = {
-        'class': ['}'],
-        'class_var_dec': [';'],
-        'subroutine': ['}'],
-        'parameter_list': [')'],
-        'expression_list': [')'],
-        'statements': ['}'],
-        'do': [';'],
-        'let': [';'],
-        'while': ['}'],
-        'if': ['}'],
-        'var_dec': [';'],
-        'return': [';'],
-        'expression': [';', ')', ']', ','],
-        'array': [']']
-    }
-    STARTING_TOKENS = {
-        'var_dec': ['var'],
-        'parameter_list': ['('],
-        'subroutine_body': ['{'],
-        'expression_list': ['('],
-        'expression': ['=', '[', '('],
-        'array': ['['],
-        'conditional': ['if', 'else']
-    }
+    # con optimize x * 2^k se genera con k sumas en lugar de push constant 2^k, call Math.multiply 2
+    # mientras las sumas ocupen hasta estas instrucciones vm: cada suma son 4 (pop temp 0,
+    # push temp 0, push temp 0, add) y Math.multiply recorre los 16 bits en cada llamada
+    MAX_DOUBLING_INSTRUCTIONS = 12
 
-    def __init__(self, tokenizer, output_file):
+    def __init__(self, tokenizer, output_file, optimize=False, string_pool=False, map_file=None, source_name=None,
+                 track_lines=False, compact_labels=False):
         self.tokenizer = tokenizer
         self.output_file = output_file
+        # simplifica las expresiones con ExpressionFolder y aplica VMOptimizer antes de escribir la clase
+        self.optimize = optimize
+        self.removed_instructions = 0
+        # los literales de cadena se construyen una vez en un StringPool
+        self.use_string_pool = string_pool
+        self.string_pool = None
+        self.subroutine_uses_string_pool = False
         self.class_symbol_table = SymbolTable()
-        self.subroutine_symbol_table = SymbolTable()
-        self.vm_writer = VMWriter(output_file)
-        self.label_counter = LabelCounter(labels=self.TOKENS_THAT_NEED_LABELS)
+        self.subroutine_symbol_table = SymbolTable(parent=self.class_symbol_table)
+        # con map_file o track_lines cada comando vm queda asociado a la línea de su sentencia
+        self.vm_writer = VMWriter(output_file, map_file=map_file, source_name=source_name, track_lines=track_lines)
+        # compact_labels: etiquetas de if y while con nombres cortos
+        self.labels = LabelAllocator(compact=compact_labels)
         self.class_name = None
+        self.subroutine_name = None
+
+        self.statement_compile_methods = {
+            LetStatement: self.compile_let,
+            IfStatement: self.compile_if,
+            WhileStatement: self.compile_while,
+            DoStatement: self.compile_do,
+            ReturnStatement: self.compile_return
+        }
+        self.term_compile_methods = {
+            IntegerConstant: self.compile_integer_constant,
+            StringConstant: self.compile_string_const,
+            KeywordConstant: self.compile_keyword_constant,
+            VariableReference: self.compile_symbol_push,
+            ArrayReference: self.compile_array_expression,
+            SubroutineCall: self.compile_subroutine_call,
+            ParenthesizedExpression: self.compile_parenthesized_expression,
+            UnaryExpression: self.compile_unary_expression,
+            BinaryExpression: self.compile_binary_expression
+        }
 
     def compile_class(self):
         """
         lo basico pa compilar la clase
         """
-        # omitimos todo para comenzar la clase
-        while not self.tokenizer.class_token_reached():
-            self.tokenizer.advance()
+        self.compile_class_node(JackParser(self.tokenizer).parse_class())
+
+    def compile_class_node(self, class_node):
         # variable de instancia
-        self.class_name = self.tokenizer.next_token.text
-
-        while self.tokenizer.has_more_tokens:
-            self.tokenizer.advance()
-
-            if self.tokenizer.current_token.starts_class_var_dec():
-                self.compile_class_var_dec()
-            elif self.tokenizer.current_token.starts_subroutine():
-                self.compile_subroutine()
-
-    def compile_class_var_dec(self):
-        symbol_kind = self.tokenizer.keyword()
-
-        # obtenemos el tipo del simbolo
-        self.tokenizer.advance()
-        symbol_type = self.tokenizer.keyword()
-
-        # obtenemos todos los identificadores
-        while self._not_terminal_token_for('class_var_dec'):
-            self.tokenizer.advance()
-
-            if self.tokenizer.identifier():
-                # agregamos los simbolos de clase
-                symbol_name = self.tokenizer.identifier()
-                self.class_symbol_table.define(
-                    name=symbol_name,
-                    kind=symbol_kind,
-                    symbol_type=symbol_type
-                )
+        self.class_name = class_node.name
+
+        for class_var_dec in class_node.class_var_decs:
+            self.compile_class_var_dec(class_var_dec)
+        for subroutine in class_node.subroutines:
+            self.compile_subroutine(subroutine)
+
+        if self.string_pool and not self.string_pool.is_empty():
+            self.compile_string_pool()
+
+        if self.optimize:
+            self.removed_instructions = self.vm_writer.optimize()
+        self.vm_writer.flush()
+
+    def compile_class_var_dec(self, class_var_dec):
+        # agregamos los simbolos de clase
+        for symbol_name in class_var_dec.names:
+            self.class_symbol_table.define(
+                name=symbol_name,
+                kind=class_var_dec.kind,
+                symbol_type=class_var_dec.type
+            )
 
-    def compile_subroutine(self):
+    def compile_subroutine(self, subroutine):
         #  nueva subrutina significa nuevo alcance
         self.subroutine_symbol_table.reset()
-        # obtenemos el nombre de la subrutina
-        self.tokenizer.advance()
-        self.tokenizer.advance()
-        subroutine_name = self.tokenizer.current_token.text
-
-        # compilamos la lista de parametros
-        self.tokenizer.advance()
-        self.compile_parameter_list()
+        self.subroutine_uses_string_pool = False
+        # posición del comando function de la subrutina
+        subroutine_start = len(self.vm_writer.get_instructions())
+        self.subroutine_name = '{}.{}'.format(self.class_name, subroutine.name)
 
-        # compilamos el cuerpo
-        self.tokenizer.advance()
-        self.compile_subroutine_body(subroutine_name=subroutine_name)
+        if subroutine.kind == 'method':
+            # el objeto es el argumento implícito 0
+            self.subroutine_symbol_table.define(name='this', kind='argument', symbol_type=self.class_name)
+        self.compile_parameter_list(subroutine.parameters)
 
-        # reset
-        self.label_counter.reset_counts()
-
-    def compile_subroutine_body(self, subroutine_name):
-        # saltamos el inicio
-        self.tokenizer.advance()
-        # obtenemos todas las locales
         num_locals = 0
-        while self._starting_token_for('var_dec'):
-            num_locals += self.compile_var_dec()
-            self.tokenizer.advance()
+        for var_dec in subroutine.var_decs:
+            num_locals += self.compile_var_dec(var_dec)
 
         # escribimos el comando de funcion
+        self.vm_writer.set_line(subroutine.line)
         self.vm_writer.write_function(
-            name='{}.{}'.format(self.class_name, subroutine_name),
+            name=self.subroutine_name,
             num_locals=num_locals
         )
 
-        # compilamos todas las declaraciones
-        while self._not_terminal_token_for('subroutine'):
-            self.compile_statements()
+        if subroutine.kind == 'constructor':
+            # reservamos memoria para los campos del objeto
+            self.vm_writer.write_push(segment='constant', index=self.class_symbol_table.var_count('field'))
+            self.vm_writer.write_call(name='Memory.alloc', num_args=1)
+            self.vm_writer.write_pop(segment='pointer', index=0)
+        elif subroutine.kind == 'method':
+            self.vm_writer.write_push(segment='argument', index=0)
+            self.vm_writer.write_pop(segment='pointer', index=0)
 
-    def compile_parameter_list(self):
-        # tabla de simbolos
-        while self._not_terminal_token_for('parameter_list'):
-            self.tokenizer.advance()
-
-            if self.tokenizer.next_token.is_identifier():
-                symbol_kind = self.SYMBOL_KINDS['parameter_list']
-                symbol_type = self.tokenizer.current_token.text
-                symbol_name = self.tokenizer.next_token.text
-                self.subroutine_symbol_table.define(
-                    name=symbol_name,
-                    kind=symbol_kind,
-                    symbol_type=symbol_type
-                )
-
-    def compile_var_dec(self):
+        self.compile_statements(subroutine.statements)
 
-        self.tokenizer.advance()
+        if self.subroutine_uses_string_pool:
+            self.compile_string_pool_check(position=subroutine_start + 1)
 
-        symbol_type = self.tokenizer.current_token.text
+        # reset
+        self.labels.reset()
 
-        num_vars = 0
+    def compile_parameter_list(self, parameters):
+        # tabla de simbolos
+        for symbol_type, symbol_name in parameters:
+            self.subroutine_symbol_table.define(
+                name=symbol_name,
+                kind=self.SYMBOL_KINDS['parameter_list'],
+                symbol_type=symbol_type
+            )
 
+    def compile_var_dec(self, var_dec):
         # obtenemos todas las variables
-        while self._not_terminal_token_for('var_dec'):
-            self.tokenizer.advance()
-
-            if self.tokenizer.identifier():
-                num_vars += 1
-                symbol_kind = self.SYMBOL_KINDS['var_dec']
-                symbol_name = self.tokenizer.identifier()
-                self.subroutine_symbol_table.define(
-                    name=symbol_name,
-                    kind=symbol_kind,
-                    symbol_type=symbol_type
-                )
+        for symbol_name in var_dec.names:
+            self.subroutine_symbol_table.define(
+                name=symbol_name,
+                kind=self.SYMBOL_KINDS['var_dec'],
+                symbol_type=var_dec.type
+            )
         # return a las variables procesadas
-        return num_vars
-
-    def compile_statements(self):
+        return len(var_dec.names)
 
-        statement_compile_methods = {
-            'if': self.compile_if,
-            'do': self.compile_do,
-            'let': self.compile_let,
-            'while': self.compile_while,
-            'return': self.compile_return
-        }
+    def compile_statements(self, statements):
+        for statement in statements:
+            self.vm_writer.set_line(statement.line)
+            self.statement_compile_methods[type(statement)](statement)
 
-        while self._not_terminal_token_for('subroutine'):
-            if self.tokenizer.current_token.is_statement_token():
-                statement_type = self.tokenizer.current_token.text
-                statement_compile_methods[statement_type]()
-
-            self.tokenizer.advance()
-
-    def compile_do(self):
-
-        self.tokenizer.advance()
-        caller_name = self.tokenizer.current_token.text
-        symbol = self._find_symbol_in_symbol_tables(symbol_name=caller_name)
-        self.tokenizer.advance()
-        self.tokenizer.advance()
-        subroutine_name = self.tokenizer.current_token.text
-
-        if symbol:
-            segment = 'local'
-            index = symbol['index']
-            symbol_type = symbol['type']
-            self.vm_writer.write_push(segment=segment, index=index)
-        else:  # es decir llamada al os
-            symbol_type = caller_name
-
-        subroutine_call_name = symbol_type + '.' + subroutine_name
-        # iniciamos la lista de expresion
-        self.tokenizer.advance()
-        # obtenemos los argumentos en la lista de expresion
-        num_args = self.compile_expression_list()
-        # method call
-        if symbol:
-            # llamando al objeto pasado como un argumento implicito
-            num_args += 1
-        # escribimos la llamada
-        self.vm_writer.write_call(name=subroutine_call_name, num_args=num_args)
+    def compile_do(self, statement):
+        self.compile_subroutine_call(statement.call)
+        # se descarta el valor devuelto
         self.vm_writer.write_pop(segment='temp', index='0')
 
-    def compile_let(self):
+    def compile_let(self, statement):
+        symbol = self._defined_symbol(symbol_name=statement.name)
 
-        # obtener símbolo para almacenar evaluación de expresión
-        self.tokenizer.advance()
-        symbol_name = self.tokenizer.current_token.text
-        symbol = self._find_symbol_in_symbol_tables(symbol_name=symbol_name)
-
-        array_assignment = self._starting_token_for(keyword_token='array', position='next')
-        if array_assignment:
-            # llegar a la expresión de índice
-            self.tokenizer.advance()
-            self.tokenizer.advance()
-            # lo compilamos
-            self.compile_expression()
-            self.vm_writer.write_push(segment=symbol['kind'], index=symbol['index'])
-            self.vm_writer.write_arithmetic(command='+')
+        if statement.index is None:
+            self.compile_expression(statement.value)
+            # almacenar evaluación de expresión en la ubicación del símbolo
+            self.vm_writer.write_pop(segment=symbol.kind, index=symbol.index)
+            return
 
-        while not self.tokenizer.current_token.text == '=':
-            self.tokenizer.advance()
-        # compila todas las expresiones
-        while self._not_terminal_token_for('let'):
-            self.tokenizer.advance()
-            self.compile_expression()
+        # dirección del elemento: índice + base del arreglo
+        self.compile_expression(statement.index)
+        self.vm_writer.write_push(segment=symbol.kind, index=symbol.index)
+        self.vm_writer.write_arithmetic(command='+')
 
-        if not array_assignment:
-            # almacenar evaluación de expresión en la ubicación del símbolo
-            self.vm_writer.write_pop(segment=symbol['kind'], index=symbol['index'])
-        else:
+        self.compile_expression(statement.value)
 
-            self.vm_writer.write_pop(segment='temp', index='0')
+        self.vm_writer.write_pop(segment='temp', index='0')
 
-            self.vm_writer.write_pop(segment='pointer', index='1')
+        self.vm_writer.write_pop(segment='pointer', index='1')
 
-            self.vm_writer.write_push(segment='temp', index='0')
+        self.vm_writer.write_push(segment='temp', index='0')
 
-            self.vm_writer.write_pop(segment='that', index='0')
+        self.vm_writer.write_pop(segment='that', index='0')
 
-    def compile_while(self):
+    def compile_while(self, statement):
+        expression_label, end_label = self.labels.allocate('while', 'WHILE_EXP', 'WHILE_END')
 
         # escribimos la etiqueta while
-        self.vm_writer.write_label(
-            label='WHILE_EXP{}'.format(self.label_counter.get('while'))
-        )
-
-        # avanzar al inicio (
-        self.tokenizer.advance()
-        self.tokenizer.advance()
+        self.vm_writer.write_label(label=expression_label)
 
         # compilamos la expresion dentro ()
-        self.compile_expression()
+        self.compile_expression(statement.condition)
 
         # NOT expresión para manejar fácilmente la terminación y if-goto
         self.vm_writer.write_unary(command='~')
-        self.vm_writer.write_ifgoto(
-            label='WHILE_END{}'.format(self.label_counter.get('while'))
-        )
-
-        while self._not_terminal_token_for('while'):
-            self.tokenizer.advance()
+        self.vm_writer.write_ifgoto(label=end_label)
 
-            if self._statement_token():
-                self.compile_statements()
+        self.compile_statements(statement.statements)
+        # el salto de vuelta es parte del while
+        self.vm_writer.set_line(statement.line)
 
         # escribir el goto
-        self.vm_writer.write_goto(
-            label='WHILE_EXP{}'.format(self.label_counter.get('while'))
-        )
+        self.vm_writer.write_goto(label=expression_label)
         # escribimos el fin de la etiqueta
-        self.vm_writer.write_label(
-            label='WHILE_END{}'.format(self.label_counter.get('while'))
-        )
-        #  agregar while al contador de etiquetas
-        self.label_counter.increment('while')
+        self.vm_writer.write_label(label=end_label)
+
+    def compile_if(self, statement):
+        # cada if, incluso los anidados, tiene su propio número de etiqueta
+        true_label, false_label, end_label = self.labels.allocate('if', 'IF_TRUE', 'IF_FALSE', 'IF_END')
 
-    def compile_if(self):
-        # avanzamos a la expresion start
-        self.tokenizer.advance()
-        self.tokenizer.advance()
         # compilamos dentro ()
-        self.compile_expression()
-        self.vm_writer.write_ifgoto(label='IF_TRUE{}'.format(self.label_counter.get('if')))
-        self.vm_writer.write_goto(label='IF_FALSE{}'.format(self.label_counter.get('if')))
-        self.vm_writer.write_label(label='IF_TRUE{}'.format(self.label_counter.get('if')))
-        self.compile_conditional_body()
-        if self._starting_token_for(keyword_token='conditional', position='next'):
-            self.tokenizer.advance()
-            self.vm_writer.write_goto(
-                label='IF_END{}'.format(self.label_counter.get('if'))
-            )
-            self.vm_writer.write_label(
-                label='IF_FALSE{}'.format(self.label_counter.get('if'))
-            )
-            self.compile_conditional_body()
-            self.vm_writer.write_label(
-                label='IF_END{}'.format(self.label_counter.get('if'))
-            )
+        self.compile_expression(statement.condition)
+        self.vm_writer.write_ifgoto(label=true_label)
+        self.vm_writer.write_goto(label=false_label)
+        self.vm_writer.write_label(label=true_label)
+        self.compile_statements(statement.statements)
+        self.vm_writer.set_line(statement.line)
+
+        if statement.else_statements is not None:
+            self.vm_writer.write_goto(label=end_label)
+            self.vm_writer.write_label(label=false_label)
+            self.compile_statements(statement.else_statements)
+            self.vm_writer.set_line(statement.line)
+            self.vm_writer.write_label(label=end_label)
         else:
-            self.vm_writer.write_label(
-                label='IF_FALSE{}'.format(self.label_counter.get('if'))
-            )
+            self.vm_writer.write_label(label=false_label)
 
-    def compile_conditional_body(self):
-        while self._not_terminal_token_for('if'):
-            self.tokenizer.advance()
+    def compile_return(self, statement):
+        if statement.value is not None:
+            self.compile_expression(statement.value)
+        else:
+            self.vm_writer.write_push(segment='constant', index='0')
 
-            if self._statement_token():
-                if self.tokenizer.current_token.is_if():
-                    self.label_counter.increment('if')
-                    self.compile_statements()
-                    self.label_counter.decrement('if')
-                else:
-                    self.compile_statements()
+        self.vm_writer.write_return()
 
-    def compile_expression(self):
+    def compile_expression(self, expression):
         """
         many examples..i,e., x = 4
         """
-        # las operaciones se compilan al final en orden inverso al que fueron agregadas
-        ops = []
-
-        while self._not_terminal_token_for('expression'):
-            if self._subroutine_call():
-                self.compile_subroutine_call()
-            elif self._array_expression():
-                self.compile_array_expression()
-            elif self.tokenizer.current_token.text.isdigit():
-                self.vm_writer.write_push(
-                    segment='constant',
-                    index=self.tokenizer.current_token.text
-                )
-            elif self.tokenizer.identifier():
-                self.compile_symbol_push()
-            elif self.tokenizer.current_token.is_operator() and not self._part_of_expression_list():
-                ops.insert(0, Operator(token=self.tokenizer.current_token.text, category='bi'))
-            elif self.tokenizer.current_token.is_unary_operator():
-                ops.insert(0, Operator(token=self.tokenizer.current_token.text, category='unary'))
-            elif self.tokenizer.string_const():
-                self.compile_string_const()
-            elif self.tokenizer.boolean():  # caso booleano
-                self.compile_boolean()
-            elif self._starting_token_for('expression'):  # expresión anidada
-                # saltamos el inicial (
-                self.tokenizer.advance()
-                self.compile_expression()
-            elif self.tokenizer.null():
-                self.vm_writer.write_push(segment='constant', index=0)
-
-            self.tokenizer.advance()
-
-        for op in ops:
-            self.compile_op(op)
+        if self.optimize:
+            expression = ExpressionFolder.fold(expression)
+        self.compile_term(expression)
+
+    def compile_term(self, expression):
+        # las partes de una expresión ya simplificada se compilan sin volver a simplificarlas
+        self.term_compile_methods[type(expression)](expression)
+
+    def compile_binary_expression(self, expression):
+        # se recorre la cadena de operadores hacia la izquierda sin recursión,
+        # las expresiones largas no agotan la pila de python
+        operations = []
+        while isinstance(expression, BinaryExpression):
+            operations.append(expression)
+            expression = expression.left
+
+        self.compile_term(expression)
+        for position, operation in enumerate(reversed(operations)):
+            doublings = None
+            if self.optimize and operation.operator.multiplication():
+                doublings = ExpressionFolder.power_of_two_exponent(operation.right)
+            # una variable se vuelve a apilar en lugar de duplicarla con temp 0
+            reload = position == 0 and isinstance(expression, VariableReference)
+            if doublings is not None and 4 * doublings - reload <= self.MAX_DOUBLING_INSTRUCTIONS:
+                if reload:
+                    self.compile_term(expression)
+                    self.vm_writer.write_arithmetic(command='+')
+                    doublings -= 1
+                self.compile_doublings(doublings)
+                continue
+            # x / 2^k no se reduce: Math.divide trunca hacia cero y la vm no tiene
+            # desplazamientos, para x negativo hacen falta una comparación y una
+            # corrección que ocupan más que la llamada; con x constante ExpressionFolder
+            # ya calcula el cociente
+            self.compile_term(operation.right)
+            self.compile_op(operation.operator)
+
+    def compile_doublings(self, times):
+        """
+        multiplica por 2^times el valor del tope de la pila sumándolo consigo mismo,
+        temp 0 sirve para duplicarlo porque la vm no tiene dup
+        """
+        for _ in range(times):
+            self.vm_writer.write_pop(segment='temp', index=0)
+            self.vm_writer.write_push(segment='temp', index=0)
+            self.vm_writer.write_push(segment='temp', index=0)
+            self.vm_writer.write_arithmetic(command='+')
+
+    def compile_unary_expression(self, expression):
+        self.compile_term(expression.term)
+        self.compile_op(expression.operator)
+
+    def compile_parenthesized_expression(self, expression):
+        self.compile_term(expression.expression)
 
     def compile_op(self, op):
 
@@ -373,128 +313,136 @@ class CompilationEngine():
         else:
             self.vm_writer.write_arithmetic(command=op.token)
 
-    def compile_boolean(self):
+    def compile_integer_constant(self, constant):
+        self.vm_writer.write_push(segment='constant', index=constant.value)
+
+    def compile_keyword_constant(self, constant):
+        if constant.value == 'this':
+            self.vm_writer.write_push(segment='pointer', index=0)
+        elif constant.value in ('true', 'false'):
+            self.compile_boolean(constant.value)
+        else:  # null
+            self.vm_writer.write_push(segment='constant', index=0)
+
+    def compile_boolean(self, value):
         """
         True o False
         """
         self.vm_writer.write_push(segment='constant', index=0)
 
-        if self.tokenizer.boolean() == 'true':
+        if value == 'true':
             self.vm_writer.write_unary(command='~')
 
-    def compile_string_const(self):
+    def compile_string_const(self, constant):
+
+        if self.use_string_pool:
+            if not self.string_pool:
+                # las variables static de la clase ya están todas declaradas
+                self.string_pool = StringPool(
+                    class_name=self.class_name,
+                    static_base=self.class_symbol_table.var_count('static')
+                )
+            self.subroutine_uses_string_pool = True
+            self.vm_writer.write_push(
+                segment='static',
+                index=self.string_pool.index_for(constant.value)
+            )
+        else:
+            self.compile_string_construction(self.vm_writer, constant.value)
+
+    def compile_string_construction(self, vm_writer, string):
 
-        string_length = len(self.tokenizer.string_const())
-        self.vm_writer.write_push(segment='constant', index=string_length)
-        self.vm_writer.write_call(name='String.new', num_args=1)
+        vm_writer.write_push(segment='constant', index=len(string))
+        vm_writer.write_call(name='String.new', num_args=1)
         # construir cadena a partir de caracteres
-        for char in self.tokenizer.string_const():
-            if not char == self.tokenizer.STRING_CONST_DELIMITER:
-                ascii_value_of_char = ord(char)
-                self.vm_writer.write_push(segment='constant', index=ascii_value_of_char)
-                self.vm_writer.write_call(name='String.appendChar', num_args=2)
+        for char in string:
+            ascii_value_of_char = ord(char)
+            vm_writer.write_push(segment='constant', index=ascii_value_of_char)
+            vm_writer.write_call(name='String.appendChar', num_args=2)
 
-    def compile_symbol_push(self):
+    def compile_string_pool(self):
+        """
+        función que construye todas las cadenas del StringPool
+        """
+        self.vm_writer.write_function(name=self.string_pool.function_name, num_locals=0)
+        for literal, index in self.string_pool.literals.items():
+            self.compile_string_construction(self.vm_writer, literal)
+            self.vm_writer.write_pop(segment='static', index=index)
+        # marcamos el pool como construido
+        self.vm_writer.write_push(segment='constant', index=0)
+        self.vm_writer.write_unary(command='~')
+        self.vm_writer.write_pop(segment='static', index=self.string_pool.ready_index)
+        self.vm_writer.write_push(segment='constant', index=0)
+        self.vm_writer.write_return()
 
-        symbol = self._find_symbol_in_symbol_tables(symbol_name=self.tokenizer.identifier())
-        segment = symbol['kind']
-        index = symbol['index']
-        self.vm_writer.write_push(segment=segment, index=index)
+    def compile_string_pool_check(self, position):
+        """
+        inserta al inicio de la subrutina la llamada a la función del StringPool
+        si aún no se ha construido
+        """
+        check_writer = VMWriter()
+        check_writer.write_push(segment='static', index=self.string_pool.ready_index)
+        check_writer.write_ifgoto(label=StringPool.READY_LABEL)
+        check_writer.write_call(name=self.string_pool.function_name, num_args=0)
+        check_writer.write_pop(segment='temp', index=0)
+        check_writer.write_label(label=StringPool.READY_LABEL)
+        self.vm_writer.insert(position, check_writer.get_instructions())
 
-    def compile_array_expression(self):
+    def compile_symbol_push(self, reference):
 
-        symbol_name = self.tokenizer.current_token.text
-        symbol = self._find_symbol_in_symbol_tables(symbol_name=symbol_name)
-        # llegar a la expresión de índice
-        self.tokenizer.advance()
-        self.tokenizer.advance()
-        # compilamos
-        self.compile_expression()
-        self.vm_writer.write_push(segment='local', index=symbol['index'])
+        symbol = self._defined_symbol(symbol_name=reference.name)
+        self.vm_writer.write_push(segment=symbol.kind, index=symbol.index)
+
+    def compile_array_expression(self, reference):
+
+        symbol = self._defined_symbol(symbol_name=reference.name)
+        # compilamos la expresión de índice
+        self.compile_expression(reference.index)
+        self.vm_writer.write_push(segment=symbol.kind, index=symbol.index)
         # agregar dos direcciones: identificador y resultado de expresión
         self.vm_writer.write_arithmetic(command='+')
         self.vm_writer.write_pop(segment='pointer', index=1)
         # agreamos el valor a la pila
         self.vm_writer.write_push(segment='that', index=0)
 
-    def compile_subroutine_call(self):
+    def compile_subroutine_call(self, call):
         """
         example: Memory.peek(8000)
         """
-        subroutine_name = ''
-
-        while not self._starting_token_for('expression_list'):
-            subroutine_name += self.tokenizer.current_token.text
-            self.tokenizer.advance()
-        # obtenemos el numero de argumentos
-        num_args = self.compile_expression_list()
-        # después de enviar argumentos a la pila
-        self.vm_writer.write_call(name=subroutine_name, num_args=num_args)
-
-    def compile_expression_list(self):
-
         num_args = 0
 
-        if self._empty_expression_list():
-            return num_args
-
-        # iniciamos las expresiones
-        self.tokenizer.advance()
-
-        while self._not_terminal_token_for('expression_list'):
+        if call.receiver is None:
+            # método del objeto actual
+            self.vm_writer.write_push(segment='pointer', index=0)
+            subroutine_name = '{}.{}'.format(self.class_name, call.name)
             num_args += 1
-            self.compile_expression()
-            if self._another_expression_coming():
-                self.tokenizer.advance()
-        return num_args
-
-    def compile_return(self):
-        if self._not_terminal_token_for(keyword_token='return', position='next'):
-            self.compile_expression()
         else:
-            self.vm_writer.write_push(segment='constant', index='0')
-            self.tokenizer.advance()
-
-        self.vm_writer.write_return()
+            symbol = self._find_symbol_in_symbol_tables(symbol_name=call.receiver)
+            if symbol:
+                # llamando al objeto pasado como un argumento implicito
+                self.vm_writer.write_push(segment=symbol.kind, index=symbol.index)
+                subroutine_name = '{}.{}'.format(symbol.type, call.name)
+                num_args += 1
+            else:  # es decir función de una clase o llamada al os
+                subroutine_name = '{}.{}'.format(call.receiver, call.name)
 
-    def _not_terminal_token_for(self, keyword_token, position='current'):
-        if position == 'current':
-            return not self.tokenizer.current_token.text in self.TERMINATING_TOKENS[keyword_token]
-        elif position == 'next':
-            return not self.tokenizer.next_token.text in self.TERMINATING_TOKENS[keyword_token]
-
-    def _starting_token_for(self, keyword_token, position='current'):
-        if position == 'current':
-            return self.tokenizer.current_token.text in self.STARTING_TOKENS[keyword_token]
-        elif position == 'next':
-            return self.tokenizer.next_token.text in self.STARTING_TOKENS[keyword_token]
-
-    def _statement_token(self):
-        return self.tokenizer.current_token.is_statement_token()
+        # obtenemos el numero de argumentos
+        num_args += self.compile_expression_list(call.arguments)
+        # después de enviar argumentos a la pila
+        self.vm_writer.write_call(name=subroutine_name, num_args=num_args)
 
-    def _another_expression_coming(self):
-        return self.tokenizer.current_token.is_expression_list_delimiter()
+    def compile_expression_list(self, arguments):
+        for argument in arguments:
+            self.compile_expression(argument)
+        return len(arguments)
 
     def _find_symbol_in_symbol_tables(self, symbol_name):
-        if self.subroutine_symbol_table.find_symbol_by_name(symbol_name):
-            return self.subroutine_symbol_table.find_symbol_by_name(symbol_name)
-        elif self.class_symbol_table.find_symbol_by_name(symbol_name):
-            return self.class_symbol_table.find_symbol_by_name(symbol_name)
-
-    def _empty_expression_list(self):
-        return self._start_of_expression_list() and self._next_ends_expression_list()
+        # la tabla de la subrutina sigue hasta la de la clase
+        return self.subroutine_symbol_table.find_symbol_by_name(symbol_name)
 
-    def _start_of_expression_list(self):
-        return self.tokenizer.current_token.text in self.STARTING_TOKENS['expression_list']
-
-    def _next_ends_expression_list(self):
-        return self.tokenizer.next_token.text in self.TERMINATING_TOKENS['expression_list']
-
-    def _subroutine_call(self):
-        return self.tokenizer.identifier() and self.tokenizer.next_token.is_subroutine_call_delimiter()
-
-    def _array_expression(self):
-        return self.tokenizer.identifier() and self._starting_token_for(keyword_token='array', position='next')
-
-    def _part_of_expression_list(self):
-        return self.tokenizer.part_of_expression_list()
+    def _defined_symbol(self, symbol_name):
+        # una variable que no está en ninguna tabla no tiene segmento ni índice
+        symbol = self._find_symbol_in_symbol_tables(symbol_name=symbol_name)
+        if symbol is None:
+            raise NameError('{}: identificador no definido: {}'.format(self.subroutine_name, symbol_name))
+        return symbol
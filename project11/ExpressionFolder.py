@@ -0,0 +1,136 @@
+from JackAST import BinaryExpression, UnaryExpression, ParenthesizedExpression, IntegerConstant, KeywordConstant
+from Operator import Operator
+
+
+class ExpressionFolder():
+    """
+    simplifica expresiones del árbol antes de generar código
+
+    - plegado de constantes con la aritmética de 16 bits de hack: 2 * 3 + 1 -> 7
+    - identidades: x + 0, x - 0, x * 1, x / 1, x | 0, x & true, 0 + x, 1 * x, ...
+    - x * -1, x / -1 y 0 - x -> -x, doble negación: - - x -> x, ~ ~ x -> x
+    - c * x -> x * c con c constante, para que la multiplicación por una
+      potencia de dos quede a la derecha y se pueda generar con sumas
+
+    no entra en los argumentos de las llamadas ni en los índices de los arreglos,
+    esas expresiones se simplifican cuando se compilan; los operandos que se
+    eliminan siempre son constantes, así que no se pierde ningún efecto
+    """
+    KEYWORD_VALUES = {'true': -1, 'false': 0, 'null': 0}
+    BINARY_OPERATIONS = {
+        '+': lambda x, y: x + y,
+        '-': lambda x, y: x - y,
+        '*': lambda x, y: x * y,
+        '&': lambda x, y: x & y,
+        '|': lambda x, y: x | y,
+        '=': lambda x, y: -1 if x == y else 0,
+        '>': lambda x, y: -1 if x > y else 0,
+        '<': lambda x, y: -1 if x < y else 0
+    }
+    UNARY_OPERATIONS = {
+        '-': lambda x: -x,
+        '~': lambda x: ~x
+    }
+    # operaciones que devuelven el otro operando cuando uno es la constante
+    RIGHT_IDENTITIES = {'+': 0, '-': 0, '*': 1, '/': 1, '|': 0, '&': -1}
+    LEFT_IDENTITIES = {'+': 0, '*': 1, '|': 0, '&': -1}
+    MAX_CONSTANT = 32767
+
+    @classmethod
+    def fold(cls, expression):
+        """
+        expresión equivalente simplificada, los nodos de expression no se modifican
+        """
+        if isinstance(expression, BinaryExpression):
+            # la cadena de operadores se recorre hacia la izquierda sin recursión
+            operations = []
+            while isinstance(expression, BinaryExpression):
+                operations.append(expression)
+                expression = expression.left
+            folded = cls.fold(expression)
+            for operation in reversed(operations):
+                folded = cls._fold_binary(operation.operator, folded, cls.fold(operation.right))
+            return folded
+        elif isinstance(expression, UnaryExpression):
+            return cls._fold_unary(expression.operator, cls.fold(expression.term))
+        elif isinstance(expression, ParenthesizedExpression):
+            # el árbol ya tiene la agrupación, los paréntesis no generan código
+            return cls.fold(expression.expression)
+        return expression
+
+    @classmethod
+    def constant_value(cls, expression):
+        """
+        valor de 16 bits con signo de una expresión constante ya simplificada, o None
+        """
+        if isinstance(expression, IntegerConstant):
+            return expression.value
+        elif isinstance(expression, KeywordConstant):
+            return cls.KEYWORD_VALUES.get(expression.value)
+        elif isinstance(expression, UnaryExpression) and isinstance(expression.term, IntegerConstant):
+            return cls.to_word(cls.UNARY_OPERATIONS[expression.operator.token](expression.term.value))
+        return None
+
+    @classmethod
+    def power_of_two_exponent(cls, expression):
+        """
+        k si expression es la constante 2^k con k > 0, o None
+        """
+        value = cls.constant_value(expression)
+        if value is None or value < 2 or value & (value - 1):
+            return None
+        return value.bit_length() - 1
+
+    @classmethod
+    def constant(cls, value):
+        # el término más corto que vale value (16 bits con signo)
+        value = cls.to_word(value)
+        if value >= 0:
+            return IntegerConstant(value=value)
+        elif value >= -cls.MAX_CONSTANT:
+            return UnaryExpression(operator=Operator(token='-', category='unary'), term=IntegerConstant(value=-value))
+        return UnaryExpression(operator=Operator(token='~', category='unary'), term=IntegerConstant(value=cls.MAX_CONSTANT))
+
+    @classmethod
+    def to_word(cls, value):
+        value &= 0xFFFF
+        return value - 0x10000 if value & 0x8000 else value
+
+    @classmethod
+    def _fold_binary(cls, operator, left, right):
+        token = operator.token
+        left_value = cls.constant_value(left)
+        right_value = cls.constant_value(right)
+
+        if left_value is not None and right_value is not None:
+            if token == '/':
+                # Math.divide trunca hacia cero, la división por cero se deja para que falle al ejecutarse
+                if right_value != 0:
+                    quotient = abs(left_value) // abs(right_value)
+                    return cls.constant(quotient if (left_value < 0) == (right_value < 0) else -quotient)
+            else:
+                return cls.constant(cls.BINARY_OPERATIONS[token](left_value, right_value))
+
+        if right_value is not None and cls.RIGHT_IDENTITIES.get(token) == right_value:
+            return left
+        if left_value is not None and cls.LEFT_IDENTITIES.get(token) == left_value:
+            return right
+        if right_value == -1 and token in ('*', '/'):
+            return cls._fold_unary(Operator(token='-', category='unary'), left)
+        if left_value == -1 and token == '*':
+            return cls._fold_unary(Operator(token='-', category='unary'), right)
+        if left_value == 0 and token == '-':
+            return cls._fold_unary(Operator(token='-', category='unary'), right)
+        if left_value is not None and token == '*':
+            # la constante no tiene efectos, el orden de evaluación no cambia el resultado
+            return BinaryExpression(operator=operator, left=right, right=left)
+        return BinaryExpression(operator=operator, left=left, right=right)
+
+    @classmethod
+    def _fold_unary(cls, operator, term):
+        value = cls.constant_value(term)
+        if value is not None:
+            return cls.constant(cls.UNARY_OPERATIONS[operator.token](value))
+        if isinstance(term, UnaryExpression) and term.operator.token == operator.token:
+            return term.term
+        return UnaryExpression(operator=operator, term=term)
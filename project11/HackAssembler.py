@@ -0,0 +1,198 @@
+from array import array
+import argparse
+import os
+import sys
+
+
+class HackAssembler():
+    """
+    ensamblador de hack en dos pasadas: la primera guarda la dirección de cada
+    etiqueta en la tabla de símbolos, la segunda codifica cada instrucción en un
+    array('H') que ya tiene el tamaño del programa
+
+    las variables se asignan desde la dirección 16 en el orden en que aparecen,
+    cada línea distinta se codifica una sola vez
+    """
+    ROM_SIZE = 32768
+    MAX_CONSTANT = 32767
+    VARIABLE_BASE = 16
+    VARIABLE_END = 16384
+    PREDEFINED_SYMBOLS = dict(
+        [('R{}'.format(register), register) for register in range(16)],
+        SP=0,
+        LCL=1,
+        ARG=2,
+        THIS=3,
+        THAT=4,
+        SCREEN=16384,
+        KBD=24576
+    )
+    # bits a c1..c6, con M en lugar de A el bit a vale 1
+    COMPUTATIONS = {
+        '0': 0b0101010,
+        '1': 0b0111111,
+        '-1': 0b0111010,
+        'D': 0b0001100,
+        'A': 0b0110000,
+        '!D': 0b0001101,
+        '!A': 0b0110001,
+        '-D': 0b0001111,
+        '-A': 0b0110011,
+        'D+1': 0b0011111,
+        'A+1': 0b0110111,
+        'D-1': 0b0001110,
+        'A-1': 0b0110010,
+        'D+A': 0b0000010,
+        'D-A': 0b0010011,
+        'A-D': 0b0000111,
+        'D&A': 0b0000000,
+        'D|A': 0b0010101,
+        'M': 0b1110000,
+        '!M': 0b1110001,
+        '-M': 0b1110011,
+        'M+1': 0b1110111,
+        'M-1': 0b1110010,
+        'D+M': 0b1000010,
+        'D-M': 0b1010011,
+        'M-D': 0b1000111,
+        'D&M': 0b1000000,
+        'D|M': 0b1010101,
+        # operaciones conmutativas escritas al revés
+        'A+D': 0b0000010,
+        'A&D': 0b0000000,
+        'A|D': 0b0010101,
+        'M+D': 0b1000010,
+        'M&D': 0b1000000,
+        'M|D': 0b1010101
+    }
+    DESTINATION_BITS = {'A': 0b100, 'D': 0b010, 'M': 0b001}
+    JUMPS = {
+        '': 0b000,
+        'JGT': 0b001,
+        'JEQ': 0b010,
+        'JGE': 0b011,
+        'JLT': 0b100,
+        'JNE': 0b101,
+        'JLE': 0b110,
+        'JMP': 0b111
+    }
+    C_INSTRUCTION = 0b111 << 13
+
+    @classmethod
+    def assemble(cls, lines):
+        """
+        array('H') con una palabra por instrucción de las líneas de ensamblador
+        """
+        symbols = dict(cls.PREDEFINED_SYMBOLS)
+        instructions = []
+        for line_number, line in enumerate(lines, 1):
+            line = line.split('//', 1)[0].strip()
+            if ' ' in line or '\t' in line:
+                line = ''.join(line.split())
+            if not line:
+                continue
+            if line[0] == '(':
+                label = line[1:-1]
+                if line[-1] != ')' or not label or label[0].isdigit():
+                    raise SyntaxError('línea {}: etiqueta inválida {!r}'.format(line_number, line))
+                if label in symbols:
+                    raise SyntaxError('línea {}: símbolo definido dos veces: {}'.format(line_number, label))
+                symbols[label] = len(instructions)
+            else:
+                instructions.append((line_number, line))
+        if len(instructions) > cls.ROM_SIZE:
+            raise MemoryError('el programa no cabe en la rom: {} instrucciones'.format(len(instructions)))
+
+        rom = array('H', bytes(2 * len(instructions)))
+        codes = {}
+        next_variable = cls.VARIABLE_BASE
+        for position, (line_number, line) in enumerate(instructions):
+            code = codes.get(line)
+            if code is None:
+                if line[0] == '@':
+                    value = line[1:]
+                    if value.isdigit():
+                        code = int(value)
+                        if code > cls.MAX_CONSTANT:
+                            raise SyntaxError('línea {}: constante fuera de rango {!r}'.format(line_number, line))
+                    elif not value or value[0].isdigit():
+                        raise SyntaxError('línea {}: símbolo inválido {!r}'.format(line_number, line))
+                    else:
+                        code = symbols.get(value)
+                        if code is None:
+                            if next_variable >= cls.VARIABLE_END:
+                                raise MemoryError('las variables no caben en la memoria')
+                            code = symbols[value] = next_variable
+                            next_variable += 1
+                else:
+                    code = cls._c_instruction(line, line_number)
+                codes[line] = code
+            rom[position] = code
+        return rom
+
+    @classmethod
+    def _c_instruction(cls, line, line_number):
+        # dest=comp;jump, dest y jump son opcionales
+        destination, _, computation = line.rpartition('=')
+        computation, _, jump = computation.partition(';')
+        destination_bits = 0
+        for register in destination:
+            if register not in cls.DESTINATION_BITS:
+                raise SyntaxError('línea {}: destino inválido {!r}'.format(line_number, line))
+            destination_bits |= cls.DESTINATION_BITS[register]
+        if computation not in cls.COMPUTATIONS or jump not in cls.JUMPS:
+            raise SyntaxError('línea {}: instrucción inválida {!r}'.format(line_number, line))
+        return cls.C_INSTRUCTION | cls.COMPUTATIONS[computation] << 6 | destination_bits << 3 | cls.JUMPS[jump]
+
+    @classmethod
+    def write_hack(cls, rom, output_file):
+        """
+        formato .hack de nand2tetris: cada palabra en binario en su línea
+        """
+        output_file.write(''.join(['{:016b}\n'.format(word) for word in rom]))
+
+    @classmethod
+    def write_rom(cls, rom, output_file):
+        """
+        imagen de la rom: palabras de 16 bits big-endian, output_file abierto en modo binario
+        """
+        words = array('H', rom)
+        if sys.byteorder == 'little':
+            words.byteswap()
+        output_file.write(words.tobytes())
+
+    @classmethod
+    def read_rom(cls, input_file):
+        words = array('H', input_file.read())
+        if sys.byteorder == 'little':
+            words.byteswap()
+        return words
+
+    @classmethod
+    def report(cls, rom, output_file_name):
+        return '{}: {} palabras ({:.1%} de la ROM)'.format(output_file_name, len(rom), len(rom) / cls.ROM_SIZE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ensambla un archivo .asm de hack en un .hack o una imagen de rom")
+    parser.add_argument("source", help="archivo .asm")
+    parser.add_argument("-o", "--output", default=None,
+                        help="archivo de salida (por defecto junto al .asm)")
+    parser.add_argument("--rom", action="store_true",
+                        help="escribe una imagen binaria .rom en lugar del texto .hack")
+    args = parser.parse_args()
+
+    output_file_name = args.output or os.path.splitext(args.source)[0] + ('.rom' if args.rom else '.hack')
+    try:
+        with open(args.source, 'r') as input_file:
+            rom = HackAssembler.assemble(input_file)
+    except (SyntaxError, MemoryError) as error:
+        print('{}: {}: {}'.format(args.source, type(error).__name__, error), file=sys.stderr)
+        sys.exit(1)
+    if args.rom:
+        with open(output_file_name, 'wb') as output_file:
+            HackAssembler.write_rom(rom, output_file)
+    else:
+        with open(output_file_name, 'w') as output_file:
+            HackAssembler.write_hack(rom, output_file)
+    print(HackAssembler.report(rom, output_file_name))
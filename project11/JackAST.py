@@ -0,0 +1,95 @@
+class Node():
+    """
+    nodo del árbol sintáctico de una clase jack, los campos son los __slots__
+
+    las subrutinas y las sentencias guardan en line la línea del código fuente
+    donde empiezan, None si el tokenizador no lleva posiciones
+    """
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, fields.pop(field))
+        if fields:
+            raise TypeError('campos desconocidos para {}: {}'.format(type(self).__name__, ', '.join(fields)))
+
+
+class ClassNode(Node):
+    __slots__ = ('name', 'class_var_decs', 'subroutines')
+
+
+class ClassVarDec(Node):
+    # kind: static o field
+    __slots__ = ('kind', 'type', 'names')
+
+
+class SubroutineDec(Node):
+    # kind: constructor, function o method, parameters: lista de (tipo, nombre)
+    __slots__ = ('kind', 'return_type', 'name', 'parameters', 'var_decs', 'statements', 'line')
+
+
+class VarDec(Node):
+    __slots__ = ('type', 'names')
+
+
+class LetStatement(Node):
+    # index es None si no es una asignación a un arreglo
+    __slots__ = ('name', 'index', 'value', 'line')
+
+
+class IfStatement(Node):
+    # else_statements es None si no hay else
+    __slots__ = ('condition', 'statements', 'else_statements', 'line')
+
+
+class WhileStatement(Node):
+    __slots__ = ('condition', 'statements', 'line')
+
+
+class DoStatement(Node):
+    __slots__ = ('call', 'line')
+
+
+class ReturnStatement(Node):
+    # value es None en return;
+    __slots__ = ('value', 'line')
+
+
+class BinaryExpression(Node):
+    # right siempre es un término, las cadenas de operadores quedan hacia la izquierda
+    __slots__ = ('operator', 'left', 'right')
+
+
+class UnaryExpression(Node):
+    __slots__ = ('operator', 'term')
+
+
+class ParenthesizedExpression(Node):
+    __slots__ = ('expression',)
+
+
+class IntegerConstant(Node):
+    __slots__ = ('value',)
+
+
+class StringConstant(Node):
+    # value sin las comillas
+    __slots__ = ('value',)
+
+
+class KeywordConstant(Node):
+    # true, false, null o this
+    __slots__ = ('value',)
+
+
+class VariableReference(Node):
+    __slots__ = ('name',)
+
+
+class ArrayReference(Node):
+    __slots__ = ('name', 'index')
+
+
+class SubroutineCall(Node):
+    # receiver es None para name(...), o el nombre antes del punto en receiver.name(...)
+    __slots__ = ('receiver', 'name', 'arguments')
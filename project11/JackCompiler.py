@@ -1,5 +1,18 @@
 from JackTokenizer import JackTokenizer
 from CompilationEngine import CompilationEngine
+from CompilationCache import CompilationCache
+from ASTCache import ASTCache
+from JackParser import JackParser
+from VMOptimizer import VMOptimizer
+from VMSerializer import VMSerializer
+from WholeProgramOptimizer import WholeProgramOptimizer
+from VMInterpreter import VMInterpreter
+from VMTranslator import VMTranslator
+from HackAssembler import HackAssembler
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import collections
+import functools
 import sys
 import os
 import glob
@@ -8,10 +21,59 @@ import glob
 class JackCompiler():
     # Genera el archivo de salida en el directorio correspondiente
     @classmethod
-    def run(cls, input_file, output_file):
+    def run(cls, input_file, output_file, optimize=False, string_pool=False, compact_labels=False):
         tokenizer = JackTokenizer(input_file)
-        compiler = CompilationEngine(tokenizer, output_file)
+        compiler = CompilationEngine(
+            tokenizer, output_file, optimize=optimize, string_pool=string_pool, compact_labels=compact_labels
+        )
         compiler.compile_class()
+        return compiler
+
+    @classmethod
+    def run_tree(cls, class_node, output_file, optimize=False, string_pool=False, map_file=None, source_name=None,
+                 track_lines=False, compact_labels=False):
+        """
+        compila un árbol ya construido por JackParser
+        """
+        compiler = CompilationEngine(
+            None,
+            output_file,
+            optimize=optimize,
+            string_pool=string_pool,
+            map_file=map_file,
+            source_name=source_name,
+            track_lines=track_lines,
+            compact_labels=compact_labels
+        )
+        compiler.compile_class_node(class_node)
+        return compiler
+
+    @classmethod
+    def commands_for(cls, input_file):
+        """
+        compila en memoria y devuelve la lista de comandos vm
+        """
+        tokenizer = JackTokenizer(input_file)
+        compiler = CompilationEngine(tokenizer, output_file=None)
+        compiler.compile_class()
+        return compiler.vm_writer.get_commands()
+
+    @classmethod
+    def parse_file(cls, input_file_name, positions=False):
+        """
+        árbol de la clase del archivo, con positions las sentencias guardan su línea
+
+        sin positions un error de sintaxis se busca otra vez con positions
+        para que el mensaje diga la línea y la columna
+        """
+        with open(input_file_name, 'r') as input_file:
+            try:
+                return JackParser(JackTokenizer(input_file, positions=positions)).parse_class()
+            except SyntaxError:
+                if positions:
+                    raise
+        with open(input_file_name, 'r') as input_file:
+            return JackParser(JackTokenizer(input_file, positions=True)).parse_class()
 
     @classmethod
     def output_file_for(cls, input_file):
@@ -19,20 +81,365 @@ class JackCompiler():
         # generando el nombre del archivo de salida
         return "/".join(input_file.split("/")[:-1]) + "/" + file_name + ".vm"
 
+    @classmethod
+    def map_file_for(cls, input_file):
+        return cls.output_file_for(input_file) + ".map"
+
+    @classmethod
+    def input_files_for(cls, arg):
+        """
+        archivos .jack de arg, ordenados para que la salida sea determinista
+        """
+        # Determina sí es un directorio o un archivo
+        if os.path.isfile(arg):
+            return [arg]
+        elif os.path.isdir(arg):
+            return sorted(glob.glob(os.path.join(arg, "*.jack")))
+        return []
+
+    @classmethod
+    def map_files(cls, function, files, *arguments, jobs=None):
+        """
+        resultados de function para cada archivo de files (con los elementos de
+        arguments en la misma posición), repartidos en jobs procesos (por defecto
+        uno por cpu) y en el mismo orden que files
+        """
+        if jobs == 1 or len(files) < 2:
+            return [function(*call) for call in zip(files, *arguments)]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(function, files, *arguments))
+
+    @classmethod
+    def jobs_argument(cls, value):
+        """
+        tipo de argparse para --jobs: un número de procesos positivo
+        """
+        try:
+            jobs = int(value)
+        except ValueError:
+            jobs = 0
+        if jobs < 1:
+            raise argparse.ArgumentTypeError('se esperaba un número de procesos positivo: {!r}'.format(value))
+        return jobs
+
+    @classmethod
+    def is_whole_directory(cls, files):
+        """
+        True si files tiene todos los archivos .jack de cada directorio en el que está
+        """
+        names = {os.path.abspath(input_file_name) for input_file_name in files}
+        directories = {os.path.dirname(name) for name in names}
+        return bool(files) and all(
+            os.path.abspath(input_file_name) in names
+            for directory in directories
+            for input_file_name in glob.glob(os.path.join(directory, "*.jack"))
+        )
+
+    @classmethod
+    def library_files_for(cls, files):
+        """
+        archivos .vm junto a files que no salen de ningún .jack, como los del sistema operativo
+        """
+        compiled = {os.path.splitext(os.path.basename(input_file_name))[0] for input_file_name in files}
+        return [
+            file_name
+            for directory in sorted({os.path.dirname(input_file_name) or '.' for input_file_name in files})
+            for file_name in sorted(glob.glob(os.path.join(directory, '*.vm')))
+            if os.path.splitext(os.path.basename(file_name))[0] not in compiled
+        ]
+
+    @classmethod
+    def compile_file(cls, input_file_name, cached_tree=None, optimize=False, string_pool=False, keep_tree=False,
+                     in_memory=False, line_map=False, compact_labels=False):
+        """
+        compila un archivo .jack en su .vm,
+        devuelve (error, reporte, árbol, instrucciones) con el error como texto si falla y con optimize
+        el reporte de las instrucciones vm eliminadas
+
+        cached_tree: árbol serializado por ASTCache, se compila sin volver a analizar el archivo
+        keep_tree: devuelve el árbol serializado para guardarlo en la cache
+        in_memory: no escribe el .vm y devuelve las VMInstructions
+        line_map: escribe junto al .vm el .vm.map con la línea de cada instrucción,
+        con in_memory las líneas quedan en las VMInstructions
+        compact_labels: etiquetas de if y while con nombres cortos
+        """
+        output_file_name = cls.output_file_for(input_file_name)
+        tree = None
+        try:
+            if cached_tree is not None:
+                class_node = ASTCache.loads(cached_tree)
+            else:
+                class_node = cls.parse_file(input_file_name, positions=line_map)
+                if keep_tree:
+                    tree = ASTCache.dumps(class_node)
+
+            if in_memory:
+                compiler = cls.run_tree(
+                    class_node,
+                    None,
+                    optimize=optimize,
+                    string_pool=string_pool,
+                    track_lines=line_map,
+                    compact_labels=compact_labels
+                )
+            elif line_map:
+                with open(output_file_name, 'w') as output_file, open(cls.map_file_for(input_file_name), 'w') as map_file:
+                    compiler = cls.run_tree(
+                        class_node,
+                        output_file,
+                        optimize=optimize,
+                        string_pool=string_pool,
+                        map_file=map_file,
+                        source_name=os.path.basename(input_file_name),
+                        compact_labels=compact_labels
+                    )
+            else:
+                with open(output_file_name, 'w') as output_file:
+                    compiler = cls.run_tree(
+                        class_node, output_file, optimize=optimize, string_pool=string_pool, compact_labels=compact_labels
+                    )
+        except Exception as error:
+            return '{}: {}: {}'.format(input_file_name, type(error).__name__, error), None, None, None
+
+        instructions = compiler.vm_writer.get_instructions() if in_memory else None
+        if not optimize:
+            return None, None, tree, instructions
+        remaining = len(compiler.vm_writer.get_instructions())
+        removed = compiler.removed_instructions
+        return None, '{}: {} -> {} instrucciones vm (-{})'.format(
+            input_file_name,
+            remaining + removed,
+            remaining,
+            removed
+        ), tree, instructions
+
+    @classmethod
+    def compile_files(cls, files, jobs=None, cache=None, optimize=False, string_pool=False, whole_program=False,
+                      inline=False, line_map=False, compact_labels=False, machine_files=None):
+        """
+        compila los archivos repartidos en jobs procesos (por defecto uno por cpu),
+        devuelve (errores, reportes) en el mismo orden que files
+
+        con cache solo se compilan los archivos que no tienen una salida guardada,
+        y los que tienen su árbol guardado en la ASTCache no se vuelven a analizar;
+        la ASTCache usa el mismo max_size que cache, así .jackcache ocupa hasta
+        dos veces cache.max_size (la línea de comandos le da a cada una la mitad)
+
+        whole_program: las clases se compilan en memoria y antes de escribirlas se
+        eliminan las funciones a las que no se llega desde los puntos de entrada,
+        la salida depende de todo el programa y no se guarda en la cache
+        inline: además expande las llamadas a subrutinas triviales, implica whole_program
+
+        whole_program e inline solo se aplican si files tiene todas las clases de su
+        directorio, sin alguna el grafo de llamadas no ve las llamadas que hace y se
+        eliminarían funciones que sí se usan
+        line_map: escribe el .vm.map de cada archivo, la cache de .vm no guarda los mapas
+        y no se usa, la de árboles sí
+        machine_files: diccionario formato ('asm', 'hack' o 'rom') -> archivo, además traduce
+        las clases en memoria, junto con los .vm del directorio que no salen de ningún
+        .jack, a un solo programa de hack y lo escribe en cada formato
+        """
+        if not cls.is_whole_directory(files):
+            whole_program = inline = False
+        whole_program = whole_program or inline
+        in_memory = whole_program or bool(machine_files)
+        output_cache = cache and not (in_memory or line_map)
+        options = ' '.join(option for option, enabled in (
+            ('-O', optimize), ('--string-pool', string_pool), ('--compact-labels', compact_labels)
+        ) if enabled)
+        pending = files
+        cached_trees = [None] * len(files)
+        keys = {}
+        tree_keys = {}
+        if cache:
+            tree_cache = ASTCache(os.path.join(cache.directory, ASTCache.DIRECTORY_NAME), max_size=cache.max_size)
+            pending = []
+            cached_trees = []
+            for input_file_name in files:
+                with open(input_file_name, 'rb') as input_file:
+                    source = input_file.read()
+                keys[input_file_name] = cache.key_for(source, options=options)
+                if not output_cache or not cache.get(keys[input_file_name], cls.output_file_for(input_file_name)):
+                    pending.append(input_file_name)
+                    # los árboles sin líneas no sirven para los mapas
+                    tree_keys[input_file_name] = tree_cache.key_for(source, options='--map' if line_map else '')
+                    cached_trees.append(tree_cache.read(tree_keys[input_file_name]))
+
+        compile_file = functools.partial(
+            cls.compile_file,
+            optimize=optimize,
+            string_pool=string_pool,
+            keep_tree=bool(cache),
+            in_memory=in_memory,
+            line_map=line_map,
+            compact_labels=compact_labels
+        )
+        results = cls.map_files(compile_file, pending, cached_trees, jobs=jobs)
+
+        if cache:
+            for input_file_name, (error, _, tree, _) in zip(pending, results):
+                if error:
+                    continue
+                if output_cache:
+                    cache.put(keys[input_file_name], cls.output_file_for(input_file_name))
+                if tree is not None:
+                    tree_cache.write(tree_keys[input_file_name], tree)
+            cache.save()
+            tree_cache.save()
+        errors = [error for error, _, _, _ in results if error]
+        reports = [report for _, report, _, _ in results if report]
+        if in_memory:
+            try:
+                reports.extend(cls.write_program(
+                    {input_file_name: instructions for input_file_name, (_, _, _, instructions) in zip(pending, results)
+                     if instructions is not None},
+                    complete=not errors,
+                    whole_program=whole_program,
+                    inline=inline,
+                    optimize=optimize,
+                    line_map=line_map,
+                    machine_files=machine_files
+                ))
+            except (NameError, SyntaxError, MemoryError) as error:
+                errors.append('{}: {}: {}'.format(
+                    ', '.join(machine_files.values()), type(error).__name__, error
+                ))
+        return errors, reports
+
+    @classmethod
+    def write_program(cls, programs, complete=True, whole_program=True, inline=False, optimize=False, line_map=False,
+                      machine_files=None):
+        """
+        escribe el .vm de cada archivo de programs (archivo .jack -> VMInstructions),
+        con whole_program y el programa completo antes quita las funciones que nunca
+        se llaman y devuelve el reporte de lo eliminado
+
+        inline: antes expande las llamadas a subrutinas triviales y reporta cada llamada
+        expandida y la diferencia de instrucciones, con optimize se vuelve a aplicar
+        VMOptimizer a los archivos que cambiaron
+        line_map: escribe también el .vm.map de cada archivo
+        machine_files: diccionario formato ('asm', 'hack' o 'rom') -> archivo, con el programa
+        completo lo traduce con VMTranslator, lo ensambla con HackAssembler si hace falta y
+        reporta su número de instrucciones
+
+        con algún archivo sin compilar el grafo de llamadas no es fiable y se escribe todo
+        """
+        reports = []
+        if complete and inline:
+            inlined, sites = WholeProgramOptimizer.inline_accessors(programs)
+            for input_file_name, calls in sites.items():
+                if optimize:
+                    inlined[input_file_name] = VMOptimizer.optimize(inlined[input_file_name])
+                before = len(programs[input_file_name])
+                after = len(inlined[input_file_name])
+                reports.append('{}: {} llamadas expandidas, {} -> {} instrucciones vm ({:+d})'.format(
+                    input_file_name,
+                    len(calls),
+                    before,
+                    after,
+                    after - before
+                ))
+                counts = collections.Counter(calls)
+                for (caller, callee), count in counts.items():
+                    reports.append('    {} en {} ({})'.format(callee, caller, count))
+            programs = inlined
+
+        if complete and whole_program:
+            programs, removed = WholeProgramOptimizer.remove_unreachable(programs)
+            for input_file_name, functions in removed.items():
+                reports.append('{}: {} funciones sin llamadas eliminadas (-{} instrucciones vm): {}'.format(
+                    input_file_name,
+                    len(functions),
+                    sum(size for _, size in functions),
+                    ', '.join(function_name for function_name, _ in functions)
+                ))
+
+        for input_file_name, instructions in programs.items():
+            with open(cls.output_file_for(input_file_name), 'w') as output_file:
+                VMSerializer.write(instructions, output_file)
+            if line_map:
+                with open(cls.map_file_for(input_file_name), 'w') as map_file:
+                    VMSerializer.write_map(instructions, map_file, os.path.basename(input_file_name))
+
+        if complete and machine_files:
+            library = VMInterpreter.read_files(cls.library_files_for(list(programs)))
+            translator = VMTranslator(dict(programs, **library))
+            if 'asm' in machine_files:
+                with open(machine_files['asm'], 'w') as output_file:
+                    translator.write(output_file)
+                reports.append(translator.report(machine_files['asm']))
+            if 'hack' in machine_files or 'rom' in machine_files:
+                rom = HackAssembler.assemble(translator.lines)
+                if 'hack' in machine_files:
+                    with open(machine_files['hack'], 'w') as output_file:
+                        HackAssembler.write_hack(rom, output_file)
+                    reports.append(HackAssembler.report(rom, machine_files['hack']))
+                if 'rom' in machine_files:
+                    with open(machine_files['rom'], 'wb') as output_file:
+                        HackAssembler.write_rom(rom, output_file)
+                    reports.append(HackAssembler.report(rom, machine_files['rom']))
+        return reports
+
+    @classmethod
+    def cache_directory_for(cls, arg):
+        source_directory = arg if os.path.isdir(arg) else os.path.dirname(arg)
+        return os.path.join(source_directory, CompilationCache.DIRECTORY_NAME)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="compila archivos .jack a codigo vm")
+    parser.add_argument("source", help="archivo .jack o directorio con archivos .jack")
+    parser.add_argument("-j", "--jobs", type=JackCompiler.jobs_argument, default=None,
+                        help="procesos en paralelo (por defecto el numero de cpus)")
+    parser.add_argument("--cache", action="store_true",
+                        help="reutiliza la salida de los archivos sin cambios desde .jackcache")
+    parser.add_argument("--cache-size", type=int, default=CompilationCache.DEFAULT_MAX_SIZE // (1024 * 1024),
+                        help="tamaño maximo de la cache en MB, la mitad para los .vm y la mitad para los arboles")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="aplica la optimizacion peephole al codigo vm")
+    parser.add_argument("--string-pool", action="store_true",
+                        help="construye cada literal de cadena una sola vez por clase")
+    parser.add_argument("--whole-program", action="store_true",
+                        help="elimina las funciones a las que no se llega desde Main.main o Sys.init")
+    parser.add_argument("--inline", action="store_true",
+                        help="expande las llamadas a getters y setters triviales, implica --whole-program")
+    parser.add_argument("--map", action="store_true",
+                        help="escribe junto a cada .vm un .vm.map con la línea de cada instrucción")
+    parser.add_argument("--compact-labels", action="store_true",
+                        help="etiquetas de if y while con nombres cortos (W0, T1, ...)")
+    parser.add_argument("--asm", action="store_true",
+                        help="traduce el programa y los .vm del directorio (el sistema operativo) a un .asm de hack")
+    parser.add_argument("--hack", action="store_true",
+                        help="como --asm pero ensambla el programa en un .hack")
+    parser.add_argument("--rom", action="store_true",
+                        help="como --asm pero ensambla el programa en una imagen binaria .rom")
+    args = parser.parse_args()
+    if (args.whole_program or args.inline) and not os.path.isdir(args.source):
+        parser.error("--whole-program e --inline necesitan un directorio con todas las clases del programa")
 
-if __name__ == "__main__" and len(sys.argv) == 2:
-    arg = sys.argv[1]
-    # Determina sí es un directorio o un archivo,
-    # y finalmente elige la ruta destino
-    if os.path.isfile(arg):
-        files = [arg]
-    elif os.path.isdir(arg):
-        jack_path = os.path.join(arg, "*.jack")
-        files = glob.glob(jack_path)
-
-    # create output directory - MAY NEED TO REMOVE
-    for input_file_name in files:
-        output_file_name = JackCompiler.output_file_for(input_file_name)
-        output_file = open(output_file_name, 'w')
-        input_file = open(input_file_name, 'r')
-        JackCompiler.run(input_file, output_file)
+    cache = None
+    if args.cache:
+        cache = CompilationCache(
+            JackCompiler.cache_directory_for(args.source),
+            max_size=args.cache_size * 1024 * 1024 // 2
+        )
+    errors, reports = JackCompiler.compile_files(
+        JackCompiler.input_files_for(args.source),
+        jobs=args.jobs,
+        cache=cache,
+        optimize=args.optimize,
+        string_pool=args.string_pool,
+        whole_program=args.whole_program,
+        inline=args.inline,
+        line_map=args.map,
+        compact_labels=args.compact_labels,
+        machine_files={
+            machine_format: VMTranslator.output_file_for(args.source, '.' + machine_format)
+            for machine_format in ('asm', 'hack', 'rom') if getattr(args, machine_format)
+        }
+    )
+    for report in reports:
+        print(report)
+    for error in errors:
+        print(error, file=sys.stderr)
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,338 @@
+import math
+
+
+class JackOS():
+    """
+    implementación en python del sistema operativo de jack para VMInterpreter
+
+    trabaja sobre la misma memoria que el programa: el heap, las cadenas y la
+    pantalla viven en memory con la distribución de la plataforma hack, así
+    los objetos creados por el sistema operativo se pueden pasar al código vm
+
+    una cadena ocupa un bloque del heap: largo máximo, largo y los caracteres
+
+    las clases que el programa define en sus propios .vm reemplazan a estas,
+    pero una implementación propia de String debe usarse completa porque
+    Output y Keyboard leen las cadenas con esta distribución
+    """
+    HEAP_BASE = 2048
+    HEAP_END = 16384
+    SCREEN = 16384
+    SCREEN_WORDS = 8192
+    SCREEN_WIDTH = 512
+    SCREEN_HEIGHT = 256
+    KEYBOARD = 24576
+
+    BACKSPACE = 129
+    DOUBLE_QUOTE = 34
+    NEW_LINE = 128
+
+    # códigos de error de Sys.error del sistema operativo de nand2tetris
+    DIVISION_BY_ZERO = 3
+    NEGATIVE_SQUARE_ROOT = 4
+    ALLOCATION_SIZE = 5
+    HEAP_OVERFLOW = 6
+    NEGATIVE_STRING_LENGTH = 14
+    STRING_INDEX = 15
+    STRING_FULL = 17
+    STRING_EMPTY = 18
+
+    def __init__(self, memory, input_text=''):
+        """
+        input_text: lo que lee Keyboard, carácter por carácter
+        """
+        self.memory = memory
+        self.input = list(reversed(input_text))
+        self.output = []
+        self.halted = False
+        self.error_code = None
+        self.color = True
+        # bloques libres: dirección -> tamaño, el tamaño de cada bloque está en memory[dirección - 1]
+        self.free_blocks = {}
+        self.heap_top = self.HEAP_BASE
+
+    def functions(self):
+        """
+        diccionario nombre vm -> función de python que recibe los argumentos y devuelve el valor
+        """
+        return {
+            'Math.init': self.no_operation,
+            'Math.multiply': self.math_multiply,
+            'Math.divide': self.math_divide,
+            'Math.min': min,
+            'Math.max': max,
+            'Math.abs': self.math_abs,
+            'Math.sqrt': self.math_sqrt,
+            'Memory.init': self.no_operation,
+            'Memory.peek': self.memory_peek,
+            'Memory.poke': self.memory_poke,
+            'Memory.alloc': self.memory_alloc,
+            'Memory.deAlloc': self.memory_dealloc,
+            'Array.new': self.memory_alloc,
+            'Array.dispose': self.memory_dealloc,
+            'String.new': self.string_new,
+            'String.dispose': self.memory_dealloc,
+            'String.length': self.string_length,
+            'String.charAt': self.string_char_at,
+            'String.setCharAt': self.string_set_char_at,
+            'String.appendChar': self.string_append_char,
+            'String.eraseLastChar': self.string_erase_last_char,
+            'String.intValue': self.string_int_value,
+            'String.setInt': self.string_set_int,
+            'String.backSpace': lambda: self.BACKSPACE,
+            'String.doubleQuote': lambda: self.DOUBLE_QUOTE,
+            'String.newLine': lambda: self.NEW_LINE,
+            'Output.init': self.no_operation,
+            'Output.moveCursor': self.output_move_cursor,
+            'Output.printChar': self.output_print_char,
+            'Output.printString': self.output_print_string,
+            'Output.printInt': self.output_print_int,
+            'Output.println': self.output_println,
+            'Output.backSpace': self.output_back_space,
+            'Screen.init': self.no_operation,
+            'Screen.clearScreen': self.screen_clear,
+            'Screen.setColor': self.screen_set_color,
+            'Screen.drawPixel': self.screen_draw_pixel,
+            'Screen.drawLine': self.screen_draw_line,
+            'Screen.drawRectangle': self.screen_draw_rectangle,
+            'Screen.drawCircle': self.screen_draw_circle,
+            'Keyboard.init': self.no_operation,
+            'Keyboard.keyPressed': self.keyboard_key_pressed,
+            'Keyboard.readChar': self.keyboard_read_char,
+            'Keyboard.readLine': self.keyboard_read_line,
+            'Keyboard.readInt': self.keyboard_read_int,
+            'Sys.init': self.no_operation,
+            'Sys.halt': self.sys_halt,
+            'Sys.error': self.sys_error,
+            'Sys.wait': self.no_operation
+        }
+
+    @classmethod
+    def to_word(cls, value):
+        # entero de 16 bits con signo
+        value &= 0xFFFF
+        return value - 0x10000 if value & 0x8000 else value
+
+    def no_operation(self, *args):
+        return 0
+
+    def math_multiply(self, x, y):
+        return self.to_word(x * y)
+
+    def math_divide(self, x, y):
+        if y == 0:
+            return self.sys_error(self.DIVISION_BY_ZERO)
+        quotient = abs(x) // abs(y)
+        return self.to_word(quotient if (x < 0) == (y < 0) else -quotient)
+
+    def math_abs(self, x):
+        # abs(-32768) no cabe en 16 bits y vuelve a ser -32768, como en hack
+        return self.to_word(abs(x))
+
+    def math_sqrt(self, x):
+        if x < 0:
+            return self.sys_error(self.NEGATIVE_SQUARE_ROOT)
+        return math.isqrt(x)
+
+    def memory_peek(self, address):
+        return self.memory[self.memory_address(address)]
+
+    def memory_poke(self, address, value):
+        self.memory[self.memory_address(address)] = value
+        return 0
+
+    def memory_address(self, address):
+        # una dirección negativa indexaría memory desde el final
+        if not 0 <= address < len(self.memory):
+            raise IndexError('dirección fuera de la memoria: {}'.format(address))
+        return address
+
+    def memory_alloc(self, size):
+        if size < 0:
+            return self.sys_error(self.ALLOCATION_SIZE)
+        size = max(size, 1)
+        for address, block_size in self.free_blocks.items():
+            if block_size >= size:
+                del self.free_blocks[address]
+                return address
+        address = self.heap_top + 1
+        if address + size > self.HEAP_END:
+            return self.sys_error(self.HEAP_OVERFLOW)
+        self.memory[address - 1] = size
+        self.heap_top = address + size
+        return address
+
+    def memory_dealloc(self, address):
+        self.free_blocks[address] = self.memory[address - 1]
+        return 0
+
+    def string_new(self, max_length):
+        if max_length < 0:
+            return self.sys_error(self.NEGATIVE_STRING_LENGTH)
+        address = self.memory_alloc(max_length + 2)
+        if not self.halted:
+            self.memory[address] = max_length
+            self.memory[address + 1] = 0
+        return address
+
+    def string_length(self, string):
+        return self.memory[string + 1]
+
+    def string_char_at(self, string, index):
+        if not 0 <= index < self.memory[string + 1]:
+            return self.sys_error(self.STRING_INDEX)
+        return self.memory[string + 2 + index]
+
+    def string_set_char_at(self, string, index, character):
+        if not 0 <= index < self.memory[string + 1]:
+            return self.sys_error(self.STRING_INDEX)
+        self.memory[string + 2 + index] = character
+        return 0
+
+    def string_append_char(self, string, character):
+        length = self.memory[string + 1]
+        if length >= self.memory[string]:
+            return self.sys_error(self.STRING_FULL)
+        self.memory[string + 2 + length] = character
+        self.memory[string + 1] = length + 1
+        return string
+
+    def string_erase_last_char(self, string):
+        if self.memory[string + 1] == 0:
+            return self.sys_error(self.STRING_EMPTY)
+        self.memory[string + 1] -= 1
+        return 0
+
+    def string_int_value(self, string):
+        text = self.read_string(string)
+        sign = -1 if text.startswith('-') else 1
+        digits = ''
+        for character in text[1:] if sign < 0 else text:
+            if not character.isdigit():
+                break
+            digits += character
+        return self.to_word(sign * int(digits or '0'))
+
+    def string_set_int(self, string, value):
+        text = str(value)
+        if len(text) > self.memory[string]:
+            return self.sys_error(self.STRING_FULL)
+        self.write_string(string, text)
+        return 0
+
+    def read_string(self, string):
+        length = self.memory[string + 1]
+        return ''.join(chr(character) for character in self.memory[string + 2:string + 2 + length])
+
+    def write_string(self, string, text):
+        self.memory[string + 1] = len(text)
+        self.memory[string + 2:string + 2 + len(text)] = [ord(character) for character in text]
+
+    def output_move_cursor(self, row, column):
+        return 0
+
+    def output_print_char(self, character):
+        if character == self.NEW_LINE:
+            self.output.append('\n')
+        elif character == self.BACKSPACE:
+            self.output_back_space()
+        else:
+            self.output.append(chr(character))
+        return 0
+
+    def output_print_string(self, string):
+        self.output.append(self.read_string(string))
+        return 0
+
+    def output_print_int(self, value):
+        self.output.append(str(value))
+        return 0
+
+    def output_println(self):
+        self.output.append('\n')
+        return 0
+
+    def output_back_space(self):
+        if self.output:
+            self.output[-1] = self.output[-1][:-1]
+        return 0
+
+    def screen_clear(self):
+        self.memory[self.SCREEN:self.SCREEN + self.SCREEN_WORDS] = [0] * self.SCREEN_WORDS
+        return 0
+
+    def screen_set_color(self, color):
+        self.color = bool(color)
+        return 0
+
+    def screen_draw_pixel(self, x, y):
+        if not (0 <= x < self.SCREEN_WIDTH and 0 <= y < self.SCREEN_HEIGHT):
+            return 0
+        address = self.SCREEN + y * (self.SCREEN_WIDTH // 16) + x // 16
+        word = self.memory[address] & 0xFFFF
+        bit = 1 << (x % 16)
+        self.memory[address] = self.to_word(word | bit if self.color else word & ~bit)
+        return 0
+
+    def screen_draw_line(self, x1, y1, x2, y2):
+        # bresenham
+        dx, dy = abs(x2 - x1), -abs(y2 - y1)
+        step_x, step_y = (1 if x1 < x2 else -1), (1 if y1 < y2 else -1)
+        error = dx + dy
+        while True:
+            self.screen_draw_pixel(x1, y1)
+            if x1 == x2 and y1 == y2:
+                return 0
+            if 2 * error >= dy:
+                error += dy
+                x1 += step_x
+            if 2 * error <= dx:
+                error += dx
+                y1 += step_y
+
+    def screen_draw_rectangle(self, x1, y1, x2, y2):
+        for y in range(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                self.screen_draw_pixel(x, y)
+        return 0
+
+    def screen_draw_circle(self, x, y, radius):
+        for dy in range(-radius, radius + 1):
+            dx = math.isqrt(radius * radius - dy * dy)
+            for column in range(x - dx, x + dx + 1):
+                self.screen_draw_pixel(column, y + dy)
+        return 0
+
+    def keyboard_key_pressed(self):
+        return 0
+
+    def keyboard_read_char(self):
+        if not self.input:
+            # sin más entrada el programa no puede continuar
+            return self.sys_halt()
+        character = self.input.pop()
+        return self.NEW_LINE if character == '\n' else ord(character)
+
+    def keyboard_read_line(self, message):
+        self.output_print_string(message)
+        text = ''
+        while self.input and self.input[-1] != '\n':
+            text += self.input.pop()
+        if self.input:
+            self.input.pop()
+        string = self.string_new(len(text))
+        if not self.halted:
+            self.write_string(string, text)
+        return string
+
+    def keyboard_read_int(self, message):
+        return self.string_int_value(self.keyboard_read_line(message))
+
+    def sys_halt(self):
+        self.halted = True
+        return 0
+
+    def sys_error(self, code):
+        self.output.append('ERR{}'.format(code))
+        self.error_code = code
+        return self.sys_halt()
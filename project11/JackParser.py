@@ -0,0 +1,269 @@
+from JackAST import (
+    ClassNode, ClassVarDec, SubroutineDec, VarDec,
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    BinaryExpression, UnaryExpression, ParenthesizedExpression,
+    IntegerConstant, StringConstant, KeywordConstant,
+    VariableReference, ArrayReference, SubroutineCall
+)
+from Operator import Operator
+
+
+class JackParser():
+    """
+    analizador descendente recursivo: recorre los tokens una sola vez y
+    construye el árbol de la clase, mirando como máximo el token siguiente
+    """
+    KEYWORD_CONSTANTS = frozenset(['true', 'false', 'null', 'this'])
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.statement_parse_methods = {
+            'let': self.parse_let,
+            'if': self.parse_if,
+            'while': self.parse_while,
+            'do': self.parse_do,
+            'return': self.parse_return
+        }
+
+    def parse_class(self):
+        # omitimos todo hasta el comienzo de la clase
+        while not self.tokenizer.class_token_reached():
+            if not self.tokenizer.has_more_tokens:
+                raise self._error('no se encontró la palabra class')
+            self.tokenizer.advance()
+
+        self._expect('class')
+        name = self._identifier()
+        self._expect('{')
+
+        class_var_decs = []
+        while self._current().starts_class_var_dec():
+            class_var_decs.append(self.parse_class_var_dec())
+
+        subroutines = []
+        while self._current().starts_subroutine():
+            subroutines.append(self.parse_subroutine())
+
+        self._expect('}')
+        return ClassNode(name=name, class_var_decs=class_var_decs, subroutines=subroutines)
+
+    def parse_class_var_dec(self):
+        kind = self._take()
+        symbol_type = self._take()
+        names = self._identifier_list()
+        return ClassVarDec(kind=kind, type=symbol_type, names=names)
+
+    def parse_subroutine(self):
+        line = self._current().line
+        kind = self._take()
+        return_type = self._take()
+        name = self._identifier()
+
+        self._expect('(')
+        parameters = self.parse_parameter_list()
+        self._expect(')')
+
+        self._expect('{')
+        var_decs = []
+        while self._current().text == 'var':
+            var_decs.append(self.parse_var_dec())
+        statements = self.parse_statements()
+        self._expect('}')
+
+        return SubroutineDec(
+            kind=kind,
+            return_type=return_type,
+            name=name,
+            parameters=parameters,
+            var_decs=var_decs,
+            statements=statements,
+            line=line
+        )
+
+    def parse_parameter_list(self):
+        parameters = []
+        if self._current().text == ')':
+            return parameters
+
+        parameters.append((self._take(), self._identifier()))
+        while self._current().is_expression_list_delimiter():
+            self.tokenizer.advance()
+            parameters.append((self._take(), self._identifier()))
+        return parameters
+
+    def parse_var_dec(self):
+        self._expect('var')
+        symbol_type = self._take()
+        return VarDec(type=symbol_type, names=self._identifier_list())
+
+    def parse_statements(self):
+        statements = []
+        while self._current().is_statement_token():
+            statements.append(self.statement_parse_methods[self._current().text]())
+        return statements
+
+    def parse_let(self):
+        line = self._current().line
+        self._expect('let')
+        name = self._identifier()
+
+        index = None
+        if self._current().text == '[':
+            self.tokenizer.advance()
+            index = self.parse_expression()
+            self._expect(']')
+
+        self._expect('=')
+        value = self.parse_expression()
+        self._expect(';')
+        return LetStatement(name=name, index=index, value=value, line=line)
+
+    def parse_if(self):
+        line = self._current().line
+        self._expect('if')
+        condition = self._parenthesized_condition()
+        statements = self._block()
+
+        else_statements = None
+        if self._current().text == 'else':
+            self.tokenizer.advance()
+            else_statements = self._block()
+        return IfStatement(condition=condition, statements=statements, else_statements=else_statements, line=line)
+
+    def parse_while(self):
+        line = self._current().line
+        self._expect('while')
+        condition = self._parenthesized_condition()
+        return WhileStatement(condition=condition, statements=self._block(), line=line)
+
+    def parse_do(self):
+        line = self._current().line
+        self._expect('do')
+        call = self.parse_subroutine_call(self._identifier())
+        self._expect(';')
+        return DoStatement(call=call, line=line)
+
+    def parse_return(self):
+        line = self._current().line
+        self._expect('return')
+        value = None
+        if self._current().text != ';':
+            value = self.parse_expression()
+        self._expect(';')
+        return ReturnStatement(value=value, line=line)
+
+    def parse_expression(self):
+        """
+        term (op term)*, los operadores se aplican de izquierda a derecha
+        """
+        expression = self.parse_term()
+        while self._current().is_operator():
+            operator = Operator(token=self._take(), category='bi')
+            expression = BinaryExpression(operator=operator, left=expression, right=self.parse_term())
+        return expression
+
+    def parse_term(self):
+        token = self._current()
+
+        if token.type == token.INT_CONST:
+            self.tokenizer.advance()
+            return IntegerConstant(value=int(token.text))
+        elif token.is_string_const():
+            self.tokenizer.advance()
+            return StringConstant(value=token.text[1:-1])
+        elif token.text in self.KEYWORD_CONSTANTS:
+            self.tokenizer.advance()
+            return KeywordConstant(value=token.text)
+        elif token.text == '(':
+            self.tokenizer.advance()
+            expression = self.parse_expression()
+            self._expect(')')
+            return ParenthesizedExpression(expression=expression)
+        elif token.is_unary_operator():
+            self.tokenizer.advance()
+            return UnaryExpression(operator=Operator(token=token.text, category='unary'), term=self.parse_term())
+        elif token.is_identifier():
+            name = self._identifier()
+            if self._current().text == '[':
+                self.tokenizer.advance()
+                index = self.parse_expression()
+                self._expect(']')
+                return ArrayReference(name=name, index=index)
+            elif self._current().text in ('(', '.'):
+                return self.parse_subroutine_call(name)
+            return VariableReference(name=name)
+
+        raise self._error('término inesperado: {!r}'.format(token.text))
+
+    def parse_subroutine_call(self, name):
+        """
+        name ya fue consumido: name(...) o name.subrutina(...)
+        """
+        receiver = None
+        if self._current().is_subroutine_call_delimiter():
+            self.tokenizer.advance()
+            receiver = name
+            name = self._identifier()
+
+        self._expect('(')
+        arguments = self.parse_expression_list()
+        self._expect(')')
+        return SubroutineCall(receiver=receiver, name=name, arguments=arguments)
+
+    def parse_expression_list(self):
+        arguments = []
+        if self._current().text == ')':
+            return arguments
+
+        arguments.append(self.parse_expression())
+        while self._current().is_expression_list_delimiter():
+            self.tokenizer.advance()
+            arguments.append(self.parse_expression())
+        return arguments
+
+    def _parenthesized_condition(self):
+        self._expect('(')
+        condition = self.parse_expression()
+        self._expect(')')
+        return condition
+
+    def _block(self):
+        self._expect('{')
+        statements = self.parse_statements()
+        self._expect('}')
+        return statements
+
+    def _identifier_list(self):
+        # name (',' name)* ';'
+        names = [self._identifier()]
+        while self._current().is_expression_list_delimiter():
+            self.tokenizer.advance()
+            names.append(self._identifier())
+        self._expect(';')
+        return names
+
+    def _current(self):
+        return self.tokenizer.current_token
+
+    def _take(self):
+        # devuelve el texto del token actual y avanza
+        text = self._current().text
+        self.tokenizer.advance()
+        return text
+
+    def _identifier(self):
+        if not self._current().is_identifier():
+            raise self._error('se esperaba un identificador y se encontró {!r}'.format(self._current().text))
+        return self._take()
+
+    def _expect(self, text):
+        if self._current().text != text:
+            raise self._error('se esperaba {!r} y se encontró {!r}'.format(text, self._current().text))
+        self.tokenizer.advance()
+
+    def _error(self, message):
+        # con la posición del token actual si el tokenizador la conoce
+        token = self._current()
+        if token is not None and token.line is not None:
+            message = 'línea {}, columna {}: {}'.format(token.line, token.column, message)
+        return SyntaxError(message)
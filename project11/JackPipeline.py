@@ -0,0 +1,122 @@
+from JackTokenizer import JackTokenizer
+from JackParser import JackParser
+from JackCompiler import JackCompiler
+from ParseTreeWriter import ParseTreeWriter
+from SymbolDump import SymbolDump
+import argparse
+import functools
+import sys
+import os
+
+
+class JackPipeline():
+    """
+    analiza cada archivo .jack una sola vez y pasa el árbol a varios backends:
+    el árbol xml de project10, el código vm y las tablas de símbolos
+
+    cada backend es una función (árbol, archivo de salida); para agregar uno
+    basta con agregarlo en backends y su extensión en EXTENSIONS
+    """
+    EXTENSIONS = {
+        'xml': '.xml',
+        'vm': '.vm',
+        'symbols': '.sym'
+    }
+    BACKENDS = tuple(EXTENSIONS)
+
+    @classmethod
+    def backends(cls, optimize=False, string_pool=False, compact_labels=False, indent=0, newlines=True):
+        """
+        diccionario backend -> función que escribe el árbol de una clase en un archivo
+        """
+        return {
+            'xml': lambda class_node, output_file: ParseTreeWriter(
+                output_file, indent=indent, newlines=newlines
+            ).write_class(class_node),
+            'vm': lambda class_node, output_file: JackCompiler.run_tree(
+                class_node, output_file, optimize=optimize, string_pool=string_pool, compact_labels=compact_labels
+            ),
+            'symbols': SymbolDump.write
+        }
+
+    @classmethod
+    def run(cls, input_file, output_files, **options):
+        """
+        output_files: diccionario backend -> archivo de salida, solo se ejecutan esos backends
+        options: las de backends
+        """
+        class_node = JackParser(JackTokenizer(input_file)).parse_class()
+        backends = cls.backends(**options)
+        for backend, output_file in output_files.items():
+            backends[backend](class_node, output_file)
+
+    @classmethod
+    def output_file_for(cls, input_file, backend):
+        return os.path.splitext(input_file)[0] + cls.EXTENSIONS[backend]
+
+    @classmethod
+    def build_file(cls, input_file_name, backends=BACKENDS, **options):
+        """
+        escribe la salida de cada backend junto al archivo .jack,
+        devuelve el error como texto si falla
+        """
+        output_files = {}
+        try:
+            with open(input_file_name, 'r') as input_file:
+                for backend in backends:
+                    output_files[backend] = open(cls.output_file_for(input_file_name, backend), 'w')
+                cls.run(input_file, output_files, **options)
+        except Exception as error:
+            return '{}: {}: {}'.format(input_file_name, type(error).__name__, error)
+        finally:
+            for output_file in output_files.values():
+                output_file.close()
+
+    @classmethod
+    def build_files(cls, files, jobs=None, backends=BACKENDS, **options):
+        """
+        construye los archivos repartidos en jobs procesos (por defecto uno por cpu),
+        devuelve los errores en el mismo orden que files
+        """
+        build_file = functools.partial(cls.build_file, backends=backends, **options)
+        results = JackCompiler.map_files(build_file, files, jobs=jobs)
+        return [error for error in results if error]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="analiza cada archivo .jack una vez y escribe el xml, el codigo vm y los simbolos"
+    )
+    parser.add_argument("source", help="archivo .jack o directorio con archivos .jack")
+    parser.add_argument("--xml", action="store_true", help="escribe el arbol de analisis .xml")
+    parser.add_argument("--vm", action="store_true", help="escribe el codigo .vm")
+    parser.add_argument("--symbols", action="store_true", help="escribe las tablas de simbolos .sym")
+    parser.add_argument("-j", "--jobs", type=JackCompiler.jobs_argument, default=None,
+                        help="procesos en paralelo (por defecto el numero de cpus)")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="aplica la optimizacion peephole al codigo vm")
+    parser.add_argument("--string-pool", action="store_true",
+                        help="construye cada literal de cadena una sola vez por clase")
+    parser.add_argument("--compact-labels", action="store_true",
+                        help="etiquetas de if y while con nombres cortos (W0, T1, ...)")
+    parser.add_argument("--indent", type=int, default=0,
+                        help="espacios de sangría por nivel del arbol xml")
+    parser.add_argument("--compact", action="store_true",
+                        help="escribe el xml sin saltos de linea ni sangria")
+    args = parser.parse_args()
+
+    # sin ningún backend indicado se escriben todos
+    selected = [backend for backend in JackPipeline.BACKENDS if getattr(args, backend)] or JackPipeline.BACKENDS
+    errors = JackPipeline.build_files(
+        JackCompiler.input_files_for(args.source),
+        jobs=args.jobs,
+        backends=selected,
+        optimize=args.optimize,
+        string_pool=args.string_pool,
+        compact_labels=args.compact_labels,
+        indent=args.indent,
+        newlines=not args.compact
+    )
+    for error in errors:
+        print(error, file=sys.stderr)
+    sys.exit(1 if errors else 0)
@@ -1,5 +1,13 @@
 class JackToken():
-    KEYWORD_TOKENS = [
+    # tipos de token, se calculan una sola vez al crear el token
+    KEYWORD = 0
+    SYMBOL = 1
+    IDENTIFIER = 2
+    INT_CONST = 3
+    STRING_CONST = 4
+    TYPE_NAMES = ('KEYWORD', 'SYMBOL', 'IDENTIFIER', 'INT_CONST', 'STRING_CONST')
+
+    KEYWORD_TOKENS = frozenset([
         'class',
         'constructor',
         'function',
@@ -21,11 +29,12 @@ class JackToken():
         'else',
         'while',
         'return'
-    ]
-    CLASS_VAR_DEC_TOKENS = [ 'static', 'field' ]
-    SUBROUTINE_TOKENS = [ 'function', 'method', 'constructor' ]
-    STATEMENT_TOKENS = [ 'do', 'let', 'while', 'return', 'if' ]
-    OPERATORS = [
+    ])
+    SYMBOL_TOKENS = frozenset('{}()[].,;+-*/&|<>=~')
+    CLASS_VAR_DEC_TOKENS = frozenset(['static', 'field'])
+    SUBROUTINE_TOKENS = frozenset(['function', 'method', 'constructor'])
+    STATEMENT_TOKENS = frozenset(['do', 'let', 'while', 'return', 'if'])
+    OPERATORS = frozenset([
         '+',
         '-',
         '*',
@@ -35,26 +44,70 @@ class JackToken():
         '<',
         '>',
         '='
-    ]
-    UNARY_OPERATORS = [ '-', '~' ]
+    ])
+    UNARY_OPERATORS = frozenset(['-', '~'])
+    BOOLEAN_TOKENS = frozenset(['true', 'false'])
     TOKENS_THAT_NEED_LABELS = ['if', 'while']
 
-    def __init__(self, text):
+    __slots__ = ('text', 'type', 'line', 'column')
+
+    # palabras clave y símbolos compartidos por todos los tokenizadores
+    _interned = {}
+
+    def __init__(self, text, line=None, column=None):
+        """
+        line, column: posición en el archivo fuente contando desde 1, None si no se conoce
+        """
         self.text = text
+        self.type = self._classify(text)
+        self.line = line
+        self.column = column
+
+    @classmethod
+    def for_text(cls, text):
+        """
+        devuelve el token para text, reutilizando los de palabras clave y símbolos
+        """
+        token = cls._interned.get(text)
+        if token is None:
+            token = cls(text)
+        return token
+
+    @classmethod
+    def at(cls, text, line, column):
+        """
+        token nuevo para text en la posición line, column,
+        el tipo se toma del token compartido si existe
+        """
+        shared = cls._interned.get(text)
+        if shared is None:
+            return cls(text, line, column)
+        token = cls.__new__(cls)
+        token.text = text
+        token.type = shared.type
+        token.line = line
+        token.column = column
+        return token
+
+    @classmethod
+    def _classify(cls, text):
+        if not text:
+            return None
+        elif text[0] == "\"":
+            return cls.STRING_CONST
+        elif text in cls.KEYWORD_TOKENS:
+            return cls.KEYWORD
+        elif text.isdigit():
+            return cls.INT_CONST
+        elif text[0].isalnum() or text[0] == '_':
+            return cls.IDENTIFIER
+        else:
+            return cls.SYMBOL
 
     def token_type(self):
-        if not self.text:
+        if self.type is None:
             return None
-        elif self.text[0] == "\"":
-            return "STRING_CONST"
-        elif self.text in self.KEYWORD_TOKENS:
-            return "KEYWORD"
-        elif self.text.isnumeric():
-            return "INT_CONST"
-        elif self.text.isalnum():
-            return "IDENTIFIER"
-        else:
-            return "SYMBOL"
+        return self.TYPE_NAMES[self.type]
 
     def is_expression_list_delimiter(self):
         return self.text == ','
@@ -87,19 +140,24 @@ class JackToken():
         return self.text == "class"
 
     def is_string_const(self):
-        return self.token_type() == "STRING_CONST"
+        return self.type == self.STRING_CONST
 
     def is_identifier(self):
-        return self.token_type() == "IDENTIFIER"
+        return self.type == self.IDENTIFIER
 
     def is_keyword(self):
-        return self.token_type() == "KEYWORD"
+        return self.type == self.KEYWORD
 
     def is_boolean(self):
-        return self.text in ['true', 'false']
+        return self.text in self.BOOLEAN_TOKENS
 
     def is_null(self):
         return self.text == 'null'
 
     def is_empty(self):
-        return len(self.text) == 0
+        return not self.text
+
+
+JackToken._interned.update(
+    (text, JackToken(text)) for text in JackToken.KEYWORD_TOKENS | JackToken.SYMBOL_TOKENS | {''}
+)
@@ -1,35 +1,55 @@
+import re
+from collections import deque
+
 from JackToken import JackToken
 
 
 class JackTokenizer():
     COMMENT_OPERATORS = ["/", "*"]
     STRING_CONST_DELIMITER = '"'
+    # tamaño de los bloques que se leen en el modo buffered
+    CHUNK_SIZE = 1 << 16
+    # tokens que se recuerdan: el siguiente, el actual y el anterior
+    HISTORY_SIZE = 3
+    # una sola expresión regular: espacios y comentarios, string, palabra o símbolo
+    TOKEN_PATTERN = re.compile(r'''
+        (?P<skip>\s+|//[^\n]*|/\*.*?\*/)
+        |(?P<string>"[^"]*")
+        |(?P<word>\w+)
+        |(?P<symbol>.)
+    ''', re.VERBOSE | re.DOTALL)
 
     """
     pasa por un archivo de entrada .jack y produce una secuencia de tokens
     ignora todos los espacios en blanco y comentarios
     """
 
-    def __init__(self, input_file):
+    # lo que genera _buffered_tokens al terminar el archivo
+    END = ('', None, None)
+
+    def __init__(self, input_file, buffered=True, positions=False):
+        """
+        buffered: lee el archivo en bloques grandes y lo recorre con TOKEN_PATTERN,
+        si es False se usa la lectura original carácter por carácter
+        positions: cada token lleva su línea y columna, solo en el modo buffered;
+        sin positions (por defecto) se reutilizan los tokens compartidos de JackToken
+        """
         self.input_file = input_file
-        self.tokens_found = []
+        self.buffered = buffered
+        self.positions = positions
+        self.tokens_found = deque(maxlen=self.HISTORY_SIZE)
         self.current_token = None
         self.next_token = None
         self.has_more_tokens = True
+        self._buffered_tokens = self._buffered_token_texts() if buffered else None
 
     def advance(self):
-        # Inicializa carácter
-        char = self.input_file.read(1)
-        # quita espacios en blanco y comentarios
-        char = self._skip_whitespace_and_comments(starting_char=char)
-
         # obtiene el token
-        if self._is_string_const_delimeter(char):
-            token = JackToken(self._get_string_const(starting_char=char))
-        elif char.isalnum():
-            token = JackToken(self._get_alnum_underscore(starting_char=char))
-        else:  # símbolo
-            token = JackToken(char)
+        if self.buffered:
+            text, line, column = next(self._buffered_tokens, self.END)
+            token = JackToken.at(text, line, column) if self.positions else JackToken.for_text(text)
+        else:
+            token = self._read_char_by_char_token()
 
         # establece el token
         if self.current_token:
@@ -46,6 +66,16 @@ class JackTokenizer():
         if self.current_token.is_empty():
             self.has_more_tokens = False
 
+    def __iter__(self):
+        """
+        recorre el archivo como un generador de tokens,
+        la memoria usada no depende del tamaño del archivo
+        """
+        while self.has_more_tokens:
+            self.advance()
+            if self.has_more_tokens:
+                yield self.current_token
+
     def class_token_reached(self):
         if not self.current_token:
             return False
@@ -80,6 +110,75 @@ class JackTokenizer():
         past_token = self.tokens_found[-3]
         return past_token.is_expression_list_delimiter() or past_token.is_expression_list_starter()
 
+    def _read_char_by_char_token(self):
+        # Inicializa carácter
+        char = self.input_file.read(1)
+        # quita espacios en blanco y comentarios
+        char = self._skip_whitespace_and_comments(starting_char=char)
+
+        if self._is_string_const_delimeter(char):
+            return JackToken.for_text(self._get_string_const(starting_char=char))
+        elif char.isalnum():
+            return JackToken.for_text(self._get_alnum_underscore(starting_char=char))
+        else:  # símbolo
+            return JackToken.for_text(char)
+
+    def _buffered_token_texts(self):
+        """
+        genera (texto, línea, columna) de cada token leyendo el archivo en bloques de CHUNK_SIZE
+        """
+        read = self.input_file.read
+        match = self.TOKEN_PATTERN.match
+        buffer = ''
+        position = 0
+        end_of_file = False
+        # las líneas se cuentan solo cuando un token queda después del siguiente salto de línea:
+        # line empieza en line_start, los saltos antes de counted ya están contados
+        # y next_newline es el primero desde counted (-1 si no hay)
+        line = 1
+        line_start = 0
+        counted = 0
+        next_newline = -1
+
+        while True:
+            found = match(buffer, position)
+            # un token al final del bloque puede seguir en el siguiente
+            if not end_of_file and (found is None or self._may_continue(found, buffer)):
+                chunk = read(self.CHUNK_SIZE)
+                end_of_file = not chunk
+                newlines = buffer.count('\n', counted, position)
+                if newlines:
+                    line += newlines
+                    line_start = buffer.rindex('\n', counted, position) + 1
+                buffer = buffer[position:] + chunk
+                line_start -= position
+                counted = 0
+                next_newline = buffer.find('\n')
+                position = 0
+                continue
+
+            if found is None:
+                return
+
+            start = position
+            position = found.end()
+            if found.lastgroup != 'skip':
+                if 0 <= next_newline < start:
+                    line += buffer.count('\n', counted, start)
+                    line_start = buffer.rindex('\n', counted, start) + 1
+                    counted = start
+                    next_newline = buffer.find('\n', start)
+                yield found.group(), line, start - line_start + 1
+
+    def _may_continue(self, found, buffer):
+        if found.end() == len(buffer):
+            return True
+        elif found.lastgroup == 'symbol':
+            # string o comentario /* sin cerrar dentro del bloque actual
+            text = found.group()
+            return text == self.STRING_CONST_DELIMITER or (text == '/' and buffer[found.end()] == '*')
+        return False
+
     def _get_alnum_underscore(self, starting_char):
         token = ''
         char = starting_char
@@ -0,0 +1,39 @@
+class LabelAllocator():
+    """
+    reparte los nombres de las etiquetas de los if y while de una subrutina
+
+    cada construcción recibe su número al entrar con allocate, antes de compilar
+    las construcciones anidadas, así cualquier anidamiento tiene etiquetas distintas
+
+    - por defecto hay un contador por construcción y los nombres son los del
+      compilador de nand2tetris: WHILE_EXP0, WHILE_END0, IF_TRUE0, ...
+    - compact: un único contador para todas las construcciones y nombres de una
+      letra y el número: W0, X0, T1, ... el .vm es más corto y el ensamblador
+      tiene menos texto en su tabla de símbolos
+    """
+    COMPACT_NAMES = {
+        'WHILE_EXP': 'W',
+        'WHILE_END': 'X',
+        'IF_TRUE': 'T',
+        'IF_FALSE': 'F',
+        'IF_END': 'E'
+    }
+
+    def __init__(self, compact=False):
+        self.compact = compact
+        self.counts = {}
+
+    def allocate(self, construct, *labels):
+        """
+        nombres para labels de una nueva construcción construct ('if', 'while')
+        """
+        key = None if self.compact else construct
+        index = self.counts.get(key, 0)
+        self.counts[key] = index + 1
+        if self.compact:
+            return tuple('{}{}'.format(self.COMPACT_NAMES[label], index) for label in labels)
+        return tuple('{}{}'.format(label, index) for label in labels)
+
+    def reset(self):
+        # las etiquetas vm son locales a la función, cada subrutina empieza de cero
+        self.counts.clear()
@@ -0,0 +1,254 @@
+from JackAST import (
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    BinaryExpression, UnaryExpression, ParenthesizedExpression,
+    IntegerConstant, StringConstant, KeywordConstant,
+    VariableReference, ArrayReference, SubroutineCall
+)
+
+
+class ParseTreeWriter():
+    """
+    escribe el árbol de análisis xml del formato de project10 a partir del árbol
+    de JackParser, sin volver a leer los tokens
+
+    los elementos terminales se reconstruyen desde la gramática: las palabras
+    clave, los símbolos de puntuación y los nombres de los nodos
+
+    indent: espacios por nivel de anidamiento, 0 escribe cada elemento al
+    comienzo de la línea como JackAnalyzer
+    newlines: sin saltos de línea (y sin sangría) el xml queda en una sola línea
+    """
+    PRIMITIVE_TYPES = frozenset(['int', 'char', 'boolean', 'void'])
+    SYMBOL_ENTITIES = {
+        '<': '&lt;',
+        '>': '&gt;',
+        '"': '&quot;',
+        '&': '&amp;'
+    }
+
+    def __init__(self, output_file, indent=0, newlines=True):
+        self.output_file = output_file
+        self.indent = indent if newlines else 0
+        self.line_end = '\n' if newlines else ''
+        self.depth = 0
+        self.pending = []
+
+        self.statement_write_methods = {
+            LetStatement: self.write_let,
+            IfStatement: self.write_if,
+            WhileStatement: self.write_while,
+            DoStatement: self.write_do,
+            ReturnStatement: self.write_return
+        }
+        self.term_write_methods = {
+            IntegerConstant: self.write_integer_constant,
+            StringConstant: self.write_string_constant,
+            KeywordConstant: self.write_keyword_constant,
+            VariableReference: self.write_variable_reference,
+            ArrayReference: self.write_array_reference,
+            SubroutineCall: self.write_subroutine_call,
+            ParenthesizedExpression: self.write_parenthesized_expression,
+            UnaryExpression: self.write_unary_expression
+        }
+
+    def write_class(self, class_node):
+        self._open('class')
+        self._terminal('keyword', 'class')
+        self._terminal('identifier', class_node.name)
+        self._symbol('{')
+        for class_var_dec in class_node.class_var_decs:
+            self._open('classVarDec')
+            self._terminal('keyword', class_var_dec.kind)
+            self._type(class_var_dec.type)
+            self._names(class_var_dec.names)
+            self._symbol(';')
+            self._close('classVarDec')
+        for subroutine in class_node.subroutines:
+            self.write_subroutine(subroutine)
+        self._symbol('}')
+        self._close('class')
+        self.output_file.write(''.join(self.pending))
+        self.pending = []
+
+    def write_subroutine(self, subroutine):
+        self._open('subroutineDec')
+        self._terminal('keyword', subroutine.kind)
+        self._type(subroutine.return_type)
+        self._terminal('identifier', subroutine.name)
+        self._symbol('(')
+        self._open('parameterList')
+        for position, (symbol_type, name) in enumerate(subroutine.parameters):
+            if position:
+                self._symbol(',')
+            self._type(symbol_type)
+            self._terminal('identifier', name)
+        self._close('parameterList')
+        self._symbol(')')
+
+        self._open('subroutineBody')
+        self._symbol('{')
+        for var_dec in subroutine.var_decs:
+            self._open('varDec')
+            self._terminal('keyword', 'var')
+            self._type(var_dec.type)
+            self._names(var_dec.names)
+            self._symbol(';')
+            self._close('varDec')
+        self.write_statements(subroutine.statements)
+        self._symbol('}')
+        self._close('subroutineBody')
+        self._close('subroutineDec')
+
+    def write_statements(self, statements):
+        self._open('statements')
+        for statement in statements:
+            self.statement_write_methods[type(statement)](statement)
+        self._close('statements')
+
+    def write_let(self, statement):
+        self._open('letStatement')
+        self._terminal('keyword', 'let')
+        self._terminal('identifier', statement.name)
+        if statement.index is not None:
+            self._symbol('[')
+            self.write_expression(statement.index)
+            self._symbol(']')
+        self._symbol('=')
+        self.write_expression(statement.value)
+        self._symbol(';')
+        self._close('letStatement')
+
+    def write_if(self, statement):
+        self._open('ifStatement')
+        self._terminal('keyword', 'if')
+        self._block(statement.condition, statement.statements)
+        if statement.else_statements is not None:
+            self._terminal('keyword', 'else')
+            self._symbol('{')
+            self.write_statements(statement.else_statements)
+            self._symbol('}')
+        self._close('ifStatement')
+
+    def write_while(self, statement):
+        self._open('whileStatement')
+        self._terminal('keyword', 'while')
+        self._block(statement.condition, statement.statements)
+        self._close('whileStatement')
+
+    def write_do(self, statement):
+        self._open('doStatement')
+        self._terminal('keyword', 'do')
+        # la llamada de do no va dentro de un término
+        self._call(statement.call)
+        self._symbol(';')
+        self._close('doStatement')
+
+    def write_return(self, statement):
+        self._open('returnStatement')
+        self._terminal('keyword', 'return')
+        if statement.value is not None:
+            self.write_expression(statement.value)
+        self._symbol(';')
+        self._close('returnStatement')
+
+    def write_expression(self, expression):
+        # la cadena de operadores se recorre hacia la izquierda sin recursión,
+        # en el xml los términos de una expresión quedan al mismo nivel
+        operations = []
+        while isinstance(expression, BinaryExpression):
+            operations.append(expression)
+            expression = expression.left
+
+        self._open('expression')
+        self.write_term(expression)
+        for operation in reversed(operations):
+            self._symbol(operation.operator.token)
+            self.write_term(operation.right)
+        self._close('expression')
+
+    def write_term(self, term):
+        self._open('term')
+        self.term_write_methods[type(term)](term)
+        self._close('term')
+
+    def write_integer_constant(self, term):
+        self._terminal('integerConstant', str(term.value))
+
+    def write_string_constant(self, term):
+        self._terminal('stringConstant', term.value)
+
+    def write_keyword_constant(self, term):
+        self._terminal('keyword', term.value)
+
+    def write_variable_reference(self, term):
+        self._terminal('identifier', term.name)
+
+    def write_array_reference(self, term):
+        self._terminal('identifier', term.name)
+        self._symbol('[')
+        self.write_expression(term.index)
+        self._symbol(']')
+
+    def write_subroutine_call(self, term):
+        self._call(term)
+
+    def write_parenthesized_expression(self, term):
+        self._symbol('(')
+        self.write_expression(term.expression)
+        self._symbol(')')
+
+    def write_unary_expression(self, term):
+        self._symbol(term.operator.token)
+        self.write_term(term.term)
+
+    def _block(self, condition, statements):
+        # ( condición ) { sentencias } de if y while
+        self._symbol('(')
+        self.write_expression(condition)
+        self._symbol(')')
+        self._symbol('{')
+        self.write_statements(statements)
+        self._symbol('}')
+
+    def _call(self, call):
+        if call.receiver is not None:
+            self._terminal('identifier', call.receiver)
+            self._symbol('.')
+        self._terminal('identifier', call.name)
+        self._symbol('(')
+        self._open('expressionList')
+        for position, argument in enumerate(call.arguments):
+            if position:
+                self._symbol(',')
+            self.write_expression(argument)
+        self._close('expressionList')
+        self._symbol(')')
+
+    def _type(self, symbol_type):
+        self._terminal('keyword' if symbol_type in self.PRIMITIVE_TYPES else 'identifier', symbol_type)
+
+    def _names(self, names):
+        for position, name in enumerate(names):
+            if position:
+                self._symbol(',')
+            self._terminal('identifier', name)
+
+    def _symbol(self, symbol):
+        self._terminal('symbol', self.SYMBOL_ENTITIES.get(symbol, symbol))
+
+    def _terminal(self, tag_name, value):
+        self._line('<{0}> {1} </{0}>'.format(tag_name, value))
+
+    def _open(self, tag_name):
+        self._line('<{}>'.format(tag_name))
+        self.depth += 1
+
+    def _close(self, tag_name):
+        self.depth -= 1
+        self._line('</{}>'.format(tag_name))
+
+    def _line(self, text):
+        if self.indent:
+            self.pending.append(' ' * (self.indent * self.depth))
+        self.pending.append(text)
+        self.pending.append(self.line_end)
@@ -0,0 +1,31 @@
+class StringPool():
+    """
+    literales de cadena de una clase guardados en variables static
+
+    la función FUNCTION_NAME construye todas las cadenas una sola vez, cada
+    subrutina que usa literales la llama al entrar si READY aún es falso, y
+    cada uso del literal queda como un solo push static
+
+    las cadenas se comparten: el programa no debe modificarlas ni liberarlas
+    """
+    FUNCTION_NAME = '{}.$strings'
+    READY_LABEL = 'STRING_POOL_READY'
+
+    def __init__(self, class_name, static_base):
+        """
+        static_base: primer índice static libre de la clase, ahí va la bandera READY
+        """
+        self.function_name = self.FUNCTION_NAME.format(class_name)
+        self.ready_index = static_base
+        self.literals = {}
+
+    def index_for(self, literal):
+        """
+        índice static donde queda la cadena literal
+        """
+        if literal not in self.literals:
+            self.literals[literal] = self.ready_index + 1 + len(self.literals)
+        return self.literals[literal]
+
+    def is_empty(self):
+        return not self.literals
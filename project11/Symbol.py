@@ -0,0 +1,9 @@
+class Symbol():
+    # registro de un símbolo de la tabla: nombre, tipo, clase e índice
+    __slots__ = ('name', 'type', 'kind', 'index')
+
+    def __init__(self, name, symbol_type, kind, index):
+        self.name = name
+        self.type = symbol_type
+        self.kind = kind
+        self.index = index
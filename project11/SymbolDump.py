@@ -0,0 +1,52 @@
+from SymbolTable import SymbolTable
+
+
+class SymbolDump():
+    """
+    escribe las tablas de símbolos de una clase del árbol de JackParser,
+    con los mismos índices que asigna CompilationEngine
+
+        class Square
+        field int x 0
+        method void Square.draw
+          argument Square this 0
+          local int i 0
+    """
+    INDENT = '  '
+
+    @classmethod
+    def write(cls, class_node, output_file):
+        output_file.write(''.join(line + '\n' for line in cls.lines(class_node)))
+
+    @classmethod
+    def lines(cls, class_node):
+        class_symbol_table = SymbolTable()
+        subroutine_symbol_table = SymbolTable(parent=class_symbol_table)
+
+        for class_var_dec in class_node.class_var_decs:
+            for name in class_var_dec.names:
+                class_symbol_table.define(name=name, symbol_type=class_var_dec.type, kind=class_var_dec.kind)
+
+        lines = ['class {}'.format(class_node.name)]
+        lines.extend(cls._symbol_lines(class_symbol_table, prefix=''))
+        for subroutine in class_node.subroutines:
+            subroutine_symbol_table.reset()
+            if subroutine.kind == 'method':
+                # el objeto es el argumento implícito 0
+                subroutine_symbol_table.define(name='this', symbol_type=class_node.name, kind='argument')
+            for symbol_type, name in subroutine.parameters:
+                subroutine_symbol_table.define(name=name, symbol_type=symbol_type, kind='argument')
+            for var_dec in subroutine.var_decs:
+                for name in var_dec.names:
+                    subroutine_symbol_table.define(name=name, symbol_type=var_dec.type, kind='local')
+
+            lines.append('{} {} {}.{}'.format(subroutine.kind, subroutine.return_type, class_node.name, subroutine.name))
+            lines.extend(cls._symbol_lines(subroutine_symbol_table, prefix=cls.INDENT))
+        return lines
+
+    @classmethod
+    def _symbol_lines(cls, symbol_table, prefix):
+        return [
+            '{}{} {} {} {}'.format(prefix, symbol.kind, symbol.type, symbol.name, symbol.index)
+            for symbol in symbol_table.symbols.values()
+        ]
@@ -1,51 +1,69 @@
+from Symbol import Symbol
+
+
 class SymbolTable():
 
     # Representa los símbolos actuales de una clase dada o subrutina del JackCompiler
+    # parent es el alcance que lo contiene, p. ej. la tabla de la clase para una subrutina
 
-    def __init__(self):
-        self.symbols = []
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.symbols = {}
+        self.counts = {}
 
     def reset(self):
         """
         Inicia el alcance de la subrutina, es decir reseteamos su alcance
         """
-        self.symbols = []
+        self.symbols = {}
+        self.counts = {}
 
     def define(self, name, symbol_type, kind):
-        new_symbol = {
-            'name': name,
-            'type': symbol_type,
-            'kind': kind,
-            'index': self.var_count(kind)
-        }
-        self.symbols.append(new_symbol)
+        """
+        agrega el símbolo con el siguiente índice de su tipo, un nombre que ya está
+        en este alcance es un error; sí puede tapar a uno de un alcance que lo contiene
+        """
+        if name in self.symbols:
+            raise NameError('{} ya está definido en este alcance'.format(name))
+        index = self.counts.get(kind, 0)
+        self.counts[kind] = index + 1
+        self.symbols[name] = Symbol(name=name, symbol_type=symbol_type, kind=kind, index=index)
 
     def var_count(self, kind):
         """
         devuelve el número de variables del tipo dado ya definidas en el alcance actual
         """
-        return sum(symbol['kind'] == kind for symbol in self.symbols)
+        return self.counts.get(kind, 0)
 
     def kind_of(self, name):
         """
         devuelve el tipo de identificador nombrado en el ámbito actual
         (ESTÁTICO, CAMPO, ARG, VAR, NINGUNO)
         """
-        return self.find_symbol_by_name(name).get('kind')
+        symbol = self.find_symbol_by_name(name)
+        return symbol.kind if symbol else None
 
     def type_of(self, name):
         """
         devuelve el tipo de identificador nombrado en el ámbito actual
         """
-        return self.find_symbol_by_name(name).get('type')
+        symbol = self.find_symbol_by_name(name)
+        return symbol.type if symbol else None
 
     def index_of(self, name):
         """
         devuelve el índice asignado al identificador nombrado
         """
-        return self.find_symbol_by_name(name).get('index')
+        symbol = self.find_symbol_by_name(name)
+        return symbol.index if symbol else None
 
     def find_symbol_by_name(self, value):
-        for symbol in self.symbols:
-            if symbol['name'] == value:
+        """
+        busca el símbolo en este alcance y luego en los alcances que lo contienen
+        """
+        table = self
+        while table is not None:
+            symbol = table.symbols.get(value)
+            if symbol is not None:
                 return symbol
+            table = table.parent
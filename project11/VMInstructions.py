@@ -0,0 +1,149 @@
+from array import array
+
+
+class VMInstructions():
+    """
+    representación intermedia de los comandos vm en arreglos paralelos:
+    código de operación, segmento, operando y nombre (etiqueta o función)
+    """
+    # códigos de operación
+    PUSH = 0
+    POP = 1
+    ADD = 2
+    SUB = 3
+    NEG = 4
+    EQ = 5
+    GT = 6
+    LT = 7
+    AND = 8
+    OR = 9
+    NOT = 10
+    LABEL = 11
+    GOTO = 12
+    IF_GOTO = 13
+    FUNCTION = 14
+    CALL = 15
+    RETURN = 16
+    OPCODE_NAMES = (
+        'push', 'pop', 'add', 'sub', 'neg', 'eq', 'gt', 'lt', 'and', 'or', 'not',
+        'label', 'goto', 'if-goto', 'function', 'call', 'return'
+    )
+    OPCODES = {name: code for code, name in enumerate(OPCODE_NAMES)}
+
+    # segmentos de memoria
+    CONSTANT = 0
+    ARGUMENT = 1
+    LOCAL = 2
+    STATIC = 3
+    THIS = 4
+    THAT = 5
+    POINTER = 6
+    TEMP = 7
+    SEGMENT_NAMES = ('constant', 'argument', 'local', 'static', 'this', 'that', 'pointer', 'temp')
+    SEGMENTS = {name: code for code, name in enumerate(SEGMENT_NAMES)}
+
+    NO_NAME = -1
+    # las líneas del código fuente empiezan en 1
+    NO_LINE = 0
+
+    __slots__ = ('opcodes', 'segments', 'operands', 'name_ids', 'names', '_name_ids_by_name', 'lines', 'current_line')
+
+    def __init__(self, track_lines=False):
+        """
+        track_lines: guarda la línea del código fuente de cada instrucción en lines,
+        las instrucciones que se agregan sin línea toman current_line
+        """
+        self.opcodes = array('B')
+        self.segments = array('B')
+        self.operands = array('i')
+        self.name_ids = array('i')
+        # los nombres se guardan una sola vez y las instrucciones guardan su posición
+        self.names = []
+        self._name_ids_by_name = {}
+        self.lines = array('i') if track_lines else None
+        self.current_line = self.NO_LINE
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __iter__(self):
+        for position in range(len(self.opcodes)):
+            yield self.instruction(position)
+
+    def append(self, opcode, segment=0, operand=0, name=None, line=None):
+        self.opcodes.append(opcode)
+        self.segments.append(segment)
+        self.operands.append(operand)
+        self.name_ids.append(self.NO_NAME if name is None else self.name_id(name))
+        if self.lines is not None:
+            self.lines.append(self.current_line if line is None else line)
+
+    def extend(self, other, start=0, stop=None):
+        """
+        agrega las instrucciones de other entre start y stop, con sus líneas si other las tiene
+        """
+        stop = len(other) if stop is None else stop
+        self.opcodes.extend(other.opcodes[start:stop])
+        self.segments.extend(other.segments[start:stop])
+        self.operands.extend(other.operands[start:stop])
+        self.name_ids.extend(self._name_ids_from(other, start, stop))
+        if self.lines is not None:
+            self.lines.extend(self._lines_from(other, start, stop, self.current_line))
+
+    def slice(self, start=0, stop=None):
+        """
+        VMInstructions nuevas con las instrucciones entre start y stop
+        """
+        instructions = VMInstructions(track_lines=self.lines is not None)
+        instructions.extend(self, start, stop)
+        return instructions
+
+    def insert(self, position, other):
+        """
+        inserta las instrucciones de other antes de position
+        """
+        self.opcodes[position:position] = other.opcodes
+        self.segments[position:position] = other.segments
+        self.operands[position:position] = other.operands
+        self.name_ids[position:position] = self._name_ids_from(other, 0, len(other))
+        if self.lines is not None:
+            # sin líneas en other quedan en la línea de la instrucción anterior
+            fill = self.lines[position - 1] if position else self.current_line
+            self.lines[position:position] = self._lines_from(other, 0, len(other), fill)
+
+    def _name_ids_from(self, other, start, stop):
+        return array('i', [
+            self.NO_NAME if name_id == self.NO_NAME else self.name_id(other.names[name_id])
+            for name_id in other.name_ids[start:stop]
+        ])
+
+    def _lines_from(self, other, start, stop, fill):
+        if other.lines is not None:
+            return other.lines[start:stop]
+        return array('i', [fill]) * (stop - start)
+
+    def name_id(self, name):
+        name_id = self._name_ids_by_name.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(name)
+            self._name_ids_by_name[name] = name_id
+        return name_id
+
+    def name_at(self, position):
+        name_id = self.name_ids[position]
+        return None if name_id == self.NO_NAME else self.names[name_id]
+
+    def line_at(self, position):
+        return self.NO_LINE if self.lines is None else self.lines[position]
+
+    def instruction(self, position):
+        """
+        (opcode, segment, operand, name) de la instrucción en position
+        """
+        return (
+            self.opcodes[position],
+            self.segments[position],
+            self.operands[position],
+            self.name_at(position)
+        )
@@ -0,0 +1,450 @@
+from VMInstructions import VMInstructions
+from VMSerializer import VMSerializer
+from CallGraph import CallGraph
+from JackOS import JackOS
+import argparse
+import collections
+import glob
+import os
+import sys
+import time
+
+
+class VMInterpreter():
+    """
+    ejecuta programas vm sobre una memoria con la distribución de la plataforma hack
+
+    al cargarlos las instrucciones se decodifican en arreglos paralelos: cada
+    push y pop queda con su segmento resuelto, las etiquetas se quitan y los
+    saltos y llamadas guardan la posición de destino, así la ejecución es un
+    solo ciclo sin búsquedas por nombre
+
+    las funciones que el programa no define se buscan en JackOS
+    """
+    # operaciones decodificadas
+    PUSH_CONSTANT = 0
+    PUSH_LOCAL = 1
+    PUSH_ARGUMENT = 2
+    PUSH_THIS = 3
+    PUSH_THAT = 4
+    # static, temp y pointer se resuelven a una dirección fija
+    PUSH_ADDRESS = 5
+    POP_LOCAL = 6
+    POP_ARGUMENT = 7
+    POP_THIS = 8
+    POP_THAT = 9
+    POP_ADDRESS = 10
+    ADD = 11
+    SUB = 12
+    NEG = 13
+    EQ = 14
+    GT = 15
+    LT = 16
+    AND = 17
+    OR = 18
+    NOT = 19
+    GOTO = 20
+    IF_GOTO = 21
+    CALL = 22
+    CALL_NATIVE = 23
+    FUNCTION = 24
+    RETURN = 25
+
+    PUSH_OPERATIONS = {
+        VMInstructions.LOCAL: PUSH_LOCAL,
+        VMInstructions.ARGUMENT: PUSH_ARGUMENT,
+        VMInstructions.THIS: PUSH_THIS,
+        VMInstructions.THAT: PUSH_THAT
+    }
+    POP_OPERATIONS = {
+        VMInstructions.LOCAL: POP_LOCAL,
+        VMInstructions.ARGUMENT: POP_ARGUMENT,
+        VMInstructions.THIS: POP_THIS,
+        VMInstructions.THAT: POP_THAT
+    }
+    ARITHMETIC_OPERATIONS = {
+        VMInstructions.ADD: ADD,
+        VMInstructions.SUB: SUB,
+        VMInstructions.NEG: NEG,
+        VMInstructions.EQ: EQ,
+        VMInstructions.GT: GT,
+        VMInstructions.LT: LT,
+        VMInstructions.AND: AND,
+        VMInstructions.OR: OR,
+        VMInstructions.NOT: NOT
+    }
+
+    # registros y segmentos fijos de la plataforma hack
+    SP = 0
+    LCL = 1
+    ARG = 2
+    THIS = 3
+    THAT = 4
+    TEMP_BASE = 5
+    STATIC_BASE = 16
+    STATIC_END = 256
+    STACK_BASE = 256
+    MEMORY_SIZE = 24577
+    # dirección de retorno del punto de entrada, al volver a ella termina la ejecución
+    EXIT_ADDRESS = -1
+
+    def __init__(self, programs, input_text=''):
+        """
+        programs: diccionario nombre -> VMInstructions, un elemento por archivo .vm,
+        cada uno tiene sus propias variables static
+        """
+        self.memory = [0] * self.MEMORY_SIZE
+        self.os = JackOS(self.memory, input_text=input_text)
+        self.natives = self.os.functions()
+
+        self.operations = []
+        self.arguments = []
+        self.counts = []
+        # (programa, posición en sus VMInstructions) de cada instrucción decodificada
+        self.sources = []
+        # nombres de las funciones del programa y luego de las nativas, por índice
+        self.function_names = []
+        self.function_addresses = {}
+        self.native_functions = []
+        self._decode(programs)
+
+        self.executed = 0
+        self.call_counts = [0] * len(self.function_names)
+        self.wall_time = 0.0
+        # con profile: ejecuciones de cada instrucción decodificada
+        # e instrucciones ejecutadas por pila de llamadas (tupla de índices de función)
+        self.instruction_counts = [0] * len(self.operations)
+        self.stack_counts = collections.Counter()
+
+    @classmethod
+    def from_files(cls, file_names, input_text=''):
+        return cls(cls.read_files(file_names), input_text=input_text)
+
+    @classmethod
+    def read_files(cls, file_names):
+        programs = {}
+        for file_name in file_names:
+            with open(file_name, 'r') as input_file:
+                programs[file_name] = VMSerializer.read(input_file)
+        return programs
+
+    @classmethod
+    def input_files_for(cls, arg):
+        if os.path.isfile(arg):
+            return [arg]
+        elif os.path.isdir(arg):
+            return sorted(glob.glob(os.path.join(arg, '*.vm')))
+        return []
+
+    def _decode(self, programs):
+        # primero las direcciones de todas las funciones, las llamadas pueden ir hacia adelante
+        address = 0
+        function_ids = {}
+        for instructions in programs.values():
+            for position in range(len(instructions)):
+                opcode = instructions.opcodes[position]
+                if opcode == VMInstructions.FUNCTION:
+                    name = instructions.name_at(position)
+                    if name in function_ids:
+                        raise NameError('función definida dos veces: {}'.format(name))
+                    function_ids[name] = len(self.function_names)
+                    self.function_names.append(name)
+                    self.function_addresses[name] = address
+                if opcode != VMInstructions.LABEL:
+                    address += 1
+
+        static_base = self.STATIC_BASE
+        for program_name, instructions in programs.items():
+            static_base = self._decode_program(program_name, instructions, function_ids, static_base)
+
+    def _decode_program(self, program_name, instructions, function_ids, static_base):
+        """
+        decodifica las instrucciones de un archivo, devuelve la base static del siguiente
+        """
+        statics = [
+            instructions.operands[position] + 1 for position in range(len(instructions))
+            if instructions.opcodes[position] <= VMInstructions.POP
+            and instructions.segments[position] == VMInstructions.STATIC
+        ]
+        next_static_base = static_base + max(statics, default=0)
+        if next_static_base > self.STATIC_END:
+            raise MemoryError('las variables static no caben en la memoria')
+        fixed_bases = {
+            VMInstructions.STATIC: static_base,
+            VMInstructions.TEMP: self.TEMP_BASE,
+            VMInstructions.POINTER: self.THIS
+        }
+
+        for _, start, stop in CallGraph.function_ranges(instructions):
+            # las etiquetas son locales a cada función
+            labels = {}
+            address = len(self.operations)
+            for position in range(start, stop):
+                if instructions.opcodes[position] == VMInstructions.LABEL:
+                    labels[instructions.name_at(position)] = address
+                else:
+                    address += 1
+
+            for position in range(start, stop):
+                opcode, segment, operand, name = instructions.instruction(position)
+                if opcode == VMInstructions.LABEL:
+                    continue
+                argument = operand
+                count = 0
+                if opcode == VMInstructions.PUSH:
+                    operation = self.PUSH_OPERATIONS.get(segment, self.PUSH_ADDRESS)
+                    if segment == VMInstructions.CONSTANT:
+                        operation = self.PUSH_CONSTANT
+                    elif segment in fixed_bases:
+                        argument = fixed_bases[segment] + operand
+                elif opcode == VMInstructions.POP:
+                    if segment == VMInstructions.CONSTANT:
+                        raise SyntaxError('pop constant no es un comando válido')
+                    operation = self.POP_OPERATIONS.get(segment, self.POP_ADDRESS)
+                    if segment in fixed_bases:
+                        argument = fixed_bases[segment] + operand
+                elif opcode in self.ARITHMETIC_OPERATIONS:
+                    operation = self.ARITHMETIC_OPERATIONS[opcode]
+                elif opcode in (VMInstructions.GOTO, VMInstructions.IF_GOTO):
+                    if name not in labels:
+                        raise NameError('etiqueta no definida: {}'.format(name))
+                    operation = self.GOTO if opcode == VMInstructions.GOTO else self.IF_GOTO
+                    argument = labels[name]
+                elif opcode == VMInstructions.CALL:
+                    operation, argument = self._call_target(name)
+                    count = operand
+                elif opcode == VMInstructions.FUNCTION:
+                    operation = self.FUNCTION
+                    count = function_ids[name]
+                else:
+                    operation = self.RETURN
+                self.operations.append(operation)
+                self.arguments.append(argument)
+                self.counts.append(count)
+                self.sources.append((program_name, position))
+        return next_static_base
+
+    def _call_target(self, name):
+        if name in self.function_addresses:
+            return self.CALL, self.function_addresses[name]
+        if name not in self.natives:
+            raise NameError('función no definida: {}'.format(name))
+        if name not in self.function_names:
+            self.function_names.append(name)
+            self.native_functions.append(self.natives[name])
+        # las nativas se numeran después de las funciones del programa
+        return self.CALL_NATIVE, self.function_names.index(name)
+
+    def entry_point(self):
+        for name in CallGraph.ENTRY_POINTS:
+            if name in self.function_addresses:
+                return name
+        raise NameError('el programa no define {}'.format(' ni '.join(CallGraph.ENTRY_POINTS)))
+
+    def run(self, max_instructions=None, profile=False):
+        """
+        ejecuta desde Sys.init, o desde Main.main si el programa no define Sys.init,
+        hasta que el punto de entrada vuelve, se llama a Sys.halt o se ejecutan max_instructions
+
+        profile: cuenta las ejecuciones de cada instrucción en instruction_counts y las
+        instrucciones de cada pila de llamadas en stack_counts, sin profile solo se
+        cuentan las instrucciones y las llamadas
+
+        devuelve True si el programa terminó
+        """
+        memory = self.memory
+        operations = self.operations
+        arguments = self.arguments
+        counts = self.counts
+        call_counts = self.call_counts
+        native_functions = self.native_functions
+        native_base = len(self.function_addresses)
+        jack_os = self.os
+        temp_base = self.TEMP_BASE
+        memory_size = len(memory)
+
+        # el bootstrap: call del punto de entrada sin argumentos
+        sp = self.STACK_BASE
+        memory[sp:sp + 5] = [self.EXIT_ADDRESS, sp, sp, 0, 0]
+        sp += 5
+        memory[self.ARG] = sp - 5
+        memory[self.LCL] = sp
+        pc = self.function_addresses[self.entry_point()]
+
+        instruction_counts = self.instruction_counts
+        stack_counts = self.stack_counts
+        stack = [counts[pc]]
+        # instrucciones ya atribuidas a alguna pila
+        attributed = 0
+
+        executed = 0
+        limit = -1 if max_instructions is None else max_instructions
+        finished = False
+        start = time.perf_counter()
+        while executed != limit:
+            operation = operations[pc]
+            argument = arguments[pc]
+            pc += 1
+            executed += 1
+            if profile:
+                instruction_counts[pc - 1] += 1
+
+            # se comparan con los números de las operaciones decodificadas, en el mismo orden
+            if operation == 0:
+                memory[sp] = argument
+                sp += 1
+            elif operation == 1:
+                memory[sp] = memory[memory[1] + argument]
+                sp += 1
+            elif operation == 2:
+                memory[sp] = memory[memory[2] + argument]
+                sp += 1
+            elif operation == 3:
+                memory[sp] = memory[memory[3] + argument]
+                sp += 1
+            elif operation == 4:
+                memory[sp] = memory[memory[4] + argument]
+                sp += 1
+            elif operation == 5:
+                memory[sp] = memory[argument]
+                sp += 1
+            elif operation == 6:
+                sp -= 1
+                memory[memory[1] + argument] = memory[sp]
+            elif operation == 7:
+                sp -= 1
+                memory[memory[2] + argument] = memory[sp]
+            elif operation == 8:
+                sp -= 1
+                memory[memory[3] + argument] = memory[sp]
+            elif operation == 9:
+                sp -= 1
+                memory[memory[4] + argument] = memory[sp]
+            elif operation == 10:
+                sp -= 1
+                memory[argument] = memory[sp]
+                # pop pointer: this y that se usan como índices de memory, uno negativo
+                # no fallaría y leería desde el final
+                if argument < temp_base and not 0 <= memory[argument] < memory_size:
+                    raise IndexError('dirección fuera de la memoria: {}'.format(memory[argument]))
+            elif operation == 11:
+                sp -= 1
+                memory[sp - 1] = ((memory[sp - 1] + memory[sp] + 0x8000) & 0xFFFF) - 0x8000
+            elif operation == 12:
+                sp -= 1
+                memory[sp - 1] = ((memory[sp - 1] - memory[sp] + 0x8000) & 0xFFFF) - 0x8000
+            elif operation == 13:
+                memory[sp - 1] = ((0x8000 - memory[sp - 1]) & 0xFFFF) - 0x8000
+            elif operation == 14:
+                sp -= 1
+                memory[sp - 1] = -1 if memory[sp - 1] == memory[sp] else 0
+            elif operation == 15:
+                sp -= 1
+                memory[sp - 1] = -1 if memory[sp - 1] > memory[sp] else 0
+            elif operation == 16:
+                sp -= 1
+                memory[sp - 1] = -1 if memory[sp - 1] < memory[sp] else 0
+            elif operation == 17:
+                sp -= 1
+                memory[sp - 1] &= memory[sp]
+            elif operation == 18:
+                sp -= 1
+                memory[sp - 1] |= memory[sp]
+            elif operation == 19:
+                memory[sp - 1] = ~memory[sp - 1]
+            elif operation == 20:
+                pc = argument
+            elif operation == 21:
+                sp -= 1
+                if memory[sp]:
+                    pc = argument
+            elif operation == 22:
+                # return address, LCL, ARG, THIS, THAT
+                memory[sp] = pc
+                memory[sp + 1:sp + 5] = memory[1:5]
+                sp += 5
+                memory[2] = sp - 5 - counts[pc - 1]
+                memory[1] = sp
+                pc = argument
+                if profile:
+                    stack_counts[tuple(stack)] += executed - attributed
+                    attributed = executed
+                    stack.append(counts[pc])
+            elif operation == 23:
+                num_args = counts[pc - 1]
+                sp -= num_args
+                call_counts[argument] += 1
+                memory[sp] = native_functions[argument - native_base](*memory[sp:sp + num_args])
+                sp += 1
+                if jack_os.halted:
+                    finished = True
+                    break
+            elif operation == 24:
+                call_counts[counts[pc - 1]] += 1
+                memory[sp:sp + argument] = [0] * argument
+                sp += argument
+            else:
+                frame = memory[1]
+                return_address = memory[frame - 5]
+                argument_base = memory[2]
+                memory[argument_base] = memory[sp - 1]
+                sp = argument_base + 1
+                memory[1:5] = memory[frame - 4:frame]
+                if profile:
+                    stack_counts[tuple(stack)] += executed - attributed
+                    attributed = executed
+                    stack.pop()
+                if return_address == self.EXIT_ADDRESS:
+                    finished = True
+                    break
+                pc = return_address
+
+        self.wall_time += time.perf_counter() - start
+        if profile and executed > attributed:
+            stack_counts[tuple(stack)] += executed - attributed
+        self.executed += executed
+        memory[self.SP] = sp
+        return finished
+
+    def output_text(self):
+        return ''.join(self.os.output)
+
+    def function_call_counts(self):
+        """
+        llamadas por función, incluidas las del sistema operativo, de más a menos llamadas
+        """
+        counts = collections.Counter({
+            name: count for name, count in zip(self.function_names, self.call_counts) if count
+        })
+        return counts.most_common()
+
+    def report(self):
+        lines = [
+            '{} instrucciones vm en {:.3f} s ({:.0f} instrucciones/s)'.format(
+                self.executed,
+                self.wall_time,
+                self.executed / self.wall_time if self.wall_time else 0
+            )
+        ]
+        for name, count in self.function_call_counts():
+            lines.append('{:>12} {}'.format(count, name))
+        return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ejecuta archivos .vm y reporta instrucciones, llamadas y tiempo")
+    parser.add_argument("source", help="archivo .vm o directorio con archivos .vm")
+    parser.add_argument("--max-instructions", type=int, default=None,
+                        help="detiene la ejecución después de este número de instrucciones vm")
+    parser.add_argument("--input", default='',
+                        help="texto que leen las funciones de Keyboard")
+    args = parser.parse_args()
+
+    interpreter = VMInterpreter.from_files(VMInterpreter.input_files_for(args.source), input_text=args.input)
+    finished = interpreter.run(max_instructions=args.max_instructions)
+    print(interpreter.output_text())
+    for line in interpreter.report():
+        print(line, file=sys.stderr)
+    if not finished:
+        print('detenido después de {} instrucciones'.format(interpreter.executed), file=sys.stderr)
+    sys.exit(1 if interpreter.os.error_code is not None else 0)
@@ -0,0 +1,266 @@
+from VMInstructions import VMInstructions
+
+
+class VMOptimizer():
+    """
+    optimización peephole sobre VMInstructions
+
+    - plegado de constantes: push constant 1, push constant 2, add -> push constant 3
+    - identidades: x + 0, x - 0, x | 0, x & -1, neg neg, not not
+    - if-goto con condición constante, pares push/pop sobre la misma posición
+    - asignación a arreglo sin pasar por temp 0 cuando el valor es un solo push
+    - salto a salto (jump threading), código muerto después de goto/return
+      y etiquetas sin referencias
+
+    temp 0 se considera memoria de trabajo del compilador: su valor no se
+    conserva entre sentencias
+
+    internamente cada instrucción es (opcode, segment, operand, name, line), las
+    instrucciones que reemplazan a otras toman la línea de la última reemplazada
+    """
+    BINARY_OPERATIONS = {
+        VMInstructions.ADD: lambda x, y: x + y,
+        VMInstructions.SUB: lambda x, y: x - y,
+        VMInstructions.AND: lambda x, y: x & y,
+        VMInstructions.OR: lambda x, y: x | y,
+        VMInstructions.EQ: lambda x, y: -1 if x == y else 0,
+        VMInstructions.GT: lambda x, y: -1 if x > y else 0,
+        VMInstructions.LT: lambda x, y: -1 if x < y else 0
+    }
+    UNARY_OPERATIONS = {
+        VMInstructions.NEG: lambda x: -x,
+        VMInstructions.NOT: lambda x: ~x
+    }
+    # operaciones que devuelven x cuando el segundo operando es la constante
+    RIGHT_IDENTITIES = {
+        VMInstructions.ADD: 0,
+        VMInstructions.SUB: 0,
+        VMInstructions.OR: 0,
+        VMInstructions.AND: -1
+    }
+    MAX_CONSTANT = 32767
+    MAX_PASSES = 16
+
+    @classmethod
+    def optimize(cls, instructions):
+        """
+        devuelve unas VMInstructions nuevas optimizadas, con líneas si instructions las tiene
+        """
+        optimized = [
+            instruction + (instructions.line_at(position),)
+            for position, instruction in enumerate(instructions)
+        ]
+
+        for _ in range(cls.MAX_PASSES):
+            size = len(optimized)
+            optimized = cls._peephole(optimized)
+            optimized = cls._per_function(optimized, cls._thread_jumps)
+            optimized = cls._remove_dead_code(optimized)
+            optimized = cls._per_function(optimized, cls._remove_unused_labels)
+            if len(optimized) == size:
+                break
+
+        result = VMInstructions(track_lines=instructions.lines is not None)
+        for opcode, segment, operand, name, line in optimized:
+            result.append(opcode, segment=segment, operand=operand, name=name, line=line)
+        return result
+
+    @classmethod
+    def _peephole(cls, instructions):
+        output = []
+        for instruction in instructions:
+            cls._push(output, instruction)
+        return output
+
+    @classmethod
+    def _push(cls, output, instruction):
+        # agrega la instrucción y simplifica el final de la salida
+        output.append(instruction)
+        replacement = cls._reduce(output)
+        if replacement is not None:
+            for new_instruction in replacement:
+                cls._push(output, new_instruction)
+
+    @classmethod
+    def _reduce(cls, output):
+        """
+        si el final de output se puede simplificar lo quita y devuelve su reemplazo
+        """
+        opcode, segment, operand, name, line = output[-1]
+        end = len(output) - 1
+
+        if opcode in cls.BINARY_OPERATIONS:
+            right = cls._constant_before(output, end)
+            if right is None:
+                return None
+            right_value, right_start = right
+            left = cls._constant_before(output, right_start)
+            if left is not None:
+                left_value, left_start = left
+                folded = cls._push_constant(cls.BINARY_OPERATIONS[opcode](left_value, right_value), line)
+                return cls._replace(output, left_start, folded)
+            elif cls.RIGHT_IDENTITIES.get(opcode) == right_value:
+                return cls._replace(output, right_start, [])
+        elif opcode in cls.UNARY_OPERATIONS:
+            if end > 0 and output[end - 1][0] == opcode:
+                return cls._replace(output, end - 1, [])
+            constant = cls._constant_before(output, end)
+            if constant is not None:
+                value, start = constant
+                return cls._replace(output, start, cls._push_constant(cls.UNARY_OPERATIONS[opcode](value), line))
+        elif opcode == VMInstructions.IF_GOTO:
+            constant = cls._constant_before(output, end)
+            if constant is not None:
+                value, start = constant
+                jump = [(VMInstructions.GOTO, 0, 0, name, line)] if value else []
+                return cls._replace(output, start, jump)
+        elif opcode == VMInstructions.POP:
+            if end > 0 and output[end - 1][:4] == (VMInstructions.PUSH, segment, operand, None):
+                return cls._replace(output, end - 1, [])
+            return cls._reduce_array_assignment(output)
+        return None
+
+    @classmethod
+    def _reduce_array_assignment(cls, output):
+        # push x, pop temp 0, pop pointer 1, push temp 0, pop that 0
+        # -> pop pointer 1, push x, pop that 0
+        if len(output) < 5:
+            return None
+        value, *rest = output[-5:]
+        expected = [
+            (VMInstructions.POP, VMInstructions.TEMP, 0, None),
+            (VMInstructions.POP, VMInstructions.POINTER, 1, None),
+            (VMInstructions.PUSH, VMInstructions.TEMP, 0, None),
+            (VMInstructions.POP, VMInstructions.THAT, 0, None)
+        ]
+        if [instruction[:4] for instruction in rest] != expected or value[0] != VMInstructions.PUSH:
+            return None
+        if value[1] in (VMInstructions.THAT, VMInstructions.POINTER, VMInstructions.TEMP):
+            return None
+        return cls._replace(output, len(output) - 5, [rest[1], value, rest[3]])
+
+    @classmethod
+    def _replace(cls, output, start, replacement):
+        # solo se reemplaza si el resultado es más corto
+        if len(replacement) >= len(output) - start:
+            return None
+        del output[start:]
+        return replacement
+
+    @classmethod
+    def _constant_before(cls, output, end):
+        """
+        (valor, inicio) si las instrucciones que terminan en end dejan una constante en la pila
+        """
+        if end < 1:
+            return None
+        opcode, segment, operand = output[end - 1][:3]
+        if opcode == VMInstructions.PUSH and segment == VMInstructions.CONSTANT:
+            return operand, end - 1
+        if opcode in cls.UNARY_OPERATIONS and end >= 2:
+            previous_opcode, previous_segment, previous_operand = output[end - 2][:3]
+            if previous_opcode == VMInstructions.PUSH and previous_segment == VMInstructions.CONSTANT:
+                return cls._to_word(cls.UNARY_OPERATIONS[opcode](previous_operand)), end - 2
+        return None
+
+    @classmethod
+    def _push_constant(cls, value, line=VMInstructions.NO_LINE):
+        # instrucciones más cortas que dejan value (16 bits con signo) en la pila
+        value = cls._to_word(value)
+        if value >= 0:
+            return [(VMInstructions.PUSH, VMInstructions.CONSTANT, value, None, line)]
+        elif value >= -cls.MAX_CONSTANT:
+            return [
+                (VMInstructions.PUSH, VMInstructions.CONSTANT, -value, None, line),
+                (VMInstructions.NEG, 0, 0, None, line)
+            ]
+        return [
+            (VMInstructions.PUSH, VMInstructions.CONSTANT, cls.MAX_CONSTANT, None, line),
+            (VMInstructions.NOT, 0, 0, None, line)
+        ]
+
+    @classmethod
+    def _to_word(cls, value):
+        value &= 0xFFFF
+        return value - 0x10000 if value & 0x8000 else value
+
+    @classmethod
+    def _per_function(cls, instructions, optimize_function):
+        # las etiquetas vm son locales a cada función
+        output = []
+        start = 0
+        for position in range(1, len(instructions) + 1):
+            if position == len(instructions) or instructions[position][0] == VMInstructions.FUNCTION:
+                output.extend(optimize_function(instructions[start:position]))
+                start = position
+        return output
+
+    @classmethod
+    def _thread_jumps(cls, instructions):
+        # etiqueta -> etiqueta a la que salta inmediatamente con goto
+        forwards = {}
+        for position, (opcode, _, _, name, _) in enumerate(instructions):
+            if opcode != VMInstructions.LABEL:
+                continue
+            following = cls._skip_labels(instructions, position)
+            if following < len(instructions) and instructions[following][0] == VMInstructions.GOTO:
+                forwards[name] = instructions[following][3]
+
+        output = []
+        for position, (opcode, segment, operand, name, line) in enumerate(instructions):
+            if opcode in (VMInstructions.GOTO, VMInstructions.IF_GOTO):
+                name = cls._final_label(forwards, name)
+                if opcode == VMInstructions.GOTO and cls._label_follows(instructions, position, name):
+                    continue
+            output.append((opcode, segment, operand, name, line))
+        return output
+
+    @classmethod
+    def _final_label(cls, forwards, label):
+        seen = set()
+        while label in forwards and label not in seen:
+            seen.add(label)
+            label = forwards[label]
+        return label
+
+    @classmethod
+    def _skip_labels(cls, instructions, position):
+        position += 1
+        while position < len(instructions) and instructions[position][0] == VMInstructions.LABEL:
+            position += 1
+        return position
+
+    @classmethod
+    def _label_follows(cls, instructions, position, label):
+        # goto L seguido solo de etiquetas hasta label L
+        position += 1
+        while position < len(instructions) and instructions[position][0] == VMInstructions.LABEL:
+            if instructions[position][3] == label:
+                return True
+            position += 1
+        return False
+
+    @classmethod
+    def _remove_dead_code(cls, instructions):
+        output = []
+        reachable = True
+        for instruction in instructions:
+            opcode = instruction[0]
+            if opcode in (VMInstructions.LABEL, VMInstructions.FUNCTION):
+                reachable = True
+            if reachable:
+                output.append(instruction)
+            if opcode in (VMInstructions.GOTO, VMInstructions.RETURN):
+                reachable = False
+        return output
+
+    @classmethod
+    def _remove_unused_labels(cls, instructions):
+        referenced = {
+            name for opcode, _, _, name, _ in instructions
+            if opcode in (VMInstructions.GOTO, VMInstructions.IF_GOTO)
+        }
+        return [
+            instruction for instruction in instructions
+            if instruction[0] != VMInstructions.LABEL or instruction[3] in referenced
+        ]
@@ -0,0 +1,134 @@
+from VMInterpreter import VMInterpreter
+from VMSerializer import VMSerializer
+import argparse
+import collections
+import os
+
+
+class VMProfiler():
+    """
+    perfil de ejecución de un programa vm sobre VMInterpreter
+
+    por cada función Clase.subrutina: instrucciones propias (self), instrucciones
+    incluyendo las funciones que llama (acumuladas) y llamadas; por línea de
+    código fuente cuando hay un mapa de líneas, y las pilas de llamadas en el
+    formato colapsado que leen las herramientas de flamegraph
+
+    las funciones del sistema operativo nativo no ejecutan instrucciones vm,
+    solo se cuentan sus llamadas
+    """
+    DEFAULT_TOP = 20
+
+    def __init__(self, interpreter, line_maps=None):
+        """
+        line_maps: diccionario programa -> lista con la ubicación en el código fuente
+        ('Main.jack:12') de cada instrucción de sus VMInstructions, o None si no se conoce
+        """
+        self.interpreter = interpreter
+        self.line_maps = line_maps or {}
+
+    @classmethod
+    def line_maps_for(cls, programs):
+        """
+        mapas de líneas de los .vm.map que existen junto a los archivos .vm de programs
+        """
+        line_maps = {}
+        for file_name, instructions in programs.items():
+            map_file_name = file_name + '.map'
+            if os.path.isfile(map_file_name):
+                with open(map_file_name, 'r') as map_file:
+                    line_maps[file_name] = VMSerializer.read_map(map_file, len(instructions))
+        return line_maps
+
+    def run(self, max_instructions=None):
+        return self.interpreter.run(max_instructions=max_instructions, profile=True)
+
+    def function_profile(self):
+        """
+        (función, propias, acumuladas, llamadas) ordenadas de más a menos instrucciones propias
+        """
+        names = self.interpreter.function_names
+        own = collections.Counter()
+        cumulative = collections.Counter()
+        for stack, count in self.interpreter.stack_counts.items():
+            own[stack[-1]] += count
+            # en una función recursiva las instrucciones se cuentan una sola vez
+            for function_id in set(stack):
+                cumulative[function_id] += count
+
+        profile = [
+            (names[function_id], own[function_id], cumulative[function_id], calls)
+            for function_id, calls in enumerate(self.interpreter.call_counts)
+            if calls or cumulative[function_id]
+        ]
+        profile.sort(key=lambda entry: (-entry[1], -entry[2], entry[0]))
+        return profile
+
+    def line_profile(self):
+        """
+        (ubicación, instrucciones) ordenadas de más a menos, vacía si no hay mapas de líneas
+        """
+        if not self.line_maps:
+            return []
+        lines = collections.Counter()
+        for (program_name, position), count in zip(self.interpreter.sources, self.interpreter.instruction_counts):
+            if not count:
+                continue
+            line_map = self.line_maps.get(program_name)
+            location = line_map[position] if line_map and position < len(line_map) else None
+            lines[location or '?'] += count
+        return lines.most_common()
+
+    def collapsed_stacks(self):
+        """
+        una línea 'Main.main;Main.fib;Main.fib instrucciones' por cada pila de llamadas
+        """
+        names = self.interpreter.function_names
+        return [
+            '{} {}'.format(';'.join(names[function_id] for function_id in stack), count)
+            for stack, count in sorted(self.interpreter.stack_counts.items())
+            if count
+        ]
+
+    def report(self, top=DEFAULT_TOP):
+        total = self.interpreter.executed or 1
+        lines = self.interpreter.report()[:1]
+        lines.append('{:>12} {:>7} {:>12} {:>7} {:>10}  {}'.format(
+            'propias', '%', 'acumuladas', '%', 'llamadas', 'función'
+        ))
+        for name, own, cumulative, calls in self.function_profile()[:top]:
+            lines.append('{:>12} {:>6.1f}% {:>12} {:>6.1f}% {:>10}  {}'.format(
+                own, 100 * own / total, cumulative, 100 * cumulative / total, calls, name
+            ))
+
+        line_profile = self.line_profile()
+        if line_profile:
+            lines.append('')
+            lines.append('{:>12} {:>7}  {}'.format('instrucciones', '%', 'línea'))
+            for location, count in line_profile[:top]:
+                lines.append('{:>12} {:>6.1f}%  {}'.format(count, 100 * count / total, location))
+        return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ejecuta archivos .vm y muestra el perfil por función")
+    parser.add_argument("source", help="archivo .vm o directorio con archivos .vm")
+    parser.add_argument("--max-instructions", type=int, default=None,
+                        help="detiene la ejecución después de este número de instrucciones vm")
+    parser.add_argument("--input", default='',
+                        help="texto que leen las funciones de Keyboard")
+    parser.add_argument("--top", type=int, default=VMProfiler.DEFAULT_TOP,
+                        help="funciones y líneas que se muestran")
+    parser.add_argument("--collapsed", default=None,
+                        help="archivo donde se escriben las pilas de llamadas en formato colapsado")
+    args = parser.parse_args()
+
+    programs = VMInterpreter.read_files(VMInterpreter.input_files_for(args.source))
+    interpreter = VMInterpreter(programs, input_text=args.input)
+    profiler = VMProfiler(interpreter, line_maps=VMProfiler.line_maps_for(programs))
+    profiler.run(max_instructions=args.max_instructions)
+    for line in profiler.report(top=args.top):
+        print(line)
+    if args.collapsed:
+        with open(args.collapsed, 'w') as collapsed_file:
+            collapsed_file.write('\n'.join(profiler.collapsed_stacks()) + '\n')
@@ -0,0 +1,91 @@
+from VMInstructions import VMInstructions
+
+
+class VMSerializer():
+    """
+    convierte VMInstructions en el texto de un archivo .vm y lee ese texto de vuelta
+    """
+    BLOCK_SIZE = 4096
+
+    @classmethod
+    def command_at(cls, instructions, position):
+        opcode = instructions.opcodes[position]
+        opcode_name = VMInstructions.OPCODE_NAMES[opcode]
+
+        if opcode <= VMInstructions.POP:
+            return '{} {} {}'.format(
+                opcode_name,
+                VMInstructions.SEGMENT_NAMES[instructions.segments[position]],
+                instructions.operands[position]
+            )
+        elif opcode in (VMInstructions.FUNCTION, VMInstructions.CALL):
+            return '{} {} {}'.format(opcode_name, instructions.name_at(position), instructions.operands[position])
+        elif opcode in (VMInstructions.LABEL, VMInstructions.GOTO, VMInstructions.IF_GOTO):
+            return '{} {}'.format(opcode_name, instructions.name_at(position))
+        return opcode_name
+
+    @classmethod
+    def commands(cls, instructions, start=0, stop=None):
+        stop = len(instructions) if stop is None else stop
+        return [cls.command_at(instructions, position) for position in range(start, stop)]
+
+    @classmethod
+    def write(cls, instructions, output_file, start=0, block_size=BLOCK_SIZE):
+        """
+        escribe las instrucciones desde start en bloques de block_size comandos
+        """
+        for block_start in range(start, len(instructions), block_size):
+            block = cls.commands(instructions, block_start, min(block_start + block_size, len(instructions)))
+            output_file.write('\n'.join(block) + '\n')
+
+    @classmethod
+    def write_map(cls, instructions, map_file, source_name, start=0):
+        """
+        escribe 'índice archivo:línea' por cada instrucción desde start que tiene línea
+        """
+        if instructions.lines is None:
+            return
+        map_file.writelines(
+            '{} {}:{}\n'.format(position, source_name, instructions.lines[position])
+            for position in range(start, len(instructions))
+            if instructions.lines[position] != VMInstructions.NO_LINE
+        )
+
+    @classmethod
+    def read_map(cls, map_file, size):
+        """
+        lista con la ubicación 'archivo:línea' de cada una de las size instrucciones,
+        None en las que no están en el mapa
+        """
+        locations = [None] * size
+        for line in map_file:
+            position, _, location = line.strip().partition(' ')
+            if location and int(position) < size:
+                locations[int(position)] = location
+        return locations
+
+    @classmethod
+    def read(cls, input_file):
+        """
+        VMInstructions con los comandos de un archivo .vm, ignora los comentarios y las líneas vacías
+        """
+        instructions = VMInstructions()
+        for line_number, line in enumerate(input_file, 1):
+            words = line.split('//', 1)[0].split()
+            if not words:
+                continue
+            opcode = VMInstructions.OPCODES.get(words[0])
+            try:
+                if opcode is None:
+                    raise ValueError('comando desconocido {!r}'.format(words[0]))
+                elif opcode <= VMInstructions.POP:
+                    instructions.append(opcode, segment=VMInstructions.SEGMENTS[words[1]], operand=int(words[2]))
+                elif opcode in (VMInstructions.FUNCTION, VMInstructions.CALL):
+                    instructions.append(opcode, operand=int(words[2]), name=words[1])
+                elif opcode in (VMInstructions.LABEL, VMInstructions.GOTO, VMInstructions.IF_GOTO):
+                    instructions.append(opcode, name=words[1])
+                else:
+                    instructions.append(opcode)
+            except (IndexError, KeyError, ValueError) as error:
+                raise SyntaxError('línea {}: {!r}: {}'.format(line_number, line.strip(), error))
+        return instructions
@@ -0,0 +1,438 @@
+from VMInstructions import VMInstructions
+from VMInterpreter import VMInterpreter
+from CallGraph import CallGraph
+import argparse
+import os
+import sys
+
+
+class VMTranslator():
+    """
+    traduce VMInstructions a lenguaje ensamblador hack, sin volver a leer texto .vm
+
+    - el tope de la pila vive en D: una instrucción que deja un valor lo deja en D
+      y la siguiente lo usa sin leerlo de la memoria; D se escribe en la pila solo
+      cuando hace falta (otro push, etiquetas, saltos y llamadas)
+    - patrones fusionados: push constant o push de una dirección seguido de add,
+      sub, and, or o eq (gt y lt solo con constantes) opera directamente con A o M,
+      y una comparación, sola o con not, seguida de if-goto salta sin construir el booleano
+    - gt y lt no desbordan: con operandos de distinto signo el resultado sale del
+      signo de x, la subrutina compartida $$COMPARE lo resuelve para dos variables
+    - call y return saltan a las subrutinas compartidas $$CALL y $$RETURN que
+      guardan y restauran el marco, return deja el valor devuelto en D
+    - el bootstrap inicia SP y llama a Sys.init, o a Main.main si el programa no
+      define Sys.init; si el punto de entrada vuelve el programa queda en $$HALT
+
+    como en el traductor de nand2tetris las variables static de cada programa se
+    llaman Archivo.i y las etiquetas Función$etiqueta; R13, R14 y R15 son de uso
+    interno
+    """
+    STACK_BASE = 256
+    TEMP_BASE = 5
+    ROM_SIZE = 32768
+    MAX_CONSTANT = 32767
+    BASE_REGISTERS = {
+        VMInstructions.LOCAL: 'LCL',
+        VMInstructions.ARGUMENT: 'ARG',
+        VMInstructions.THIS: 'THIS',
+        VMInstructions.THAT: 'THAT'
+    }
+    POINTER_REGISTERS = ('THIS', 'THAT')
+    # desplazamientos de local, argument, this y that que se suman con A=A+1 sin tocar D
+    MAX_UNROLLED_OFFSET = 3
+    # variables locales que se inician sin ciclo
+    MAX_UNROLLED_LOCALS = 4
+
+    # D = x op y con x en D e y en A o M
+    OPERAND_COMPUTATIONS = {
+        VMInstructions.ADD: 'D+{}',
+        VMInstructions.SUB: 'D-{}',
+        VMInstructions.AND: 'D&{}',
+        VMInstructions.OR: 'D|{}',
+        VMInstructions.EQ: 'D-{}',
+        VMInstructions.GT: 'D-{}',
+        VMInstructions.LT: 'D-{}'
+    }
+    # D = x op y con y en D y x en M
+    STACK_COMPUTATIONS = {
+        VMInstructions.ADD: 'D+M',
+        VMInstructions.SUB: 'M-D',
+        VMInstructions.AND: 'D&M',
+        VMInstructions.OR: 'D|M',
+        VMInstructions.EQ: 'M-D'
+    }
+    # las comparaciones dejan en D un valor con el signo de x - y y saltan según él,
+    # en eq la resta puede desbordar sin cambiar si vale 0
+    JUMPS = {
+        VMInstructions.EQ: 'JEQ',
+        VMInstructions.GT: 'JGT',
+        VMInstructions.LT: 'JLT'
+    }
+    NEGATED_JUMPS = {'JEQ': 'JNE', 'JNE': 'JEQ', 'JGT': 'JLE', 'JLT': 'JGE'}
+    UNARY_COMPUTATIONS = {
+        VMInstructions.NEG: 'D=-D',
+        VMInstructions.NOT: 'D=!D'
+    }
+
+    # subrutinas compartidas, las llamadas dejan la dirección de la función en R13,
+    # la de retorno en R14 y el número de argumentos en D
+    CALL_STUB = (
+        '($$CALL)',
+        # R15 = nuevo ARG
+        '@SP', 'D=M-D', '@R15', 'M=D',
+        '@R14', 'D=M', '@SP', 'A=M', 'M=D',
+        '@LCL', 'D=M', '@SP', 'AM=M+1', 'M=D',
+        '@ARG', 'D=M', '@SP', 'AM=M+1', 'M=D',
+        '@THIS', 'D=M', '@SP', 'AM=M+1', 'M=D',
+        '@THAT', 'D=M', '@SP', 'AM=M+1', 'M=D',
+        '@SP', 'MD=M+1', '@LCL', 'M=D',
+        '@R15', 'D=M', '@ARG', 'M=D',
+        '@R13', 'A=M', '0;JMP'
+    )
+    # D = un valor con el signo de x - y sin desbordar: x - y si x e y tienen el mismo
+    # signo y x | 1 si no; x es el tope de la pila en la memoria, y llega en R13 y la
+    # dirección de retorno en R15
+    COMPARE_STUB = (
+        '($$COMPARE)',
+        '@SP', 'AM=M-1', 'D=M', '@R14', 'M=D',
+        '@$$COMPARE.NEGATIVE', 'D;JLT',
+        '@R13', 'D=M', '@$$COMPARE.SIGNS_DIFFER', 'D;JLT',
+        '($$COMPARE.SAME_SIGN)',
+        '@R14', 'D=M', '@R13', 'D=D-M', '@R15', 'A=M', '0;JMP',
+        '($$COMPARE.NEGATIVE)',
+        '@R13', 'D=M', '@$$COMPARE.SAME_SIGN', 'D;JLT',
+        '($$COMPARE.SIGNS_DIFFER)',
+        '@R14', 'D=M', '@1', 'D=D|A', '@R15', 'A=M', '0;JMP'
+    )
+    # el valor devuelto llega y vuelve en D, SP queda en el ARG de la función que vuelve
+    RETURN_STUB = (
+        '($$RETURN)',
+        '@R13', 'M=D',
+        '@ARG', 'D=M', '@SP', 'M=D',
+        '@LCL', 'AM=M-1', 'D=M', '@THAT', 'M=D',
+        '@LCL', 'AM=M-1', 'D=M', '@THIS', 'M=D',
+        '@LCL', 'AM=M-1', 'D=M', '@ARG', 'M=D',
+        '@LCL', 'AM=M-1', 'D=M', '@R14', 'M=D',
+        '@LCL', 'A=M-1', 'D=M', '@R15', 'M=D',
+        '@R14', 'D=M', '@LCL', 'M=D',
+        '@R13', 'D=M', '@R15', 'A=M', '0;JMP'
+    )
+
+    def __init__(self, programs):
+        """
+        programs: diccionario nombre -> VMInstructions, un elemento por archivo .vm,
+        cada uno tiene sus propias variables static
+        """
+        self.lines = []
+        # True si el tope de la pila está en D y no en la memoria
+        self.cached = False
+        self.function_name = None
+        self.static_prefix = None
+        self.label_count = 0
+        self.functions = {
+            instructions.name_at(position)
+            for instructions in programs.values()
+            for position in range(len(instructions))
+            if instructions.opcodes[position] == VMInstructions.FUNCTION
+        }
+
+        self._bootstrap()
+        for program_name, instructions in programs.items():
+            self.static_prefix = os.path.splitext(os.path.basename(program_name))[0]
+            position = 0
+            while position < len(instructions):
+                position = self._translate(instructions, position)
+
+    @classmethod
+    def from_files(cls, file_names):
+        return cls(VMInterpreter.read_files(file_names))
+
+    @classmethod
+    def input_files_for(cls, args):
+        """
+        archivos .vm de cada archivo o directorio de args
+        """
+        return [file_name for arg in args for file_name in VMInterpreter.input_files_for(arg)]
+
+    @classmethod
+    def output_file_for(cls, arg, extension='.asm'):
+        """
+        Directorio/Directorio.asm para un directorio, Archivo.asm para un archivo
+        """
+        if os.path.isdir(arg):
+            directory = os.path.normpath(arg)
+            return os.path.join(directory, os.path.basename(os.path.abspath(directory)) + extension)
+        return os.path.splitext(arg)[0] + extension
+
+    def instruction_count(self):
+        # las etiquetas no ocupan una posición de la ROM
+        return sum(1 for line in self.lines if not line.startswith('('))
+
+    def report(self, output_file_name):
+        count = self.instruction_count()
+        return '{}: {} instrucciones hack ({:.1%} de la ROM)'.format(output_file_name, count, count / self.ROM_SIZE)
+
+    def write(self, output_file):
+        output_file.write('\n'.join(self.lines) + '\n')
+
+    def _emit(self, *lines):
+        self.lines.extend(lines)
+
+    def _new_label(self, kind):
+        self.label_count += 1
+        return '{}${}.{}'.format(self.function_name, kind, self.label_count)
+
+    def _bootstrap(self):
+        entry_points = [name for name in CallGraph.ENTRY_POINTS if name in self.functions]
+        if not entry_points:
+            raise NameError('el programa no define {}'.format(' ni '.join(CallGraph.ENTRY_POINTS)))
+        self._emit(
+            '@{}'.format(self.STACK_BASE), 'D=A', '@SP', 'M=D',
+            '@$$HALT', 'D=A', '@R14', 'M=D',
+            '@{}'.format(entry_points[0]), 'D=A', '@R13', 'M=D',
+            'D=0', '@$$CALL', '0;JMP',
+            '($$HALT)', '@$$HALT', '0;JMP'
+        )
+        self._emit(*self.CALL_STUB)
+        self._emit(*self.RETURN_STUB)
+        self._emit(*self.COMPARE_STUB)
+
+    def _flush(self):
+        # escribe el tope de la pila en la memoria
+        if self.cached:
+            self._emit('@SP', 'AM=M+1', 'A=A-1', 'M=D')
+            self.cached = False
+
+    def _load(self):
+        # lleva el tope de la pila a D
+        if not self.cached:
+            self._emit('@SP', 'AM=M-1', 'D=M')
+            self.cached = True
+
+    def _address(self, segment, index):
+        """
+        instrucciones que dejan la dirección de segment index en A sin cambiar D, o None
+        """
+        if segment == VMInstructions.STATIC:
+            return ['@{}.{}'.format(self.static_prefix, index)]
+        elif segment == VMInstructions.TEMP:
+            return ['@R{}'.format(self.TEMP_BASE + index)]
+        elif segment == VMInstructions.POINTER:
+            return ['@' + self.POINTER_REGISTERS[index]]
+        elif index > self.MAX_UNROLLED_OFFSET:
+            return None
+        register = '@' + self.BASE_REGISTERS[segment]
+        if index == 0:
+            return [register, 'A=M']
+        return [register, 'A=M+1'] + ['A=A+1'] * (index - 1)
+
+    def _base_address(self, segment, index):
+        # D = dirección de segment index para desplazamientos grandes
+        return ['@{}'.format(index), 'D=A', '@' + self.BASE_REGISTERS[segment], 'D=D+M']
+
+    def _constant(self, value):
+        # D = value
+        value = (value + 0x8000) % 0x10000 - 0x8000
+        if value in (-1, 0, 1):
+            return ['D={}'.format(value)]
+        elif value > 0:
+            return ['@{}'.format(value), 'D=A']
+        elif value >= -self.MAX_CONSTANT:
+            return ['@{}'.format(-value), 'D=-A']
+        return ['@{}'.format(self.MAX_CONSTANT), 'D=!A']
+
+    def _translate(self, instructions, position):
+        """
+        traduce la instrucción en position y las que se fusionan con ella,
+        devuelve la posición de la siguiente
+        """
+        opcode, segment, operand, name = instructions.instruction(position)
+        following = instructions.opcodes[position + 1] if position + 1 < len(instructions) else None
+
+        if opcode == VMInstructions.PUSH:
+            if following in self.OPERAND_COMPUTATIONS:
+                fused = self._fused_operation(segment, operand, following)
+                if fused:
+                    return self._after_computation(instructions, position + 1)
+            self._push(segment, operand)
+        elif opcode == VMInstructions.POP:
+            self._pop(segment, operand)
+        elif opcode in self.STACK_COMPUTATIONS:
+            self._load()
+            self._emit('@SP', 'AM=M-1', 'D=' + self.STACK_COMPUTATIONS[opcode])
+            return self._after_computation(instructions, position)
+        elif opcode in self.JUMPS:
+            # gt y lt con y en D y x en la pila
+            self._load()
+            return_label = self._new_label('compare')
+            self._emit('@R13', 'M=D', '@' + return_label, 'D=A', '@R15', 'M=D', '@$$COMPARE', '0;JMP')
+            self._emit('({})'.format(return_label))
+            return self._after_computation(instructions, position)
+        elif opcode in self.UNARY_COMPUTATIONS:
+            # not es bit a bit: not; if-goto no se puede saltar con JEQ salvo que x sea 0 o -1,
+            # eso solo se sabe después de una comparación (_after_computation)
+            self._load()
+            self._emit(self.UNARY_COMPUTATIONS[opcode])
+        elif opcode == VMInstructions.LABEL:
+            self._flush()
+            self._emit('({}${})'.format(self.function_name, name))
+        elif opcode == VMInstructions.GOTO:
+            self._flush()
+            self._emit('@{}${}'.format(self.function_name, name), '0;JMP')
+        elif opcode == VMInstructions.IF_GOTO:
+            self._load()
+            self._jump(name, 'JNE')
+        elif opcode == VMInstructions.FUNCTION:
+            self._function(name, operand)
+        elif opcode == VMInstructions.CALL:
+            self._call(name, operand)
+        else:
+            self._load()
+            self._emit('@$$RETURN', '0;JMP')
+            self.cached = False
+        return position + 1
+
+    def _push(self, segment, index):
+        self._flush()
+        if segment == VMInstructions.CONSTANT:
+            self._emit(*self._constant(index))
+        else:
+            address = self._address(segment, index)
+            if address is None:
+                address = self._base_address(segment, index) + ['A=D']
+            self._emit(*address)
+            self._emit('D=M')
+        self.cached = True
+
+    def _pop(self, segment, index):
+        if segment == VMInstructions.CONSTANT:
+            raise SyntaxError('pop constant no es un comando válido')
+        address = self._address(segment, index)
+        if address is not None:
+            self._load()
+            self._emit(*address)
+            self._emit('M=D')
+        elif self.cached:
+            # el valor espera en R13 mientras se calcula la dirección
+            self._emit('@R13', 'M=D')
+            self._emit(*self._base_address(segment, index))
+            self._emit('@R14', 'M=D', '@R13', 'D=M', '@R14', 'A=M', 'M=D')
+        else:
+            self._emit(*self._base_address(segment, index))
+            self._emit('@R13', 'M=D', '@SP', 'AM=M-1', 'D=M', '@R13', 'A=M', 'M=D')
+        self.cached = False
+
+    def _fused_operation(self, segment, index, operation):
+        """
+        push segment index seguido de operation con el segundo operando en D,
+        devuelve False si el operando no se puede leer sin usar D
+        """
+        if segment == VMInstructions.CONSTANT:
+            if not 0 <= index <= self.MAX_CONSTANT:
+                return False
+            self._load()
+            if index == 0 and operation != VMInstructions.AND:
+                # x + 0, x - 0, x | 0 y la resta de una comparación con 0 no cambian D
+                return True
+            if index == 1 and operation in (VMInstructions.ADD, VMInstructions.SUB):
+                self._emit('D=D+1' if operation == VMInstructions.ADD else 'D=D-1')
+                return True
+            if operation in (VMInstructions.GT, VMInstructions.LT):
+                # x - k solo desborda con x < 0, y entonces x ya tiene el signo del resultado
+                sign_label = self._new_label('sign')
+                self._emit('@' + sign_label, 'D;JLT', '@{}'.format(index), 'D=D-A', '({})'.format(sign_label))
+                return True
+            self._emit('@{}'.format(index), 'D=' + self.OPERAND_COMPUTATIONS[operation].format('A'))
+            return True
+
+        address = self._address(segment, index)
+        if address is None or operation in (VMInstructions.GT, VMInstructions.LT):
+            return False
+        self._load()
+        self._emit(*address)
+        self._emit('D=' + self.OPERAND_COMPUTATIONS[operation].format('M'))
+        return True
+
+    def _after_computation(self, instructions, position):
+        """
+        termina la operación en position, que ya dejó su resultado en D (en las
+        comparaciones un valor con el signo de x - y), devuelve la posición de la siguiente
+        """
+        operation = instructions.opcodes[position]
+        self.cached = True
+        if operation not in self.JUMPS:
+            return position + 1
+
+        jump = self.JUMPS[operation]
+        following = instructions.opcodes[position + 1: position + 3].tolist()
+        if following[:1] == [VMInstructions.IF_GOTO]:
+            self._jump(instructions.name_at(position + 1), jump)
+            return position + 2
+        if following == [VMInstructions.NOT, VMInstructions.IF_GOTO]:
+            self._jump(instructions.name_at(position + 2), self.NEGATED_JUMPS[jump])
+            return position + 3
+
+        true_label = self._new_label('true')
+        if operation == VMInstructions.EQ:
+            # con x - y = 0 se salta y !0 = -1, si no -1 pasa a !-1 = 0
+            self._emit('@' + true_label, 'D;JEQ', 'D=-1', '({})'.format(true_label), 'D=!D')
+        else:
+            end_label = self._new_label('end')
+            self._emit(
+                '@' + true_label, 'D;' + jump, 'D=0', '@' + end_label, '0;JMP',
+                '({})'.format(true_label), 'D=-1', '({})'.format(end_label)
+            )
+        return position + 1
+
+    def _jump(self, name, jump):
+        # salta a la etiqueta name según D, que ya no es parte de la pila
+        self._emit('@{}${}'.format(self.function_name, name), 'D;' + jump)
+        self.cached = False
+
+    def _function(self, name, num_locals):
+        self.function_name = name
+        self.cached = False
+        self._emit('({})'.format(name))
+        if num_locals == 1:
+            self._emit('@SP', 'AM=M+1', 'A=A-1', 'M=0')
+        elif num_locals <= self.MAX_UNROLLED_LOCALS and num_locals:
+            self._emit('@SP', 'A=M', 'M=0')
+            self._emit(*['A=A+1', 'M=0'] * (num_locals - 1))
+            self._emit('D=A+1', '@SP', 'M=D')
+        elif num_locals:
+            loop_label = self._new_label('locals')
+            self._emit(
+                '@{}'.format(num_locals), 'D=A',
+                '({})'.format(loop_label), '@SP', 'AM=M+1', 'A=A-1', 'M=0', 'D=D-1', '@' + loop_label, 'D;JGT'
+            )
+
+    def _call(self, name, num_args):
+        if name not in self.functions:
+            raise NameError('función no definida: {}'.format(name))
+        self._flush()
+        return_label = self._new_label('ret')
+        self._emit('@' + return_label, 'D=A', '@R14', 'M=D', '@' + name, 'D=A', '@R13', 'M=D')
+        self._emit(*self._constant(num_args))
+        self._emit('@$$CALL', '0;JMP', '({})'.format(return_label))
+        # el valor devuelto vuelve en D
+        self.cached = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="traduce archivos .vm a lenguaje ensamblador hack")
+    parser.add_argument("sources", nargs='+',
+                        help="archivos .vm o directorios con archivos .vm, por ejemplo el programa y el sistema operativo")
+    parser.add_argument("-o", "--output", default=None,
+                        help="archivo .asm de salida (por defecto junto a la primera fuente)")
+    args = parser.parse_args()
+
+    output_file_name = args.output or VMTranslator.output_file_for(args.sources[0])
+    try:
+        translator = VMTranslator.from_files(VMTranslator.input_files_for(args.sources))
+    except (NameError, SyntaxError) as error:
+        print('{}: {}'.format(type(error).__name__, error), file=sys.stderr)
+        sys.exit(1)
+    with open(output_file_name, 'w') as output_file:
+        translator.write(output_file)
+    print(translator.report(output_file_name))
+    sys.exit(1 if translator.instruction_count() > VMTranslator.ROM_SIZE else 0)
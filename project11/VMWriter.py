@@ -1,88 +1,159 @@
+from VMInstructions import VMInstructions
+from VMSerializer import VMSerializer
+from VMOptimizer import VMOptimizer
+
+
 class VMWriter():
     # Operadores unarios
     UNARY_OPERATORS = {
-        '-': 'neg',
-        '~': 'not'
+        '-': VMInstructions.NEG,
+        '~': VMInstructions.NOT
     }
     # Operadores aritméticos lógicos
     ARITHMETIC_LOGICAL_OPERATORS = {
-        '+': 'add',
-        '-': 'sub',
-        '=': 'eq',
-        '>': 'gt',
-        '<': 'lt',
-        '&': 'and',
-        '|': 'or'
+        '+': VMInstructions.ADD,
+        '-': VMInstructions.SUB,
+        '=': VMInstructions.EQ,
+        '>': VMInstructions.GT,
+        '<': VMInstructions.LT,
+        '&': VMInstructions.AND,
+        '|': VMInstructions.OR
+    }
+    # clases de símbolo que se guardan en un segmento con otro nombre
+    SEGMENT_ALIASES = {
+        'field': 'this',
+        'var': 'local',
+        'arg': 'argument'
     }
+    # comandos que se escriben en el archivo en cada bloque
+    BUFFER_COMMANDS = VMSerializer.BLOCK_SIZE
 
-    def __init__(self, output_file):
-        # crea un archivo nuevo archivo con extensión .vm
+    def __init__(self, output_file=None, buffer_commands=BUFFER_COMMANDS, map_file=None, source_name=None,
+                 track_lines=False):
+        """
+        construye los comandos como VMInstructions, sin output_file quedan en memoria
+        y se obtienen con get_instructions o get_commands
+
+        map_file: junto con cada comando escribe en map_file 'índice source_name:línea',
+        la línea es la última indicada con set_line
+        track_lines: guarda las líneas en las VMInstructions aunque no haya map_file,
+        sin ninguno de los dos set_line no tiene efecto
+        """
         self.output_file = output_file
+        self.buffer_commands = buffer_commands
+        self.map_file = map_file
+        self.source_name = source_name
+        self.instructions = VMInstructions(track_lines=track_lines or map_file is not None)
+        self.flushed = 0
 
     def write_push(self, segment, index):
         # escribe un comando push vm
-        self.output_file.write('push {} {}\n'.format(segment, index))
+        self._emit_memory_access(VMInstructions.PUSH, segment, index)
 
     def write_pop(self, segment, index):
         """
         escribe un comando pop
         """
-        self.output_file.write('pop {} {}\n'.format(segment, index))
+        self._emit_memory_access(VMInstructions.POP, segment, index)
 
     def write_arithmetic(self, command):
         """
         escribe un comando con lógica aritmética
         comandos: ADD, SUB, EQ, GT, LT, AND, OR
         """
-        self.output_file.write(
-            '{}\n'.format(self.ARITHMETIC_LOGICAL_OPERATORS[command])
-        )
+        self.instructions.append(self.ARITHMETIC_LOGICAL_OPERATORS[command])
 
     def write_unary(self, command):
         """
         escribe un comando unario
         commands: NEG, NOT
         """
-        self.output_file.write(
-            '{}\n'.format(self.UNARY_OPERATORS[command])
-        )
+        self.instructions.append(self.UNARY_OPERATORS[command])
 
     def write_label(self, label):
         """
         escribe un comando label
         label: string
         """
-        self.output_file.write('label {}\n'.format(label))
+        self.instructions.append(VMInstructions.LABEL, name=label)
 
     def write_goto(self, label):
         """
         escribe un comando go to vm
         label: string
         """
-        self.output_file.write('goto {}\n'.format(label))
+        self.instructions.append(VMInstructions.GOTO, name=label)
 
     def write_ifgoto(self, label):
         """
         label: string
         """
-        self.output_file.write('if-goto {}\n'.format(label))
+        self.instructions.append(VMInstructions.IF_GOTO, name=label)
 
     def write_call(self, name, num_args):
         """
         escribe un comando de llamada vm
         """
-        self.output_file.write(
-            'call {} {}\n'.format(name, num_args)
-        )
+        self.instructions.append(VMInstructions.CALL, operand=int(num_args), name=name)
 
     def write_function(self, name, num_locals):
         """
         escribe un comando de llamada vm
         """
-        self.output_file.write('function {} {}\n'.format(name, num_locals))
+        self.instructions.append(VMInstructions.FUNCTION, operand=int(num_locals), name=name)
 
     def write_return(self):
         """
         escribe un comando return vm
         """
-        self.output_file.write('return\n')
+        self.instructions.append(VMInstructions.RETURN)
+
+    def set_line(self, line):
+        """
+        línea del código fuente de los comandos que se escriben desde ahora
+        """
+        self.instructions.current_line = VMInstructions.NO_LINE if line is None else line
+
+    def insert(self, position, instructions):
+        """
+        inserta instructions antes de la instrucción en position, que aún no se ha escrito
+        """
+        self.instructions.insert(position, instructions)
+
+    def flush(self):
+        """
+        escribe en el archivo los comandos que aún no se han escrito
+        """
+        if self.output_file is None:
+            return
+        VMSerializer.write(self.instructions, self.output_file, start=self.flushed, block_size=self.buffer_commands)
+        if self.map_file is not None:
+            VMSerializer.write_map(self.instructions, self.map_file, self.source_name, start=self.flushed)
+        self.flushed = len(self.instructions)
+
+    def optimize(self):
+        """
+        aplica VMOptimizer a los comandos que aún no se han escrito,
+        devuelve cuántas instrucciones se eliminaron
+        """
+        pending = self.instructions.slice(self.flushed)
+        optimized = VMOptimizer.optimize(pending)
+
+        instructions = self.instructions.slice(0, self.flushed)
+        instructions.extend(optimized)
+        instructions.current_line = self.instructions.current_line
+        self.instructions = instructions
+        return len(pending) - len(optimized)
+
+    def get_instructions(self):
+        return self.instructions
+
+    def get_commands(self):
+        """
+        comandos vm en texto, sin salto de linea
+        """
+        return VMSerializer.commands(self.instructions)
+
+    def _emit_memory_access(self, opcode, segment, index):
+        segment = self.SEGMENT_ALIASES.get(segment, segment)
+        self.instructions.append(opcode, segment=VMInstructions.SEGMENTS[segment], operand=int(index))
@@ -0,0 +1,171 @@
+from CallGraph import CallGraph
+from VMInstructions import VMInstructions
+
+
+class WholeProgramOptimizer():
+    """
+    optimizaciones que necesitan ver todas las clases del programa a la vez
+    """
+    # instrucciones del cuerpo (sin function ni return) de una subrutina que se puede expandir
+    INLINE_MAX_SIZE = 8
+    # los argumentos de una llamada expandida se guardan en temp 1..7,
+    # temp 0 es memoria de trabajo del compilador
+    INLINE_TEMP_BASE = 1
+    INLINE_MAX_ARGUMENTS = 7
+    # instrucciones que no puede tener un cuerpo expandible
+    NOT_INLINABLE = frozenset([
+        VMInstructions.LABEL, VMInstructions.GOTO, VMInstructions.IF_GOTO,
+        VMInstructions.FUNCTION, VMInstructions.CALL, VMInstructions.RETURN
+    ])
+    STACK_EFFECTS = {
+        VMInstructions.PUSH: 1,
+        VMInstructions.POP: -1,
+        VMInstructions.NEG: 0,
+        VMInstructions.NOT: 0
+    }
+
+    @classmethod
+    def remove_unreachable(cls, programs):
+        """
+        quita las funciones a las que no se llega desde los puntos de entrada,
+        devuelve (programas nuevos, funciones eliminadas por programa)
+
+        funciones eliminadas: diccionario nombre -> lista de (función, instrucciones)
+        si el programa no define ningún punto de entrada no se elimina nada
+        """
+        graph = CallGraph(programs)
+        if not graph.entry_points():
+            return programs, {}
+        reachable = graph.reachable()
+
+        optimized = {}
+        removed = {}
+        for program_name, instructions in programs.items():
+            kept = VMInstructions(track_lines=instructions.lines is not None)
+            for function_name, start, stop in graph.function_ranges(instructions):
+                if function_name not in reachable:
+                    removed.setdefault(program_name, []).append((function_name, stop - start))
+                    continue
+                kept.extend(instructions, start, stop)
+            optimized[program_name] = kept
+        return optimized, removed
+
+    @classmethod
+    def inline_accessors(cls, programs, max_size=INLINE_MAX_SIZE):
+        """
+        reemplaza las llamadas a subrutinas triviales (getters, setters) por su cuerpo,
+        devuelve (programas nuevos, llamadas expandidas por programa)
+
+        llamadas expandidas: diccionario nombre -> lista de (función que llama, función llamada)
+
+        un cuerpo expandible no tiene variables locales, llamadas, etiquetas ni saltos,
+        termina en su único return y tiene como máximo max_size instrucciones; en la
+        copia los argumentos pasan a temp, pointer 0 a pointer 1 y this a that, así
+        el this de la función que llama no cambia
+        """
+        graph = CallGraph(programs)
+        bodies = {}
+        for function_name, (program_name, start, stop) in graph.functions.items():
+            body = cls._inline_body(programs[program_name], start, stop, max_size)
+            if body is not None:
+                bodies[function_name] = (program_name, body)
+        if not bodies:
+            return programs, {}
+
+        optimized = {}
+        sites = {}
+        for program_name, instructions in programs.items():
+            result = VMInstructions(track_lines=instructions.lines is not None)
+            caller = None
+            for position, (opcode, segment, operand, name) in enumerate(instructions):
+                # el código expandido queda en la línea de la llamada
+                line = instructions.line_at(position)
+                if opcode == VMInstructions.FUNCTION:
+                    caller = name
+                replacement = None
+                if opcode == VMInstructions.CALL and name in bodies:
+                    callee_program, body = bodies[name]
+                    replacement = cls._inline_call(body, operand, same_program=callee_program == program_name)
+                if replacement is None:
+                    result.append(opcode, segment=segment, operand=operand, name=name, line=line)
+                    continue
+                for instruction in replacement:
+                    result.append(*instruction, line=line)
+                sites.setdefault(program_name, []).append((caller, name))
+            optimized[program_name] = result if program_name in sites else instructions
+        return optimized, sites
+
+    @classmethod
+    def _inline_body(cls, instructions, start, stop, max_size):
+        """
+        instrucciones del cuerpo de la función entre start y stop sin el return final,
+        o None si no se puede expandir
+        """
+        if instructions.operands[start] != 0 or instructions.opcodes[stop - 1] != VMInstructions.RETURN:
+            return None
+        body = [instructions.instruction(position) for position in range(start + 1, stop - 1)]
+        if len(body) > max_size:
+            return None
+
+        depth = 0
+        for opcode, segment, operand, _ in body:
+            if opcode in cls.NOT_INLINABLE:
+                return None
+            if opcode <= VMInstructions.POP:
+                # that, pointer 1 y temp se usan en la copia, local no existe sin variables locales
+                if segment in (VMInstructions.LOCAL, VMInstructions.THAT, VMInstructions.TEMP):
+                    return None
+                if segment == VMInstructions.POINTER and operand != 0:
+                    return None
+            depth += cls.STACK_EFFECTS.get(opcode, -1)
+            if depth < 0:
+                return None
+        # return solo debe dejar el valor devuelto en la pila
+        return body if depth == 1 else None
+
+    @classmethod
+    def _inline_call(cls, body, num_args, same_program):
+        """
+        instrucciones que reemplazan a call con num_args argumentos en la pila,
+        o None si la llamada no se puede expandir
+        """
+        if num_args > cls.INLINE_MAX_ARGUMENTS:
+            return None
+
+        # el último argumento está en el tope de la pila
+        replacement = [
+            (VMInstructions.POP, VMInstructions.TEMP, cls.INLINE_TEMP_BASE + index, None)
+            for index in reversed(range(num_args))
+        ]
+        for opcode, segment, operand, name in body:
+            if opcode <= VMInstructions.POP:
+                if segment == VMInstructions.ARGUMENT:
+                    if operand >= num_args:
+                        return None
+                    segment, operand = VMInstructions.TEMP, cls.INLINE_TEMP_BASE + operand
+                elif segment == VMInstructions.THIS:
+                    segment = VMInstructions.THAT
+                elif segment == VMInstructions.POINTER:
+                    operand = 1
+                elif segment == VMInstructions.STATIC and not same_program:
+                    # static se resuelve por archivo, en otra clase sería otra variable
+                    return None
+            replacement.append((opcode, segment, operand, name))
+        return cls._remove_temp_round_trips(replacement)
+
+    @classmethod
+    def _remove_temp_round_trips(cls, instructions):
+        # pop temp k, push temp k se quita si temp k no se vuelve a usar
+        instructions = list(instructions)
+        position = 0
+        while position < len(instructions) - 1:
+            opcode, segment, operand, _ = instructions[position]
+            following = instructions[position + 1]
+            if (opcode == VMInstructions.POP and segment == VMInstructions.TEMP
+                    and following == (VMInstructions.PUSH, segment, operand, None)
+                    and not any(instruction[1:3] == (segment, operand) for instruction in instructions[position + 2:])):
+                del instructions[position:position + 2]
+                position = max(position - 1, 0)
+                continue
+            position += 1
+        return instructions
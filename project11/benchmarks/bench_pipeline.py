@@ -0,0 +1,477 @@
+"""
+rendimiento de cada etapa del compilador sobre un corpus fijo
+
+el corpus son los ejemplos de nand2tetris de benchmarks/corpus y archivos
+sintéticos que se generan en cada ejecución: expresiones muy largas,
+anidamiento profundo, miles de campos y literales de cadena enormes
+
+etapas: copiar el archivo (el límite de la entrada y salida), el tokenizador,
+JackAnalyzer --tokens-only, el CompilationEngine de project10 (xml) y el de
+project11 (vm en memoria), SymbolTable, VMWriter, JackCompiler.run de
+archivo a archivo, el xml y el vm con JackAnalyzer y JackCompiler por
+separado y los dos con una sola pasada de JackPipeline; por cada archivo se muestran tokens/s (o símbolos/s y
+comandos/s), líneas/s y el pico de memoria medido con tracemalloc; una etapa
+que no puede con un archivo se muestra con su error y no se compara
+
+los resultados se comparan con benchmarks/baseline.json, la medición sale con
+código 1 si alguna etapa es más lenta o usa más memoria que la tolerancia;
+la velocidad se compara relativa a un trabajo fijo de python medido junto a
+cada medición y se toma la mediana de --repeat mediciones, así el ruido de la
+máquina afecta menos; las etapas que escriben archivos admiten una tolerancia
+mayor (STAGE_TOLERANCES); la línea base sigue dependiendo de la máquina y se
+vuelve a generar con --save-baseline
+
+uso: python benchmarks/bench_pipeline.py [--repeat n] [--baseline archivo]
+                                          [--save-baseline] [--tolerance t]
+"""
+import argparse
+import glob
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+PROJECT11_DIRECTORY = os.path.dirname(BENCHMARKS_DIRECTORY)
+PROJECT10_DIRECTORY = os.path.join(os.path.dirname(PROJECT11_DIRECTORY), 'project10')
+
+sys.path.insert(0, PROJECT11_DIRECTORY)
+
+from JackTokenizer import JackTokenizer  # noqa: E402
+from JackParser import JackParser  # noqa: E402
+from CompilationEngine import CompilationEngine  # noqa: E402
+from SymbolTable import SymbolTable  # noqa: E402
+from VMInstructions import VMInstructions  # noqa: E402
+from VMWriter import VMWriter  # noqa: E402
+from JackCompiler import JackCompiler  # noqa: E402
+from JackPipeline import JackPipeline  # noqa: E402
+
+CORPUS_DIRECTORY = os.path.join(BENCHMARKS_DIRECTORY, 'corpus')
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIRECTORY, 'baseline.json')
+DEFAULT_REPEAT = 9
+DEFAULT_TOLERANCE = 0.25
+# las etapas que escriben archivos dependen del disco y varían más entre ejecuciones
+STAGE_TOLERANCES = {
+    'copy': 0.6,
+    'tokens_only': 0.4,
+    'end_to_end': 0.4,
+    'separate_builds': 0.4,
+    'single_pass': 0.4
+}
+MIN_MEASURE_TIME = 0.02
+REFERENCE_TEXT = 'let total = total + value [ index ] ; ' * 500
+
+# tamaño de los archivos sintéticos
+LONG_EXPRESSION_TERMS = 2000
+NESTING_DEPTH = 60
+NESTED_BLOCKS = 20
+FIELD_COUNT = 2000
+STRING_COUNT = 20
+STRING_LENGTH = 4000
+
+
+def load_classes(directory, *names):
+    """
+    clases names de los módulos del mismo nombre en directory
+
+    project10 y project11 tienen módulos con el mismo nombre, mientras se importan
+    los de directory se sacan de sys.modules los de project11 y después se restauran
+    """
+    local_names = [file_name[:-3] for file_name in os.listdir(directory) if file_name.endswith('.py')]
+    saved = {name: sys.modules.pop(name) for name in local_names if name in sys.modules}
+    sys.path.insert(0, directory)
+    try:
+        return [getattr(importlib.import_module(name), name) for name in names]
+    finally:
+        sys.path.remove(directory)
+        for name in local_names:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+Project10Tokenizer, Project10Engine, Project10Analyzer = load_classes(
+    PROJECT10_DIRECTORY, 'JackTokenizer', 'CompilationEngine', 'JackAnalyzer'
+)
+
+
+def long_expression_source():
+    terms = ' + '.join('(x * {} - y)'.format(index % 100) for index in range(LONG_EXPRESSION_TERMS))
+    return (
+        'class LongExpression {\n'
+        '    function int compute(int x, int y) {\n'
+        '        return ' + terms + ';\n'
+        '    }\n'
+        '}\n'
+    )
+
+
+def deep_nesting_source():
+    lines = ['class DeepNesting {', '    function int compute(int x) {', '        var int i;']
+    for block in range(NESTED_BLOCKS):
+        for depth in range(NESTING_DEPTH):
+            indent = ' ' * (8 + 4 * depth)
+            statement = 'while' if depth % 2 else 'if'
+            lines.append('{}{} (i < {}) {{'.format(indent, statement, depth + block))
+        lines.append('{}let i = i + x;'.format(' ' * (8 + 4 * NESTING_DEPTH)))
+        for depth in reversed(range(NESTING_DEPTH)):
+            lines.append('{}}}'.format(' ' * (8 + 4 * depth)))
+    lines += ['        return i;', '    }', '}', '']
+    return '\n'.join(lines)
+
+
+def many_fields_source():
+    lines = ['class ManyFields {']
+    lines += ['    field int value{};'.format(index) for index in range(FIELD_COUNT)]
+    lines += ['    constructor ManyFields new() {']
+    lines += ['        let value{0} = {0};'.format(index) for index in range(FIELD_COUNT)]
+    lines += ['        return this;', '    }', '', '    method int sum() {', '        var int total;']
+    lines += ['        let total = total + value{};'.format(index) for index in range(FIELD_COUNT)]
+    lines += ['        return total;', '    }', '}', '']
+    return '\n'.join(lines)
+
+
+def long_strings_source():
+    alphabet = 'abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ 0123456789 '
+    text = (alphabet * (STRING_LENGTH // len(alphabet) + 1))[:STRING_LENGTH]
+    lines = ['class LongStrings {', '    function void print() {']
+    lines += ['        do Output.printString("{}");'.format(text) for _ in range(STRING_COUNT)]
+    lines += ['        return;', '    }', '}', '']
+    return '\n'.join(lines)
+
+
+SYNTHETIC_SOURCES = {
+    'LongExpression.jack': long_expression_source,
+    'DeepNesting.jack': deep_nesting_source,
+    'ManyFields.jack': many_fields_source,
+    'LongStrings.jack': long_strings_source
+}
+
+
+def corpus_files(directory):
+    """
+    (nombre, ruta) de los ejemplos y de los archivos sintéticos escritos en directory
+    """
+    files = [
+        (os.path.relpath(path, CORPUS_DIRECTORY), path)
+        for path in sorted(glob.glob(os.path.join(CORPUS_DIRECTORY, '*', '*.jack')))
+    ]
+    for name, generate in SYNTHETIC_SOURCES.items():
+        path = os.path.join(directory, name)
+        with open(path, 'w') as source_file:
+            source_file.write(generate())
+        files.append((os.path.join('synthetic', name), path))
+    return files
+
+
+def count_tokens(source):
+    return sum(1 for _ in JackTokenizer(io.StringIO(source)))
+
+
+def tokenize(source, path):
+    for _ in JackTokenizer(io.StringIO(source)):
+        pass
+
+
+def project10_engine(source, path):
+    Project10Engine(Project10Tokenizer(io.StringIO(source)), io.StringIO()).compile_class()
+
+
+def copy_file(source, path):
+    # el límite de la entrada y salida: leer el archivo y escribirlo sin procesarlo
+    with open(path, 'r') as input_file, tempfile.TemporaryFile('w') as output_file:
+        output_file.write(input_file.read())
+
+
+def tokens_only(source, path):
+    with open(path, 'r') as input_file, tempfile.TemporaryFile('w') as output_file:
+        Project10Analyzer.run_tokens(input_file, output_file)
+
+
+def project11_engine(source, path):
+    CompilationEngine(JackTokenizer(io.StringIO(source)), None).compile_class()
+
+
+def symbol_operations(class_node):
+    # lo que hace CompilationEngine con las tablas: define cada declaración y busca cada nombre
+    operations = [('class', class_var_dec.kind, class_var_dec.type, class_var_dec.names)
+                  for class_var_dec in class_node.class_var_decs]
+    for subroutine in class_node.subroutines:
+        operations.append(('subroutine', None, None, ()))
+        for symbol_type, name in subroutine.parameters:
+            operations.append(('subroutine', 'argument', symbol_type, (name,)))
+        for var_dec in subroutine.var_decs:
+            operations.append(('subroutine', 'local', var_dec.type, var_dec.names))
+    return operations
+
+
+def symbol_table_stage(operations):
+    def run(source, path):
+        class_symbol_table = SymbolTable()
+        subroutine_symbol_table = SymbolTable(parent=class_symbol_table)
+        names = []
+        for scope, kind, symbol_type, declared in operations + [('subroutine', None, None, ())]:
+            if kind is None:
+                # los nombres se buscan antes de pasar a la siguiente subrutina
+                for name in names:
+                    subroutine_symbol_table.find_symbol_by_name(name)
+                names = []
+                subroutine_symbol_table.reset()
+                continue
+            table = class_symbol_table if scope == 'class' else subroutine_symbol_table
+            for name in declared:
+                table.define(name=name, symbol_type=symbol_type, kind=kind)
+                names.append(name)
+    return run
+
+
+def writer_calls(instructions):
+    """
+    llamadas a VMWriter que vuelven a construir instructions
+    """
+    arithmetic = {opcode: command for command, opcode in VMWriter.ARITHMETIC_LOGICAL_OPERATORS.items()}
+    unary = {opcode: command for command, opcode in VMWriter.UNARY_OPERATORS.items()}
+    calls = []
+    for opcode, segment, operand, name in instructions:
+        if opcode == VMInstructions.PUSH:
+            calls.append((VMWriter.write_push, (VMInstructions.SEGMENT_NAMES[segment], operand)))
+        elif opcode == VMInstructions.POP:
+            calls.append((VMWriter.write_pop, (VMInstructions.SEGMENT_NAMES[segment], operand)))
+        elif opcode in arithmetic:
+            calls.append((VMWriter.write_arithmetic, (arithmetic[opcode],)))
+        elif opcode in unary:
+            calls.append((VMWriter.write_unary, (unary[opcode],)))
+        elif opcode == VMInstructions.LABEL:
+            calls.append((VMWriter.write_label, (name,)))
+        elif opcode == VMInstructions.GOTO:
+            calls.append((VMWriter.write_goto, (name,)))
+        elif opcode == VMInstructions.IF_GOTO:
+            calls.append((VMWriter.write_ifgoto, (name,)))
+        elif opcode == VMInstructions.FUNCTION:
+            calls.append((VMWriter.write_function, (name, operand)))
+        elif opcode == VMInstructions.CALL:
+            calls.append((VMWriter.write_call, (name, operand)))
+        else:
+            calls.append((VMWriter.write_return, ()))
+    return calls
+
+
+def vm_writer_stage(calls):
+    def run(source, path):
+        vm_writer = VMWriter(io.StringIO())
+        for method, arguments in calls:
+            method(vm_writer, *arguments)
+        vm_writer.flush()
+    return run
+
+
+def end_to_end(source, path):
+    with open(path, 'r') as input_file, tempfile.TemporaryFile('w') as output_file:
+        JackCompiler.run(input_file, output_file)
+
+
+def separate_builds(source, path):
+    # xml y vm como antes de JackPipeline: cada herramienta vuelve a leer el archivo
+    with open(path, 'r') as input_file, tempfile.TemporaryFile('w') as output_file:
+        Project10Engine(Project10Tokenizer(input_file), output_file).compile_class()
+    end_to_end(source, path)
+
+
+def single_pass(source, path):
+    with open(path, 'r') as input_file, \
+            tempfile.TemporaryFile('w') as xml_file, tempfile.TemporaryFile('w') as vm_file:
+        JackPipeline.run(input_file, {'xml': xml_file, 'vm': vm_file})
+
+
+def reference_workload(source, path):
+    # trabajo fijo en python puro: separar palabras y contarlas en un diccionario
+    counts = {}
+    for word in REFERENCE_TEXT.split():
+        counts[word] = counts.get(word, 0) + 1
+
+
+def time_per_run(run, source, path):
+    # como en timeit, se repite run hasta que dura al menos MIN_MEASURE_TIME,
+    # los archivos pequeños se compilan en microsegundos
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        run(source, path)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_MEASURE_TIME:
+            return elapsed / runs
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def relative_time(run, source, path, repeat):
+    """
+    (tiempo por ejecución, tiempo relativo al trabajo de referencia), medianas de repeat mediciones
+
+    cada medición de run va junto a una del trabajo de referencia, así un cambio
+    de velocidad de la máquina durante la medición afecta a las dos por igual
+    """
+    times = []
+    ratios = []
+    for _ in range(repeat):
+        reference = time_per_run(reference_workload, source, path)
+        elapsed = time_per_run(run, source, path)
+        times.append(elapsed)
+        ratios.append(elapsed / reference)
+    return median(times), median(ratios)
+
+
+def peak_memory(run, source, path):
+    # tracemalloc hace más lento el código, la memoria se mide aparte
+    tracemalloc.start()
+    try:
+        run(source, path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(files, repeat):
+    """
+    diccionario 'etapa archivo' -> resultados
+    """
+    results = {}
+    for name, path in files:
+        with open(path, 'r') as source_file:
+            source = source_file.read()
+        tokens = count_tokens(source)
+        lines = source.count('\n')
+        class_node = JackParser(JackTokenizer(io.StringIO(source))).parse_class()
+        operations = symbol_operations(class_node)
+        symbols = 2 * sum(len(declared) for _, _, _, declared in operations)
+        compiler = CompilationEngine(JackTokenizer(io.StringIO(source)), None)
+        compiler.compile_class()
+        calls = writer_calls(compiler.vm_writer.get_instructions())
+        stages = (
+            ('copy', copy_file, tokens, 'tokens'),
+            ('tokenizer', tokenize, tokens, 'tokens'),
+            ('tokens_only', tokens_only, tokens, 'tokens'),
+            ('project10', project10_engine, tokens, 'tokens'),
+            ('project11', project11_engine, tokens, 'tokens'),
+            ('symbol_table', symbol_table_stage(operations), symbols, 'symbols'),
+            ('vm_writer', vm_writer_stage(calls), len(calls), 'commands'),
+            ('end_to_end', end_to_end, tokens, 'tokens'),
+            ('separate_builds', separate_builds, tokens, 'tokens'),
+            ('single_pass', single_pass, tokens, 'tokens')
+        )
+        for stage, run, units, unit_name in stages:
+            if not units:
+                # p. ej. una clase sin variables no tiene nada que medir en SymbolTable
+                continue
+            try:
+                # la velocidad de la máquina cambia entre ejecuciones, se compara contra el trabajo de referencia
+                elapsed, ratio = relative_time(run, source, path, repeat)
+                peak = peak_memory(run, source, path)
+            except Exception as error:
+                results['{} {}'.format(stage, name)] = {'error': '{}: {}'.format(type(error).__name__, error)}
+                continue
+            elapsed = max(elapsed, 1e-9)
+            ratio = max(ratio, 1e-9)
+            results['{} {}'.format(stage, name)] = {
+                'units': unit_name,
+                'units_per_second': units / elapsed,
+                'lines_per_second': lines / elapsed,
+                'relative_speed': units / ratio,
+                'peak_bytes': peak
+            }
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """
+    (clave, descripción) de los resultados peores que baseline por más de tolerance,
+    o de la tolerancia de la etapa en STAGE_TOLERANCES si es mayor
+    """
+    found = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None or 'error' in expected:
+            continue
+        if 'error' in result:
+            found.append((key, result['error']))
+            continue
+        speed_tolerance = max(tolerance, STAGE_TOLERANCES.get(key.split(' ', 1)[0], 0))
+        if result['relative_speed'] < expected['relative_speed'] * (1 - speed_tolerance):
+            found.append((key, '{:.0f} {}/s, {:.0%} de la velocidad relativa de la línea base'.format(
+                result['units_per_second'], result['units'], result['relative_speed'] / expected['relative_speed']
+            )))
+        if result['peak_bytes'] > expected['peak_bytes'] * (1 + tolerance):
+            found.append((key, 'pico {:.0f} KiB, línea base {:.0f} KiB'.format(
+                result['peak_bytes'] / 1024, expected['peak_bytes'] / 1024
+            )))
+    return found
+
+
+def report(results, baseline):
+    lines = ['{:<13} {:<34} {:>14} {:<9} {:>12} {:>10} {:>8}'.format(
+        'etapa', 'archivo', 'por segundo', '', 'líneas/s', 'pico KiB', 'cambio'
+    )]
+    for key, result in results.items():
+        stage, name = key.split(' ', 1)
+        if 'error' in result:
+            lines.append('{:<13} {:<34} {}'.format(stage, name, result['error']))
+            continue
+        expected = baseline.get(key)
+        change = ''
+        if expected and 'error' not in expected:
+            change = '{:+.0%}'.format(result['relative_speed'] / expected['relative_speed'] - 1)
+        lines.append('{:<13} {:<34} {:>14.0f} {:<9} {:>12.0f} {:>10.0f} {:>8}'.format(
+            stage, name, result['units_per_second'], result['units'], result['lines_per_second'],
+            result['peak_bytes'] / 1024, change
+        ))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mide cada etapa del compilador sobre el corpus de benchmarks")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="mediciones por etapa, se toma la mediana")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="archivo json con los resultados de referencia")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="guarda los resultados como la nueva línea base")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="fracción en que un resultado puede empeorar sin contar como regresión "
+                             "(las etapas de STAGE_TOLERANCES admiten más)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = benchmark(corpus_files(directory), args.repeat)
+
+    baseline = {}
+    if not args.save_baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+    for line in report(results, baseline):
+        print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+        print('línea base guardada en {}'.format(args.baseline))
+        return 0
+
+    found = regressions(results, baseline, args.tolerance)
+    for key, description in found:
+        print('regresión en {}: {}'.format(key, description), file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+escalado de SymbolTable para clases con miles de campos
+
+define n campos en la tabla de la clase y busca cada uno desde
+la tabla de una subrutina, el tiempo por símbolo debe mantenerse constante
+uso: python benchmarks/bench_symbol_table.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SymbolTable import SymbolTable  # noqa: E402
+
+
+def define_and_lookup(count):
+    class_symbol_table = SymbolTable()
+    subroutine_symbol_table = SymbolTable(parent=class_symbol_table)
+    names = ['field{}'.format(index) for index in range(count)]
+
+    start = time.perf_counter()
+    for name in names:
+        class_symbol_table.define(name=name, symbol_type='int', kind='field')
+    for name in names:
+        subroutine_symbol_table.find_symbol_by_name(name)
+    return time.perf_counter() - start
+
+
+def main():
+    for count in (1000, 2000, 4000, 8000, 16000):
+        elapsed = define_and_lookup(count)
+        print('{:>6} fields {:>8.4f} s {:>8.0f} ns/symbol'.format(count, elapsed, elapsed / count * 1e9))
+
+
+if __name__ == '__main__':
+    main()
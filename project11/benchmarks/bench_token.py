@@ -0,0 +1,70 @@
+"""
+costo por token de crear un JackToken y consultar sus predicados
+
+compara los tipos precalculados de JackToken con la clasificación anterior,
+que recorría la lista de palabras clave en cada consulta
+uso: python benchmarks/bench_token.py [tokens]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from JackToken import JackToken  # noqa: E402
+
+SAMPLE_TEXTS = [
+    'let', 'position', '=', 'position', '+', '(', 'mask', '*', '2', ')', ';',
+    'do', 'Output', '.', 'printString', '(', '"resultado"', ')', ';', 'return'
+]
+
+
+class ListScanToken():
+    # clasificación original: se recalcula en cada consulta
+    KEYWORD_TOKENS = sorted(JackToken.KEYWORD_TOKENS)
+
+    def __init__(self, text):
+        self.text = text
+
+    def token_type(self):
+        if not self.text:
+            return None
+        elif self.text[0] == "\"":
+            return "STRING_CONST"
+        elif self.text in self.KEYWORD_TOKENS:
+            return "KEYWORD"
+        elif self.text.isnumeric():
+            return "INT_CONST"
+        elif self.text.isalnum():
+            return "IDENTIFIER"
+        else:
+            return "SYMBOL"
+
+    def is_string_const(self):
+        return self.token_type() == "STRING_CONST"
+
+    def is_identifier(self):
+        return self.token_type() == "IDENTIFIER"
+
+    def is_keyword(self):
+        return self.token_type() == "KEYWORD"
+
+
+def per_token_cost(create, texts):
+    start = time.perf_counter()
+    for text in texts:
+        token = create(text)
+        token.is_identifier()
+        token.is_keyword()
+        token.is_string_const()
+    return (time.perf_counter() - start) / len(texts)
+
+
+def main(count):
+    texts = (SAMPLE_TEXTS * (count // len(SAMPLE_TEXTS) + 1))[:count]
+    for name, create in (('list scan', ListScanToken), ('precomputed', JackToken.for_text)):
+        print('{:<12} {:>8.1f} ns/token'.format(name, per_token_cost(create, texts) * 1e9))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
@@ -0,0 +1,64 @@
+"""
+compara el tokenizador carácter por carácter con el modo buffered,
+con y sin la posición de cada token
+
+uso: python benchmarks/bench_tokenizer.py [repeticiones]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from JackTokenizer import JackTokenizer  # noqa: E402
+
+SUBROUTINE_TEMPLATE = '''
+    function int compute{index}(int value) {{
+        var int mask, position;
+        let mask = value & {index}; // comentario de linea
+        while (position < 16) {{
+            let position = position + (mask * 2) - (value / 3);
+            do Output.printString("resultado numero {index}");
+        }}
+        return position;
+    }}
+'''
+
+
+def generate_source(subroutines):
+    body = ''.join(SUBROUTINE_TEMPLATE.format(index=index) for index in range(subroutines))
+    return 'class Main {\n' + body + '}\n'
+
+
+def tokenize(path, buffered, positions=True):
+    tokens = 0
+    with open(path, 'r') as input_file:
+        tokenizer = JackTokenizer(input_file, buffered=buffered, positions=positions)
+        while tokenizer.has_more_tokens:
+            tokenizer.advance()
+            tokens += 1
+    return tokens
+
+
+def main(subroutines):
+    with tempfile.NamedTemporaryFile('w', suffix='.jack', delete=False) as source:
+        source.write(generate_source(subroutines))
+    try:
+        modes = (('char-by-char', False, False), ('buffered', True, True), ('no positions', True, False))
+        for name, buffered, positions in modes:
+            start = time.perf_counter()
+            tokens = tokenize(source.name, buffered=buffered, positions=positions)
+            elapsed = time.perf_counter() - start
+            print('{:<14} {:>8} tokens {:>8.3f} s {:>12.0f} tokens/s'.format(
+                name,
+                tokens,
+                elapsed,
+                tokens / elapsed
+            ))
+    finally:
+        os.remove(source.name)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
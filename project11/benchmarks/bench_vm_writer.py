@@ -0,0 +1,41 @@
+"""
+comandos por segundo de VMWriter escribiendo a archivo y en memoria
+
+'unbuffered' escribe cada comando por separado como antes
+uso: python benchmarks/bench_vm_writer.py [comandos]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from VMWriter import VMWriter  # noqa: E402
+
+
+def emit_string_const(vm_writer, count):
+    # lo mismo que compile_string_const para un literal largo
+    for index in range(count // 2):
+        vm_writer.write_push(segment='constant', index=65 + index % 26)
+        vm_writer.write_call(name='String.appendChar', num_args=2)
+
+
+def commands_per_second(count, output_file=None, buffer_commands=VMWriter.BUFFER_COMMANDS):
+    start = time.perf_counter()
+    vm_writer = VMWriter(output_file, buffer_commands=buffer_commands)
+    emit_string_const(vm_writer, count)
+    vm_writer.flush()
+    return count / (time.perf_counter() - start)
+
+
+def main(count):
+    with tempfile.TemporaryFile('w') as output_file:
+        print('{:<11} {:>12.0f} commands/s'.format('unbuffered', commands_per_second(count, output_file, 1)))
+    with tempfile.TemporaryFile('w') as output_file:
+        print('{:<11} {:>12.0f} commands/s'.format('buffered', commands_per_second(count, output_file)))
+    print('{:<11} {:>12.0f} commands/s'.format('in-memory', commands_per_second(count)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
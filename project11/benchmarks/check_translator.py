@@ -0,0 +1,179 @@
+"""
+compara el programa de hack de VMTranslator con VMInterpreter
+
+cada programa jack de PROGRAMS guarda sus resultados en RESULTS_BASE y
+siguientes sin llamar al sistema operativo; se compila con y sin -O, se
+traduce y ensambla a una rom que corre un emulador de la cpu de hack hasta
+$$HALT, y la memoria de resultados tiene que ser igual a la que deja
+VMInterpreter con el mismo código vm
+
+los casos cubren saltos con valores que no son booleanos: not es bit a bit,
+así que not; if-goto solo puede saltar con JEQ después de una comparación
+
+uso: python benchmarks/check_translator.py
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from JackTokenizer import JackTokenizer  # noqa: E402
+from CompilationEngine import CompilationEngine  # noqa: E402
+from VMInterpreter import VMInterpreter  # noqa: E402
+from VMTranslator import VMTranslator  # noqa: E402
+from HackAssembler import HackAssembler  # noqa: E402
+
+RESULTS_BASE = 8000
+RESULT_COUNT = 16
+MAX_CYCLES = 1000000
+
+PROGRAMS = {
+    'not_if_goto': '''
+class Main {
+    function void main() {
+        var Array a;
+        var int x, i;
+        let a = 8000;
+        let x = 5;
+        let a[0] = 1;
+        if (~(x & 4)) { let a[0] = 2; }
+        let a[1] = 1;
+        if (~x) { let a[1] = 2; }
+        let a[2] = 1;
+        if (x & 4) { let a[2] = 2; }
+        let a[3] = 1;
+        if (x) { let a[3] = 2; }
+        let a[4] = 1;
+        if (~(x = 5)) { let a[4] = 2; }
+        let a[5] = 1;
+        if (~(x > 3)) { let a[5] = 2; }
+        let a[6] = 1;
+        if (x < -3) { let a[6] = 2; }
+        let a[7] = 1;
+        if (~~x) { let a[7] = 2; }
+        let i = 1;
+        let a[9] = 0;
+        while (i) {
+            let a[9] = a[9] + 1;
+            let i = i - 1;
+        }
+        let i = 3;
+        while (~(i = 0)) {
+            let a[10] = a[10] + 1;
+            let i = i - 1;
+        }
+        return;
+    }
+}
+''',
+    'compare_overflow': '''
+class Main {
+    function void main() {
+        var Array a;
+        var int x, y;
+        let a = 8000;
+        let x = 20000;
+        let y = -20000;
+        let a[0] = x > y;
+        let a[1] = x < y;
+        let a[2] = y > x;
+        if (x > y) { let a[3] = 1; }
+        if (~(y > x)) { let a[4] = 1; }
+        let a[5] = x > -32767;
+        let a[6] = y < 32767;
+        return;
+    }
+}
+'''
+}
+
+
+def vm_programs(source, optimize):
+    compiler = CompilationEngine(JackTokenizer(io.StringIO(source)), None, optimize=optimize)
+    compiler.compile_class()
+    return {'Main.vm': compiler.vm_writer.get_instructions()}
+
+
+def halt_address(lines):
+    # las etiquetas no ocupan una posición de la rom
+    address = 0
+    for line in lines:
+        if line == '($$HALT)':
+            return address
+        if not line.startswith('('):
+            address += 1
+    raise NameError('el programa no tiene $$HALT')
+
+
+def run_rom(rom, halt, ram_size=32768):
+    """
+    ejecuta la rom desde la dirección 0 hasta llegar a halt, devuelve la ram
+    con palabras de 16 bits sin signo
+    """
+    ram = [0] * ram_size
+    a = d = pc = 0
+    for _ in range(MAX_CYCLES):
+        if pc == halt:
+            return ram
+        word = rom[pc]
+        pc += 1
+        if not word & 0x8000:
+            a = word
+            continue
+        # la alu de hack: zx, nx, zy, ny, f, no
+        x = d
+        y = ram[a] if word & 0x1000 else a
+        if word & 0x0800:
+            x = 0
+        if word & 0x0400:
+            x = ~x & 0xFFFF
+        if word & 0x0200:
+            y = 0
+        if word & 0x0100:
+            y = ~y & 0xFFFF
+        out = (x + y if word & 0x0080 else x & y) & 0xFFFF
+        if word & 0x0040:
+            out = ~out & 0xFFFF
+        if word & 0x0008:
+            ram[a] = out
+        if word & 0x0010:
+            d = out
+        jump = word & 0x7
+        negative = out & 0x8000
+        if (jump & 0x4 and negative) or (jump & 0x2 and out == 0) or (jump & 0x1 and not negative and out):
+            pc = a
+        if word & 0x0020:
+            a = out
+    raise RuntimeError('la rom no llegó a $$HALT en {} ciclos'.format(MAX_CYCLES))
+
+
+def check(name, source, optimize):
+    programs = vm_programs(source, optimize)
+    interpreter = VMInterpreter(programs)
+    if not interpreter.run(max_instructions=MAX_CYCLES):
+        raise RuntimeError('VMInterpreter no terminó')
+    expected = [value & 0xFFFF for value in interpreter.memory[RESULTS_BASE:RESULTS_BASE + RESULT_COUNT]]
+
+    translator = VMTranslator(programs)
+    ram = run_rom(HackAssembler.assemble(translator.lines), halt_address(translator.lines))
+    found = ram[RESULTS_BASE:RESULTS_BASE + RESULT_COUNT]
+    return [
+        '{}{}: a[{}] rom {} vm {}'.format(name, ' -O' if optimize else '', index, value, expected[index])
+        for index, value in enumerate(found) if value != expected[index]
+    ]
+
+
+def main():
+    differences = []
+    for name, source in PROGRAMS.items():
+        for optimize in (False, True):
+            differences.extend(check(name, source, optimize))
+    for difference in differences:
+        print(difference, file=sys.stderr)
+    print('{} programas, {} diferencias'.format(2 * len(PROGRAMS), len(differences)))
+    return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())